@@ -18,11 +18,39 @@ def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Larger body limit for the streamed CSV upload views only
+    from app.utils.uploads import UploadRequest
+    app.request_class = UploadRequest
+    
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
     
+    # Write buffered result alterations with the changes they describe
+    from app.utils.audit import init_audit
+    init_audit(app)
+    
+    # Non-blocking IP geolocation for audit records
+    from app.utils.geolocation import init_geolocation
+    init_geolocation(app)
+    
+    # Local background jobs for long uploads and report builds
+    from app.utils.jobs import init_jobs
+    init_jobs(app)
+    
+    # Disk cache of rendered report PDFs
+    from app.utils.artifact_cache import init_artifact_cache
+    init_artifact_cache(app)
+    
+    # Revision counters for caches of result data
+    from app.utils.revisions import init_revisions
+    init_revisions(app)
+    
+    # Dashboard statistics cache
+    from app.utils.dashboard_stats import init_dashboard_stats
+    init_dashboard_stats(app)
+    
     # Ensure directories exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['LOGO_FOLDER'], exist_ok=True)
@@ -36,6 +64,7 @@ def create_app(config_name='default'):
     from app.routes.results import results_bp
     from app.routes.reports import reports_bp
     from app.routes.settings import settings_bp
+    from app.routes.jobs import jobs_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
@@ -44,11 +73,20 @@ def create_app(config_name='default'):
     app.register_blueprint(results_bp, url_prefix='/results')
     app.register_blueprint(reports_bp, url_prefix='/reports')
     app.register_blueprint(settings_bp, url_prefix='/settings')
+    app.register_blueprint(jobs_bp, url_prefix='/jobs')
     
     # Create database tables
     with app.app_context():
         db.create_all()
         
+        # Full-text index of student matric numbers and names (SQLite)
+        from app.utils.student_search import ensure_student_search
+        ensure_student_search()
+        
+        # Fail background jobs whose worker process exited before they finished
+        from app.utils.jobs import recover_jobs
+        recover_jobs()
+        
         # Create default HoD (Head of Department) user if none exists
         from app.models import User, GradingSystem
         if not User.query.filter_by(role='hod').first():
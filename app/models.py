@@ -109,9 +109,12 @@ class Student(db.Model):
     # Relationships
     results = db.relationship('Result', backref='student', lazy='dynamic')
     
-    # Unique constraint for matric_number per session
+    # Unique constraint for matric_number per session; the indexes serve the
+    # student list, seeking by matric number within a session or a class
     __table_args__ = (
         db.UniqueConstraint('matric_number', 'session_id', name='unique_matric_session'),
+        db.Index('ix_students_session_matric_id', 'session_id', 'matric_number', 'id'),
+        db.Index('ix_students_class_matric_id', 'session_id', 'level', 'program', 'matric_number', 'id'),
     )
     
     @property
@@ -152,9 +155,11 @@ class Course(db.Model):
     results = db.relationship('Result', backref='course', lazy='dynamic')
     approver = db.relationship('User', foreign_keys=[approved_by])
     
-    # Unique constraint for course_code per program and level
+    # Unique constraint for course_code per program and level; the index serves
+    # the course list, seeking by level, semester and code
     __table_args__ = (
         db.UniqueConstraint('course_code', 'program', 'level', name='unique_course_program_level'),
+        db.Index('ix_courses_active_level_semester_code_id', 'is_active', 'level', 'semester', 'course_code', 'id'),
     )
     
     def __repr__(self):
@@ -364,6 +369,15 @@ class AuditLog(db.Model):
     # Relationship
     user = db.relationship('User', backref='audit_logs')
     
+    # Keyset pagination runs newest first on id (created_at is nullable), alone
+    # or after one of the equality filters; the date filters range over created_at
+    __table_args__ = (
+        db.Index('ix_audit_logs_created_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_action_id', 'action', 'id'),
+        db.Index('ix_audit_logs_category_id', 'action_category', 'id'),
+        db.Index('ix_audit_logs_status_id', 'status', 'id'),
+    )
+    
     def __repr__(self):
         return f'<AuditLog {self.id} - {self.action}>'
 
@@ -417,5 +431,87 @@ class ResultAlteration(db.Model):
     result = db.relationship('Result', backref='alterations')
     altered_by = db.relationship('User', foreign_keys=[altered_by_id])
     
+    # Keyset pagination runs newest first on id (created_at is nullable), alone or
+    # after the type filter; the date filters range over created_at, and the
+    # geolocation worker fills in pending locations by IP address
+    __table_args__ = (
+        db.Index('ix_result_alterations_created_id', 'created_at', 'id'),
+        db.Index('ix_result_alterations_type_id', 'alteration_type', 'id'),
+        db.Index('ix_result_alterations_ip_location', 'ip_address', 'location'),
+    )
+    
     def __repr__(self):
         return f'<ResultAlteration {self.id} - {self.student_matric} - {self.course_code}>'
+
+
+class IpLocation(db.Model):
+    """Cached geolocation of client IP addresses"""
+    __tablename__ = 'ip_locations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    ip_address = db.Column(db.String(45), unique=True, nullable=False)
+    location = db.Column(db.String(128))
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    is_resolved = db.Column(db.Boolean, default=True)  # False if the lookup failed
+    expires_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<IpLocation {self.ip_address} - {self.location}>'
+
+
+class Job(db.Model):
+    """Background job (CSV upload or report build) run by the local job runner"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(32), nullable=False)  # results_upload, students_upload, spreadsheet_pdf
+    status = db.Column(db.String(16), default='queued', index=True)  # queued, running, succeeded, failed
+    progress = db.Column(db.Integer, default=0)  # Percent complete
+    message = db.Column(db.Text)  # Outcome summary or error
+    params = db.Column(db.Text)  # JSON parameters of the job
+    input_path = db.Column(db.String(256))  # Uploaded file saved for the job
+    result_path = db.Column(db.String(256))  # Finished artifact, if any
+    result_name = db.Column(db.String(256))  # Download filename of the artifact
+    result_mimetype = db.Column(db.String(64))
+    worker = db.Column(db.String(128))  # host:pid of the process running the job
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    # Relationships
+    user = db.relationship('User', backref=db.backref('jobs', lazy='dynamic'))
+    
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def to_dict(self):
+        """Status fields returned by the polling endpoint"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'has_result': bool(self.result_path),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.job_type} - {self.status}>'
+
+
+class DataRevision(db.Model):
+    """Change counter for one slice of the result data (see app.utils.revisions)"""
+    __tablename__ = 'data_revisions'
+    
+    scope = db.Column(db.String(128), primary_key=True)  # global, grading, session:1, course:1:5, class:1:200:Computer Science
+    revision = db.Column(db.Integer, nullable=False, default=0)  # Bumped by every committed change in scope
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DataRevision {self.scope} = {self.revision}>'
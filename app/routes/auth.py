@@ -4,11 +4,11 @@ from datetime import datetime, timedelta
 import json
 import secrets
 import re
-import requests
 from user_agents import parse as parse_ua
 from app import db
 from app.models import User, AuditLog, ResultAlteration
 from app.forms import LoginForm, RegistrationForm, ChangePasswordForm, EditUserForm, ForceChangePasswordForm
+from app.utils import keyset_paginate, capped_count, estimate_row_count, cached_count, USERS_SCOPE
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
@@ -26,7 +26,12 @@ except ImportError:
 
 
 def get_location_from_ip(ip_address):
-    """Get approximate location and coordinates from IP address using free geolocation API"""
+    """
+    Get approximate location and coordinates from IP address.
+    
+    Answers from the geolocation cache; unknown addresses are resolved in the
+    background and a pending placeholder is returned meanwhile.
+    """
     if not ip_address or ip_address in ['127.0.0.1', 'localhost', '::1']:
         # For localhost, use university's default location from config
         return (
@@ -35,25 +40,8 @@ def get_location_from_ip(ip_address):
             DEFAULT_LOCATION.get('longitude')
         )
     
-    try:
-        # Using ip-api.com (free, no API key required, 45 requests/minute)
-        response = requests.get(f'http://ip-api.com/json/{ip_address}', timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'success':
-                city = data.get('city', '')
-                region = data.get('regionName', '')
-                country = data.get('country', '')
-                latitude = data.get('lat')
-                longitude = data.get('lon')
-                
-                location_parts = [p for p in [city, region, country] if p]
-                location = ', '.join(location_parts) if location_parts else 'Unknown'
-                return location, latitude, longitude
-    except Exception as e:
-        print(f"Error getting location for IP {ip_address}: {e}")
-    
-    return 'Unknown', None, None
+    from app.utils.geolocation import lookup_location
+    return lookup_location(ip_address)
 
 
 def parse_user_agent(user_agent_string):
@@ -127,109 +115,68 @@ def admin_or_hod_required(f):
 
 def log_audit(user_id, action, action_category='GENERAL', resource=None, resource_id=None, 
               details=None, old_values=None, new_values=None, status='success'):
-    """Enhanced audit logging with full tracking"""
-    # Get user agent - try both methods
-    user_agent_str = request.headers.get('User-Agent', '')
-    if not user_agent_str and request.user_agent:
-        user_agent_str = request.user_agent.string or ''
+    """
+    Enhanced audit logging with full tracking.
     
-    device_type, browser, os = parse_user_agent(user_agent_str)
+    The record is queued for the background audit writer, so logging never
+    commits or waits on the request's database session.
+    """
+    from app.utils.audit import get_client_info, get_audit_writer
     
-    # Get IP address (handle proxy/load balancer)
-    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-    if ip_address and ',' in ip_address:
-        ip_address = ip_address.split(',')[0].strip()
+    # IP and device only: audit rows carry no location, so none is looked up
+    fingerprint = get_client_info()
     
     # Get username
     username = None
     if user_id:
-        user = User.query.get(user_id)
-        if user:
-            username = user.username
-    
-    audit = AuditLog(
-        user_id=user_id,
-        username=username,
-        action=action,
-        action_category=action_category,
-        resource=resource,
-        resource_id=resource_id,
-        old_values=json.dumps(old_values) if old_values else None,
-        new_values=json.dumps(new_values) if new_values else None,
-        details=details,
-        ip_address=ip_address,
-        user_agent=user_agent_str[:512] if user_agent_str else None,
-        device_type=device_type,
-        browser=browser,
-        operating_system=os,
-        session_id=session.get('_id', secrets.token_hex(16)),
-        status=status
-    )
-    db.session.add(audit)
-    db.session.commit()
+        if current_user.is_authenticated and current_user.id == user_id:
+            username = current_user.username
+        else:
+            user = User.query.get(user_id)
+            if user:
+                username = user.username
+    
+    get_audit_writer().write({
+        'user_id': user_id,
+        'username': username,
+        'action': action,
+        'action_category': action_category,
+        'resource': resource,
+        'resource_id': resource_id,
+        'old_values': json.dumps(old_values) if old_values else None,
+        'new_values': json.dumps(new_values) if new_values else None,
+        'details': details,
+        'ip_address': fingerprint['ip_address'],
+        'user_agent': fingerprint['user_agent'],
+        'device_type': fingerprint['device_type'],
+        'browser': fingerprint['browser'],
+        'operating_system': fingerprint['operating_system'],
+        'session_id': session.get('_id', secrets.token_hex(16)),
+        'status': status,
+        'created_at': datetime.utcnow()
+    })
 
 
 def log_result_alteration(result_id, student, course, session_name, alteration_type, 
                           old_result=None, new_result=None, reason=None):
-    """Log result alteration for admin oversight"""
-    from app.models import Result, Student, Course
-    
-    # Get user agent - try both methods
-    user_agent_str = request.headers.get('User-Agent', '')
-    if not user_agent_str and request.user_agent:
-        user_agent_str = request.user_agent.string or ''
-    
-    device_type, browser, os = parse_user_agent(user_agent_str)
-    
-    # Get IP address (handle proxy/load balancer)
-    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-    if ip_address and ',' in ip_address:
-        ip_address = ip_address.split(',')[0].strip()
-    
-    # Get location and coordinates from IP
-    location, latitude, longitude = get_location_from_ip(ip_address)
-    
-    # Try to get computer username from various headers
-    device_username = (
-        request.headers.get('X-Computer-Name') or
-        request.headers.get('X-Device-Name') or
-        request.environ.get('COMPUTERNAME') or
-        request.environ.get('USERNAME') or
-        'Unknown'
-    )
+    """
+    Log result alteration for admin oversight.
+    
+    The alteration is buffered on the request's recorder and written in the
+    same transaction as the result change on the next commit.
+    """
+    from app.utils.audit import get_alteration_recorder
     
-    alteration = ResultAlteration(
+    get_alteration_recorder().record(
         result_id=result_id,
-        student_matric=student.matric_number,
-        student_name=student.full_name,
-        course_code=course.course_code,
-        course_title=course.course_title,
+        student=student,
+        course=course,
         session_name=session_name,
-        altered_by_id=current_user.id,
-        altered_by_name=current_user.full_name,
-        altered_by_role=current_user.role,
         alteration_type=alteration_type,
-        old_ca_score=old_result.ca_score if old_result else None,
-        new_ca_score=new_result.ca_score if new_result else None,
-        old_exam_score=old_result.exam_score if old_result else None,
-        new_exam_score=new_result.exam_score if new_result else None,
-        old_total_score=old_result.total_score if old_result else None,
-        new_total_score=new_result.total_score if new_result else None,
-        old_grade=old_result.grade if old_result else None,
-        new_grade=new_result.grade if new_result else None,
-        ip_address=ip_address,
-        user_agent=user_agent_str[:512] if user_agent_str else None,
-        device_type=device_type,
-        browser=browser,
-        operating_system=os,
-        device_username=device_username[:128] if device_username else None,
-        location=location,
-        latitude=latitude,
-        longitude=longitude,
+        old_result=old_result,
+        new_result=new_result,
         reason=reason
     )
-    db.session.add(alteration)
-    db.session.commit()
 
 
 def generate_password():
@@ -375,10 +322,17 @@ def users():
     """List all users (Admin sees all, HoD cannot see admin accounts)"""
     if current_user.is_admin():
         # Admin sees everyone
-        users = User.query.order_by(User.created_at.desc()).all()
+        query = User.query
     else:
         # HoD cannot see admin accounts
-        users = User.query.filter(User.role != 'admin').order_by(User.created_at.desc()).all()
+        query = User.query.filter(User.role != 'admin')
+    
+    # Newest first by ID: created_at is nullable, and IDs follow creation order
+    users = keyset_paginate(
+        query, (User.id,), descending=True,
+        after=request.args.get('after'), before=request.args.get('before'), per_page=50,
+        total=cached_count(query, [USERS_SCOPE])
+    )
     
     log_audit(current_user.id, 'VIEW', 'USER', details='Viewed user list')
     return render_template('auth/users.html', users=users)
@@ -753,7 +707,6 @@ def security_monitor():
 @admin_required
 def audit_logs():
     """View comprehensive audit logs (Admin and HoD)"""
-    page = request.args.get('page', 1, type=int)
     action_filter = request.args.get('action', '')
     category_filter = request.args.get('category', '')
     user_filter = request.args.get('user', '')
@@ -776,8 +729,13 @@ def audit_logs():
     if date_to:
         query = query.filter(AuditLog.created_at <= datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
     
-    logs = query.order_by(AuditLog.created_at.desc()).paginate(
-        page=page, per_page=50, error_out=False
+    # Seek from the cursor instead of OFFSET; only filtered listings are counted, and only up to a cap.
+    # Newest first by ID: created_at is nullable, and IDs follow creation order
+    filtered = any([action_filter, category_filter, user_filter, status_filter, date_from, date_to])
+    logs = keyset_paginate(
+        query, (AuditLog.id,), descending=True,
+        after=request.args.get('after'), before=request.args.get('before'), per_page=50,
+        total=capped_count(query, AuditLog) if filtered else estimate_row_count(AuditLog)
     )
     
     # Get unique values for filters
@@ -804,7 +762,6 @@ def audit_logs():
 @admin_required
 def result_alterations():
     """View result alteration logs (Admin only)"""
-    page = request.args.get('page', 1, type=int)
     student_filter = request.args.get('student', '')
     course_filter = request.args.get('course', '')
     user_filter = request.args.get('user', '')
@@ -833,8 +790,12 @@ def result_alterations():
     if date_to:
         query = query.filter(ResultAlteration.created_at <= datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
     
-    alterations = query.order_by(ResultAlteration.created_at.desc()).paginate(
-        page=page, per_page=50, error_out=False
+    # Newest first by ID: created_at is nullable, and IDs follow creation order
+    filtered = any([student_filter, course_filter, user_filter, alteration_type, date_from, date_to])
+    alterations = keyset_paginate(
+        query, (ResultAlteration.id,), descending=True,
+        after=request.args.get('after'), before=request.args.get('before'), per_page=50,
+        total=capped_count(query, ResultAlteration) if filtered else estimate_row_count(ResultAlteration)
     )
     
     # Get unique values for filters
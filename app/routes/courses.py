@@ -1,10 +1,11 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app import db
-from app.models import Course
+from app.models import Course, Result, Student
 from config import Config
 
-from app.utils import get_accessible_filters
+from app.utils import (get_accessible_filters, keyset_paginate, cached_count, COURSES_SCOPE,
+                       refresh_academic_history)
 
 courses_bp = Blueprint('courses', __name__)
 
@@ -13,7 +14,6 @@ courses_bp = Blueprint('courses', __name__)
 @login_required
 def index():
     """List all courses"""
-    page = request.args.get('page', 1, type=int)
     level_filter = request.args.get('level', type=int)
     program_filter = request.args.get('program', '')
     semester_filter = request.args.get('semester', type=int)
@@ -35,8 +35,10 @@ def index():
     if semester_filter:
         query = query.filter_by(semester=semester_filter)
     
-    courses = query.order_by(Course.level, Course.semester, Course.course_code).paginate(
-        page=page, per_page=50, error_out=False
+    courses = keyset_paginate(
+        query, (Course.level, Course.semester, Course.course_code, Course.id),
+        after=request.args.get('after'), before=request.args.get('before'), per_page=50,
+        total=cached_count(query, [COURSES_SCOPE])
     )
     
     return render_template('courses/index.html',
@@ -136,6 +138,7 @@ def edit(course_id):
         return redirect(url_for('courses.index'))
     
     if request.method == 'POST':
+        old_grading = (course.credit_unit, course.semester)
         course.course_code = request.form.get('course_code', '').strip().upper()
         course.course_title = request.form.get('course_title', '').strip()
         course.credit_unit = request.form.get('credit_unit', type=int)
@@ -158,6 +161,13 @@ def edit(course_id):
             course.level = new_level
             course.program = new_program
         
+        # Credit units and semester feed every GPA of the course's students
+        if (course.credit_unit, course.semester) != old_grading:
+            matrics = [m for (m,) in db.session.query(Student.matric_number).join(
+                Result, Result.student_id == Student.id
+            ).filter(Result.course_id == course.id).distinct()]
+            refresh_academic_history(matrics)
+        
         db.session.commit()
         
         flash('Course updated successfully.', 'success')
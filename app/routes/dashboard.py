@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app import db
-from app.models import Student, Course, Result, AcademicSession, User
-from sqlalchemy import func
+from app.models import AcademicSession, UploadLog
+from app.utils import get_dashboard_stats, keyset_paginate, cached_count, SESSIONS_SCOPE
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -15,71 +15,39 @@ def index():
     # Get current session
     current_session = AcademicSession.query.filter_by(is_current=True).first()
     
-    # Statistics
-    stats = {}
+    # Statistics (cached aggregates; HoD sees all data, advisers their level and program)
+    is_hod = current_user.role == 'hod'
+    dashboard = get_dashboard_stats().get(
+        session_id=current_session.id if current_session else None,
+        level=None if is_hod else current_user.level,
+        program=None if is_hod else current_user.program,
+        breakdowns=is_hod
+    )
     
-    if current_user.role == 'hod':
-        # HoD sees all data
-        stats['total_students'] = Student.query.count()
-        stats['total_courses'] = Course.query.filter_by(is_active=True).count()
-        stats['total_results'] = Result.query.count()
-        stats['total_users'] = User.query.filter_by(is_active=True).count()
-        
-        # Students by program
-        students_by_program = db.session.query(
-            Student.program, func.count(Student.id)
-        ).group_by(Student.program).all()
-        
-        # Students by level
-        students_by_level = db.session.query(
-            Student.level, func.count(Student.id)
-        ).group_by(Student.level).order_by(Student.level).all()
-        
-        # Recent uploads
-        from app.models import UploadLog
+    # Recent uploads
+    recent_uploads = []
+    if is_hod:
         recent_uploads = UploadLog.query.order_by(
             UploadLog.created_at.desc()
         ).limit(10).all()
-        
-    else:
-        # Level adviser sees only their assigned level and program
-        student_query = Student.query
-        course_query = Course.query.filter_by(is_active=True)
-        
-        if current_user.level:
-            student_query = student_query.filter_by(level=current_user.level)
-            course_query = course_query.filter_by(level=current_user.level)
-        
-        if current_user.program:
-            student_query = student_query.filter_by(program=current_user.program)
-            course_query = course_query.filter_by(program=current_user.program)
-        
-        stats['total_students'] = student_query.count()
-        stats['total_courses'] = course_query.count()
-        
-        # Get results for assigned students
-        student_ids = [s.id for s in student_query.all()]
-        stats['total_results'] = Result.query.filter(
-            Result.student_id.in_(student_ids)
-        ).count() if student_ids else 0
-        
-        students_by_program = []
-        students_by_level = []
-        recent_uploads = []
     
     return render_template('dashboard/index.html',
-                           stats=stats,
+                           stats=dashboard['stats'],
                            current_session=current_session,
-                           students_by_program=students_by_program if current_user.role == 'hod' else [],
-                           students_by_level=students_by_level if current_user.role == 'hod' else [],
-                           recent_uploads=recent_uploads if current_user.role == 'hod' else [])
+                           students_by_program=dashboard['students_by_program'],
+                           students_by_level=dashboard['students_by_level'],
+                           recent_uploads=recent_uploads)
 
 
 @dashboard_bp.route('/sessions')
 @login_required
 def sessions():
     """Manage academic sessions"""
-    sessions = AcademicSession.query.order_by(AcademicSession.session_name.desc()).all()
+    sessions = keyset_paginate(
+        AcademicSession.query, (AcademicSession.session_name, AcademicSession.id), descending=True,
+        after=request.args.get('after'), before=request.args.get('before'), per_page=24,
+        total=cached_count(AcademicSession.query, [SESSIONS_SCOPE])
+    )
     return render_template('dashboard/sessions.html', sessions=sessions)
 
 
@@ -0,0 +1,67 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, jsonify, abort
+from flask_login import login_required, current_user
+from app.models import Job
+from app.utils import get_job_runner, keyset_paginate
+import os
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def get_own_job_or_404(job_id):
+    """Get a job the current user may see (their own; HoD sees all)"""
+    job = Job.query.get_or_404(job_id)
+    if job.user_id != current_user.id and not current_user.is_hod():
+        abort(404)
+    return job
+
+
+@jobs_bp.route('/')
+@login_required
+def index():
+    """List background jobs"""
+    query = Job.query
+    if not current_user.is_hod():
+        query = query.filter_by(user_id=current_user.id)
+
+    jobs = keyset_paginate(query, (Job.created_at, Job.id), descending=True,
+                           after=request.args.get('after'), before=request.args.get('before'), per_page=20)
+
+    return render_template('jobs/index.html', jobs=jobs, runner=get_job_runner())
+
+
+@jobs_bp.route('/<int:job_id>')
+@login_required
+def view(job_id):
+    """Job page; polls the status endpoint until the job finishes"""
+    job = get_own_job_or_404(job_id)
+    return render_template('jobs/view.html', job=job, progress=get_job_runner().progress(job))
+
+
+@jobs_bp.route('/<int:job_id>/status')
+@login_required
+def status(job_id):
+    """Job status for polling"""
+    job = get_own_job_or_404(job_id)
+    data = job.to_dict()
+    data['progress'] = get_job_runner().progress(job)
+    if job.status == 'succeeded' and job.result_path:
+        data['download_url'] = url_for('jobs.download', job_id=job.id)
+    return jsonify(data)
+
+
+@jobs_bp.route('/<int:job_id>/download')
+@login_required
+def download(job_id):
+    """Download a finished job's artifact"""
+    job = get_own_job_or_404(job_id)
+
+    if job.status != 'succeeded' or not job.result_path or not os.path.exists(job.result_path):
+        flash('This job has no file to download.', 'warning')
+        return redirect(url_for('jobs.view', job_id=job.id))
+
+    return send_file(
+        job.result_path,
+        mimetype=job.result_mimetype or 'application/octet-stream',
+        as_attachment=True,
+        download_name=job.result_name
+    )
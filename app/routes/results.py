@@ -1,23 +1,28 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
-from app.models import Student, Course, Result, AcademicSession, UploadLog, Carryover
+from app.models import Student, Course, Result, AcademicSession, Carryover
 from app.utils import (
-    parse_results_csv, generate_sample_results_csv, allowed_file,
-    get_grade_info, format_score_grade, process_carryovers_for_student,
-    check_and_clear_carryovers, get_accessible_filters
+    generate_sample_results_csv, allowed_file,
+    get_grade_info_bulk, format_score_grade, reconcile_course_carryovers,
+    get_accessible_filters, ingest_results_csv, refresh_academic_history, record_upload, submit_job,
+    get_results_summary, get_course_stats, get_moderation_set, parse_scenario, simulate_moderation,
+    keyset_paginate, cached_count, session_scope, COURSES_SCOPE, student_search_clause, streamed_upload
 )
 from app.routes.auth import log_result_alteration
 from config import Config
+import time
 
 results_bp = Blueprint('results', __name__)
 
+# Scenarios one moderation preview request may compare
+MAX_SCENARIOS = 20
+
 
 @results_bp.route('/')
 @login_required
 def index():
     """List uploaded results"""
-    page = request.args.get('page', 1, type=int)
     matric_filter = request.args.get('matric', '')
     course_filter = request.args.get('course', '')
     level_filter = request.args.get('level', type=int)
@@ -43,7 +48,7 @@ def index():
     
     # Apply user filters
     if matric_filter:
-        query = query.filter(Student.matric_number.ilike(f'%{matric_filter}%'))
+        query = query.filter(student_search_clause(matric_filter, columns=('matric_number',)))
     if course_filter:
         query = query.filter(Course.course_code.ilike(f'%{course_filter}%'))
     if level_filter:
@@ -52,16 +57,14 @@ def index():
         query = query.filter(Course.semester == semester_filter)
     
     # Get paginated results
-    results = query.order_by(Student.matric_number, Course.course_code).paginate(
-        page=page, per_page=50, error_out=False
+    results = keyset_paginate(
+        query, (Student.matric_number, Course.course_code, Result.id),
+        after=request.args.get('after'), before=request.args.get('before'), per_page=50,
+        total=cached_count(query, [session_scope(current_session.id), COURSES_SCOPE])
     )
     
-    # Calculate statistics
-    all_results = Result.query.filter_by(session_id=current_session.id).all()
-    stats = {
-        'passed': len([r for r in all_results if r.grade != 'F']),
-        'failed': len([r for r in all_results if r.grade == 'F'])
-    }
+    # Pass/fail totals of the results this user can see
+    stats = get_results_summary(current_session.id, level_access, program_access)
     
     return render_template('results/index.html',
                            results=results,
@@ -73,8 +76,22 @@ def index():
                            program_access=program_access)
 
 
+@results_bp.route('/summary')
+@login_required
+def summary():
+    """Pass/fail, grade and per-level counts of the current session's results as JSON"""
+    current_session = AcademicSession.query.filter_by(is_current=True).first()
+    if not current_session:
+        return jsonify({'error': 'No current academic session'}), 404
+    
+    level_access, program_access = get_accessible_filters()
+    return jsonify(dict(get_results_summary(current_session.id, level_access, program_access),
+                        session=current_session.session_name))
+
+
 @results_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
+@streamed_upload
 def upload():
     """Upload results from CSV for a specific course"""
     current_session = AcademicSession.query.filter_by(is_current=True).first()
@@ -131,164 +148,41 @@ def upload():
             flash('Only CSV files are allowed.', 'danger')
             return redirect(url_for('results.upload'))
         
-        # Parse CSV
-        file_content = file.read()
-        records, errors = parse_results_csv(file_content)
+        if request.form.get('background'):
+            # Apply the file in a background job and follow it on the job page
+            job = submit_job('results_upload', {
+                'course_id': course.id,
+                'session_id': current_session.id,
+                'filename': file.filename
+            }, upload=file)
+            flash(f'Results for {course.course_code} are being uploaded in the background.', 'info')
+            return redirect(url_for('jobs.view', job_id=job.id))
         
-        if not records:
-            flash(f'No valid records found. Errors: {"; ".join(errors)}', 'danger')
+        # Parse and apply the CSV chunk by chunk in one transaction
+        errors = []
+        try:
+            summary = ingest_results_csv(file.stream, course, current_session, current_user.id,
+                                         chunk_size=current_app.config['CSV_CHUNK_SIZE'], errors=errors)
+            
+            if not summary['records']:
+                db.session.rollback()
+                flash(f'No valid records found. Errors: {"; ".join(errors)}', 'danger')
+                return redirect(url_for('results.upload'))
+            
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error saving results: {str(e)}', 'danger')
             return redirect(url_for('results.upload'))
         
-        # Get degree type from course
-        degree_type = course.degree_type or 'BSc'
-        
-        # Process records
-        added = 0
-        updated = 0
-        failed = 0
-        not_found = []
-        
-        for record in records:
-            try:
-                # Find student
-                student = Student.query.filter_by(
-                    matric_number=record['matric_number'],
-                    session_id=current_session.id,
-                    level=course.level,
-                    program=course.program
-                ).first()
-                
-                if not student:
-                    not_found.append(record['matric_number'])
-                    failed += 1
-                    continue
-                
-                # Calculate grade
-                total_score = record['total_score']
-                grade, grade_point = get_grade_info(total_score, degree_type)
-                
-                # Check if this is a carryover course for the student
-                is_carryover = Carryover.query.filter_by(
-                    student_matric=student.matric_number,
-                    course_id=course.id,
-                    is_cleared=False
-                ).first() is not None
-                
-                # Check if result exists
-                existing = Result.query.filter_by(
-                    student_id=student.id,
-                    course_id=course.id,
-                    session_id=current_session.id
-                ).first()
-                
-                if existing:
-                    # Store old values before updating
-                    old_ca = existing.ca_score
-                    old_exam = existing.exam_score
-                    old_total = existing.total_score
-                    old_grade = existing.grade
-                    
-                    existing.ca_score = record['ca_score']
-                    existing.exam_score = record['exam_score']
-                    existing.total_score = total_score
-                    existing.grade = grade
-                    existing.grade_point = grade_point
-                    existing.is_carryover = is_carryover
-                    existing.uploaded_by = current_user.id
-                    result_id = existing.id
-                    
-                    # Log the alteration if values changed
-                    if (old_ca != record['ca_score'] or old_exam != record['exam_score'] or 
-                        old_total != total_score or old_grade != grade):
-                        from types import SimpleNamespace
-                        old_result_obj = SimpleNamespace(ca_score=old_ca, exam_score=old_exam,
-                                                        total_score=old_total, grade=old_grade)
-                        new_result_obj = SimpleNamespace(ca_score=record['ca_score'], exam_score=record['exam_score'],
-                                                        total_score=total_score, grade=grade)
-                        
-                        log_result_alteration(
-                            result_id=result_id,
-                            student=student,
-                            course=course,
-                            session_name=current_session.session_name,
-                            alteration_type='UPDATE',
-                            old_result=old_result_obj,
-                            new_result=new_result_obj,
-                            reason='CSV upload update'
-                        )
-                    
-                    updated += 1
-                else:
-                    result = Result(
-                        student_id=student.id,
-                        course_id=course.id,
-                        session_id=current_session.id,
-                        ca_score=record['ca_score'],
-                        exam_score=record['exam_score'],
-                        total_score=total_score,
-                        grade=grade,
-                        grade_point=grade_point,
-                        is_carryover=is_carryover,
-                        uploaded_by=current_user.id
-                    )
-                    db.session.add(result)
-                    db.session.flush()  # Get the result ID
-                    result_id = result.id
-                    
-                    # Log new result creation
-                    from types import SimpleNamespace
-                    new_result_obj = SimpleNamespace(ca_score=record['ca_score'], exam_score=record['exam_score'],
-                                                    total_score=total_score, grade=grade)
-                    
-                    log_result_alteration(
-                        result_id=result_id,
-                        student=student,
-                        course=course,
-                        session_name=current_session.session_name,
-                        alteration_type='CREATE',
-                        old_result=None,
-                        new_result=new_result_obj,
-                        reason='CSV upload creation'
-                    )
-                    
-                    added += 1
-                
-                # Check if this result clears a carryover
-                if grade != 'F' and is_carryover:
-                    check_and_clear_carryovers(
-                        student.matric_number, 
-                        course.id, 
-                        current_session.id, 
-                        result_id, 
-                        db
-                    )
-                    
-            except Exception as e:
-                failed += 1
-                errors.append(f"{record['matric_number']}: {str(e)}")
-        
-        db.session.commit()
-        
-        # Process carryovers for all students who had results uploaded
-        # This creates carryover records for any new failures
-        processed_matrics = set()
-        for record in records:
-            matric = record['matric_number']
-            if matric not in processed_matrics and matric not in not_found:
-                process_carryovers_for_student(matric, current_session.id, db)
-                processed_matrics.add(matric)
+        added = summary['added']
+        updated = summary['updated']
+        failed = summary['failed']
+        not_found = summary['not_found']
         
         # Log upload
-        log = UploadLog(
-            user_id=current_user.id,
-            upload_type='results',
-            filename=f"{course.course_code}_{file.filename}",
-            records_processed=added + updated,
-            records_failed=failed,
-            status='success' if failed == 0 else 'partial',
-            error_message='; '.join(errors) if errors else None
-        )
-        db.session.add(log)
+        record_upload(current_user.id, 'results', f"{course.course_code}_{file.filename}",
+                      added + updated, failed, errors)
         db.session.commit()
         
         flash(f'Results upload for {course.course_code}: {added} added, {updated} updated, {failed} failed.', 
@@ -338,20 +232,8 @@ def view_course(course_id):
         session_id=current_session.id if current_session else None
     ).join(Student).order_by(Student.matric_number).all()
     
-    # Calculate statistics
-    if results:
-        scores = [r.total_score for r in results]
-        stats = {
-            'total': len(results),
-            'passed': len([r for r in results if r.grade != 'F']),
-            'failed': len([r for r in results if r.grade == 'F']),
-            'average': sum(scores) / len(scores),
-            'highest': max(scores),
-            'lowest': min(scores)
-        }
-        stats['pass_rate'] = (stats['passed'] / stats['total']) * 100
-    else:
-        stats = None
+    # Score statistics (cached until the course's results change)
+    stats = get_course_stats(course_id, current_session.id) if current_session else None
     
     return render_template('results/view_course.html',
                            course=course,
@@ -360,6 +242,67 @@ def view_course(course_id):
                            current_session=current_session)
 
 
+@results_bp.route('/course/<int:course_id>/stats.json')
+@login_required
+def course_stats(course_id):
+    """Score statistics of a course's results in the current session as JSON"""
+    course = Course.query.get_or_404(course_id)
+    current_session = AcademicSession.query.filter_by(is_current=True).first()
+    if not current_session:
+        return jsonify({'error': 'No current academic session'}), 404
+    
+    level_access, program_access = get_accessible_filters()
+    if (level_access and course.level != level_access) or (program_access and course.program != program_access):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify(dict(get_course_stats(course_id, current_session.id),
+                        course_id=course.id, course_code=course.course_code,
+                        session=current_session.session_name))
+
+
+@results_bp.route('/course/<int:course_id>/simulate', methods=['POST'])
+@login_required
+def simulate_course(course_id):
+    """
+    Preview moderation scenarios for a course without changing any result.
+    
+    Takes a JSON scenario (offset, scale, bonus, bonus_cap, boundaries) or
+    {"scenarios": [...]}, and returns the regraded distribution, pass rate
+    and affected students of each.
+    """
+    course = Course.query.get_or_404(course_id)
+    current_session = AcademicSession.query.filter_by(is_current=True).first()
+    if not current_session:
+        return jsonify({'error': 'No current academic session'}), 404
+    
+    level_access, program_access = get_accessible_filters()
+    if (level_access and course.level != level_access) or (program_access and course.program != program_access):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({'error': 'Expected a JSON scenario'}), 400
+    scenarios = data.get('scenarios', [data]) if isinstance(data, dict) else data
+    if not isinstance(scenarios, list) or not 0 < len(scenarios) <= MAX_SCENARIOS:
+        return jsonify({'error': f'Send between 1 and {MAX_SCENARIOS} scenarios'}), 400
+    
+    started = time.perf_counter()
+    moderation_set = get_moderation_set(course, current_session.id)
+    try:
+        outcomes = [simulate_moderation(moderation_set, parse_scenario(scenario)) for scenario in scenarios]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'course_id': course.id,
+        'course_code': course.course_code,
+        'session': current_session.session_name,
+        'students': int(moderation_set.totals.size),
+        'scenarios': outcomes,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
+
+
 @results_bp.route('/entry/<int:course_id>', methods=['GET', 'POST'])
 @login_required
 def manual_entry(course_id):
@@ -427,6 +370,7 @@ def manual_entry(course_id):
         skipped_count = 0
         errors = []
         processed_students = []
+        entries = []
         
         for student in students:
             # Get form values
@@ -455,9 +399,13 @@ def manual_entry(course_id):
                 errors.append(f"{student.matric_number}: Invalid score format")
                 continue
             
-            # Calculate total and grade
-            total_score = round(ca_score + exam_score, 1)
-            grade, grade_point = get_grade_info(total_score, degree_type)
+            entries.append((student, ca_score, exam_score, round(ca_score + exam_score, 1)))
+        
+        # Grade all entered scores in one pass
+        grades, grade_points = get_grade_info_bulk([entry[3] for entry in entries], degree_type)
+        
+        for (student, ca_score, exam_score, total_score), grade, grade_point in zip(
+                entries, grades.tolist(), grade_points.tolist()):
             is_carryover = carryover_status.get(student.id, False)
             
             # Update or create result
@@ -538,36 +486,16 @@ def manual_entry(course_id):
                 
                 added_count += 1
             
-            # Handle carryover clearing if passed
-            if is_carryover and grade != 'F':
-                check_and_clear_carryovers(
-                    student.matric_number,
-                    course_id,
-                    current_session.id,
-                    result_id,
-                    db
-                )
-            elif is_carryover and grade == 'F':
-                # Re-activate carryover if result changed back to F
-                carryover = Carryover.query.filter_by(
-                    student_matric=student.matric_number,
-                    course_id=course_id
-                ).first()
-                if carryover and carryover.is_cleared:
-                    carryover.is_cleared = False
-                    carryover.cleared_session_id = None
-                    carryover.cleared_result_id = None
-            
             processed_students.append(student.matric_number)
         
         # Commit all changes
         try:
+            # Create, clear or reopen carryovers for the saved results
+            if processed_students:
+                reconcile_course_carryovers(course_id, current_session.id, processed_students)
+                refresh_academic_history(processed_students)
             db.session.commit()
             
-            # Process carryovers for any new failures
-            for matric in processed_students:
-                process_carryovers_for_student(matric, current_session.id, db)
-            
             success_msg = f'Results saved: {added_count} added, {updated_count} updated.'
             if errors:
                 success_msg += f' {len(errors)} errors.'
@@ -631,7 +559,9 @@ def delete_result(result_id):
         return redirect(url_for('results.view_course', course_id=result.course_id))
     
     course_id = result.course_id
+    matric = result.student.matric_number
     db.session.delete(result)
+    refresh_academic_history([matric])
     db.session.commit()
     
     flash('Result deleted.', 'success')
@@ -683,34 +613,15 @@ def edit_result(result_id):
         
         # Get degree type and calculate grade
         degree_type = course.degree_type or 'BSc'
-        old_grade = result.grade
-        result.grade, result.grade_point = get_grade_info(result.total_score, degree_type)
+        grades, grade_points = get_grade_info_bulk([result.total_score], degree_type)
+        result.grade, result.grade_point = grades[0], int(grade_points[0])
         
         # Update modifier
         result.uploaded_by = current_user.id
         
-        # Handle carryover updates
-        student = result.student
-        if result.is_carryover:
-            if result.grade != 'F' and old_grade == 'F':
-                # Changed from F to passing - clear carryover
-                check_and_clear_carryovers(
-                    student.matric_number,
-                    course.id,
-                    result.session_id,
-                    result.id,
-                    db
-                )
-            elif result.grade == 'F' and old_grade != 'F':
-                # Changed from passing to F - re-activate carryover
-                carryover = Carryover.query.filter_by(
-                    student_matric=student.matric_number,
-                    course_id=course.id
-                ).first()
-                if carryover and carryover.is_cleared:
-                    carryover.is_cleared = False
-                    carryover.cleared_session_id = None
-                    carryover.cleared_result_id = None
+        # Create, clear or reopen the student's carryover for this course
+        reconcile_course_carryovers(course.id, result.session_id, [result.student.matric_number])
+        refresh_academic_history([result.student.matric_number])
         
         db.session.commit()
         flash('Result updated successfully.', 'success')
@@ -751,12 +662,21 @@ def clear_course_results(course_id):
         flash('Some results are locked. Only HoD can clear locked results.', 'danger')
         return redirect(url_for('results.view_course', course_id=course_id))
     
+    # Students whose history changes
+    matrics = [m for (m,) in db.session.query(Student.matric_number).join(
+        Result, Result.student_id == Student.id
+    ).filter(
+        Result.course_id == course_id,
+        Result.session_id == (current_session.id if current_session else None)
+    )]
+    
     # Delete results
     deleted = Result.query.filter_by(
         course_id=course_id,
         session_id=current_session.id if current_session else None
     ).delete()
     
+    refresh_academic_history(matrics)
     db.session.commit()
     
     flash(f'{deleted} results cleared for {course.course_code}.', 'success')
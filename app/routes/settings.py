@@ -4,6 +4,7 @@ from werkzeug.utils import secure_filename
 from app import db
 from app.models import GradingSystem, SystemSetting
 from app.routes.auth import hod_required, admin_or_hod_required
+from app.utils import invalidate_grading_cache, invalidate_pdf_assets, mark_changed, LOGO_SCOPE
 from config import Config
 import os
 
@@ -78,6 +79,7 @@ def edit_grading(degree_type):
             grade_obj.description = descriptions[i] if i < len(descriptions) else None
         
         db.session.commit()
+        invalidate_grading_cache(degree_type)
         flash(f'Grading system for {degree_type} updated successfully.', 'success')
         return redirect(url_for('settings.grading'))
     
@@ -108,6 +110,10 @@ def logo():
                 if '.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed:
                     # Save as PNG
                     file.save(logo_path)
+                    # Other worker processes reload the logo when its revision moves on
+                    mark_changed(LOGO_SCOPE)
+                    db.session.commit()
+                    invalidate_pdf_assets()
                     flash('University logo uploaded successfully.', 'success')
                 else:
                     flash('Invalid file type. Please upload PNG, JPG, or GIF.', 'danger')
@@ -127,6 +133,9 @@ def delete_logo():
     logo_path = os.path.join(current_app.config['LOGO_FOLDER'], 'university_logo.jpg')
     if os.path.exists(logo_path):
         os.remove(logo_path)
+        mark_changed(LOGO_SCOPE)
+        db.session.commit()
+        invalidate_pdf_assets()
         flash('Logo removed. Default logo will be used.', 'success')
     
     return redirect(url_for('settings.logo'))
@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, Response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, current_app, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Student, AcademicSession, UploadLog, Result, Course, Carryover, StudentAcademicHistory
-from app.utils import parse_student_csv, generate_sample_student_csv, allowed_file, calculate_gpa, get_credit_units_summary, get_accessible_filters
+from app.models import Student, AcademicSession, Result, Course, Carryover, StudentAcademicHistory
+from app.utils import (
+    iter_student_csv, generate_sample_student_csv, allowed_file, calculate_gpa, get_credit_units_summary,
+    get_accessible_filters, get_academic_history, refresh_academic_history, ingest_student_roster,
+    record_upload, submit_job, keyset_paginate, cached_count, session_scope, GLOBAL_SCOPE,
+    search_students, student_search_clause, streamed_upload
+)
+from sqlalchemy.orm import joinedload, contains_eager
 from config import Config
 
 students_bp = Blueprint('students', __name__)
@@ -12,7 +18,6 @@ students_bp = Blueprint('students', __name__)
 @login_required
 def index():
     """List all students"""
-    page = request.args.get('page', 1, type=int)
     level_filter = request.args.get('level', type=int)
     program_filter = request.args.get('program', '')
     search = request.args.get('search', '').strip()
@@ -39,19 +44,15 @@ def index():
     if program_filter and not program_access:
         query = query.filter_by(program=program_filter)
     
-    # Search
+    # Search (full-text index of matric numbers and names)
     if search:
-        query = query.filter(
-            db.or_(
-                Student.matric_number.ilike(f'%{search}%'),
-                Student.surname.ilike(f'%{search}%'),
-                Student.first_name.ilike(f'%{search}%')
-            )
-        )
+        query = query.filter(student_search_clause(search))
     
-    # Order and paginate
-    students = query.order_by(Student.matric_number).paginate(
-        page=page, per_page=50, error_out=False
+    # Seek by matric number; the count is cached until the session's students or results change
+    students = keyset_paginate(
+        query, (Student.matric_number, Student.id),
+        after=request.args.get('after'), before=request.args.get('before'), per_page=50,
+        total=cached_count(query, [session_scope(current_session.id) if current_session else GLOBAL_SCOPE])
     )
     
     return render_template('students/index.html',
@@ -66,8 +67,41 @@ def index():
                            program_access=program_access)
 
 
+# Most suggestions one autocomplete request returns
+MAX_SUGGESTIONS = 20
+
+
+@students_bp.route('/autocomplete')
+@login_required
+def autocomplete():
+    """Students of the current session matching a partial matric number or name, as JSON"""
+    search = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_SUGGESTIONS)
+    if not search:
+        return jsonify({'query': search, 'students': []})
+    
+    current_session = AcademicSession.query.filter_by(is_current=True).first()
+    level_access, program_access = get_accessible_filters()
+    student_ids = search_students(search, current_session.id if current_session else None,
+                                  level_access, program_access, limit=limit)
+    found = {student.id: student for student in Student.query.filter(Student.id.in_(student_ids))}
+    
+    return jsonify({
+        'query': search,
+        'students': [{
+            'id': student.id,
+            'matric_number': student.matric_number,
+            'name': student.full_name,
+            'level': student.level,
+            'program': student.program,
+            'url': url_for('students.view', student_id=student.id)
+        } for student in (found[student_id] for student_id in student_ids)]
+    })
+
+
 @students_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
+@streamed_upload
 def upload():
     """Upload student records from CSV"""
     current_session = AcademicSession.query.filter_by(is_current=True).first()
@@ -103,68 +137,42 @@ def upload():
             flash('Only CSV files are allowed.', 'danger')
             return redirect(url_for('students.upload'))
         
-        # Parse CSV
-        file_content = file.read()
-        records, errors = parse_student_csv(file_content)
-        
-        if not records:
-            flash(f'No valid records found. Errors: {"; ".join(errors)}', 'danger')
+        if request.form.get('background'):
+            # Apply the roster in a background job and follow it on the job page
+            job = submit_job('students_upload', {
+                'level': level,
+                'program': program,
+                'session_id': current_session.id,
+                'filename': file.filename
+            }, upload=file)
+            flash('The student list is being uploaded in the background.', 'info')
+            return redirect(url_for('jobs.view', job_id=job.id))
+        
+        # Parse the CSV in chunks and apply each with bulk statements
+        errors = []
+        try:
+            summary = ingest_student_roster(
+                iter_student_csv(file.stream, current_app.config['CSV_CHUNK_SIZE'], errors),
+                level, program, current_session.id, errors
+            )
+            
+            if not summary['records']:
+                db.session.rollback()
+                flash(f'No valid records found. Errors: {"; ".join(errors)}', 'danger')
+                return redirect(url_for('students.upload'))
+            
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error saving students: {str(e)}', 'danger')
             return redirect(url_for('students.upload'))
         
-        # Process records
-        added = 0
-        updated = 0
-        failed = 0
-        
-        for record in records:
-            try:
-                # Check if student exists
-                existing = Student.query.filter_by(
-                    matric_number=record['matric_number'],
-                    session_id=current_session.id
-                ).first()
-                
-                if existing:
-                    # Update existing
-                    existing.surname = record['surname']
-                    existing.first_name = record['first_name']
-                    existing.other_names = record['other_names']
-                    existing.gender = record.get('gender')
-                    existing.level = level
-                    existing.program = program
-                    updated += 1
-                else:
-                    # Create new
-                    student = Student(
-                        matric_number=record['matric_number'],
-                        surname=record['surname'],
-                        first_name=record['first_name'],
-                        other_names=record['other_names'],
-                        gender=record.get('gender'),
-                        level=level,
-                        program=program,
-                        session_id=current_session.id
-                    )
-                    db.session.add(student)
-                    added += 1
-                    
-            except Exception as e:
-                failed += 1
-                errors.append(f"{record['matric_number']}: {str(e)}")
-        
-        db.session.commit()
+        added = summary['added']
+        updated = summary['updated']
+        failed = summary['failed']
         
         # Log upload
-        log = UploadLog(
-            user_id=current_user.id,
-            upload_type='students',
-            filename=file.filename,
-            records_processed=added + updated,
-            records_failed=failed,
-            status='success' if failed == 0 else 'partial',
-            error_message='; '.join(errors) if errors else None
-        )
-        db.session.add(log)
+        record_upload(current_user.id, 'students', file.filename, added + updated, failed, errors)
         db.session.commit()
         
         flash(f'Upload complete: {added} added, {updated} updated, {failed} failed.', 
@@ -289,48 +297,47 @@ def view(student_id):
     # Get all students with same matric across all sessions (for history tracking)
     all_student_records = Student.query.filter_by(
         matric_number=student.matric_number
-    ).join(AcademicSession).order_by(AcademicSession.session_name).all()
+    ).join(AcademicSession).options(
+        contains_eager(Student.session)
+    ).order_by(AcademicSession.session_name).all()
+    
+    # Precomputed GPA/CGPA per session
+    history_rows = get_academic_history(student.matric_number)
+    
+    # All results for those records in one query, with their courses
+    results_by_record = {}
+    for result in Result.query.join(Student, Result.student_id == Student.id).filter(
+            Student.matric_number == student.matric_number,
+            Result.session_id == Student.session_id
+    ).options(joinedload(Result.course)).all():
+        results_by_record.setdefault(result.student_id, []).append(result)
     
     # Build comprehensive academic history
     academic_history = []
-    cumulative_results = []
+    empty_summary = {'passed': 0, 'failed': 0, 'total': 0}
     
     for student_record in all_student_records:
         session = student_record.session
-        results = student_record.results.filter_by(session_id=student_record.session_id).all()
+        history = history_rows[student_record.session_id]
+        results = results_by_record.get(student_record.id, [])
         
         # Separate by semester
         first_sem_results = [r for r in results if r.course.semester == 1]
         second_sem_results = [r for r in results if r.course.semester == 2]
         
-        # Calculate semester GPAs
-        first_sem_gpa = calculate_gpa(first_sem_results) if first_sem_results else 0.0
-        second_sem_gpa = calculate_gpa(second_sem_results) if second_sem_results else 0.0
-        
         # Credit unit summaries
-        first_sem_summary = get_credit_units_summary(first_sem_results) if first_sem_results else {'passed': 0, 'failed': 0, 'total': 0}
-        second_sem_summary = get_credit_units_summary(second_sem_results) if second_sem_results else {'passed': 0, 'failed': 0, 'total': 0}
+        first_sem_summary = get_credit_units_summary(first_sem_results) if first_sem_results else empty_summary
+        second_sem_summary = get_credit_units_summary(second_sem_results) if second_sem_results else empty_summary
         
         # Combined session summary
         all_results = first_sem_results + second_sem_results
-        session_summary = get_credit_units_summary(all_results) if all_results else {'passed': 0, 'failed': 0, 'total': 0}
+        session_summary = {
+            'passed': history.total_units_passed,
+            'failed': history.total_units_failed,
+            'total': history.total_units_registered
+        }
         session_gpa = calculate_gpa(all_results) if all_results else 0.0
         
-        # Add to cumulative for CGPA
-        cumulative_results.extend(all_results)
-        cgpa = calculate_gpa(cumulative_results) if cumulative_results else 0.0
-        
-        # Determine academic standing
-        if session_summary['total'] > 0:
-            if cgpa >= 1.50:
-                remarks = 'Good Standing'
-            elif cgpa >= 1.00:
-                remarks = 'Probation'
-            else:
-                remarks = 'At Risk'
-        else:
-            remarks = 'No Results'
-        
         # Get failed courses (carryovers) for this session
         failed_courses = [r for r in all_results if r.grade == 'F']
         
@@ -340,18 +347,18 @@ def view(student_id):
             'level': student_record.level,
             'first_semester': {
                 'results': first_sem_results,
-                'gpa': first_sem_gpa,
+                'gpa': history.first_semester_gpa,
                 'summary': first_sem_summary
             },
             'second_semester': {
                 'results': second_sem_results,
-                'gpa': second_sem_gpa,
+                'gpa': history.second_semester_gpa,
                 'summary': second_sem_summary
             },
             'session_gpa': session_gpa,
-            'cgpa': cgpa,
+            'cgpa': history.cgpa,
             'session_summary': session_summary,
-            'remarks': remarks,
+            'remarks': history.remarks,
             'failed_courses': failed_courses,
             'is_current': session.is_current
         })
@@ -359,6 +366,8 @@ def view(student_id):
     # Get all carryover courses for this student
     carryovers = Carryover.query.filter_by(
         student_matric=student.matric_number
+    ).options(
+        joinedload(Carryover.course), joinedload(Carryover.cleared_session), joinedload(Carryover.cleared_result)
     ).order_by(Carryover.created_at).all()
     
     # Separate outstanding and cleared carryovers
@@ -372,7 +381,7 @@ def view(student_id):
     total_units_registered = sum(h['session_summary']['total'] for h in academic_history)
     total_units_passed = sum(h['session_summary']['passed'] for h in academic_history)
     total_units_failed = sum(h['session_summary']['failed'] for h in academic_history)
-    overall_cgpa = calculate_gpa(cumulative_results) if cumulative_results else 0.0
+    overall_cgpa = academic_history[-1]['cgpa'] if academic_history else 0.0
     
     return render_template('students/view.html', 
                            student=student, 
@@ -404,6 +413,7 @@ def edit(student_id):
         return redirect(url_for('students.index'))
     
     if request.method == 'POST':
+        old_matric = student.matric_number
         student.matric_number = request.form.get('matric_number', '').strip().upper()
         student.surname = request.form.get('surname', '').strip().upper()
         student.first_name = request.form.get('first_name', '').strip().title()
@@ -425,6 +435,8 @@ def edit(student_id):
         student.level = new_level
         student.program = new_program
         
+        # Keep the history rows' matric, level and program in step
+        refresh_academic_history({old_matric, student.matric_number})
         db.session.commit()
         
         flash('Student updated successfully.', 'success')
@@ -460,6 +472,7 @@ def delete(student_id):
     
     matric = student.matric_number
     db.session.delete(student)
+    refresh_academic_history([matric])
     db.session.commit()
     
     flash(f'Student {matric} deleted.', 'success')
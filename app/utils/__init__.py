@@ -1,5 +1,8 @@
 from app.utils.grading import (
     get_grade_info,
+    get_grade_info_bulk,
+    get_grading_table,
+    invalidate_grading_cache,
     calculate_gpa,
     calculate_cgpa,
     get_credit_units_summary,
@@ -7,8 +10,7 @@ from app.utils.grading import (
     format_score_grade,
     is_pass_grade,
     validate_scores,
-    process_carryovers_for_student,
-    check_and_clear_carryovers,
+    reconcile_course_carryovers,
     get_outstanding_carryovers,
     validate_carryover_registration,
     check_carryover_has_score,
@@ -19,17 +21,129 @@ from app.utils.csv_processor import (
     allowed_file,
     parse_student_csv,
     parse_results_csv,
+    iter_student_csv,
+    iter_results_csv,
+    detect_csv_encoding,
     generate_sample_student_csv,
     generate_sample_results_csv
 )
 
+from app.utils.ingest import (
+    ingest_course_results,
+    ingest_results_csv,
+    ingest_student_roster,
+    record_upload
+)
+
+from app.utils.result_matrix import (
+    build_result_matrix,
+    summarize_cells
+)
+
+from app.utils.academic_history import (
+    get_academic_standing,
+    refresh_academic_history,
+    rebuild_academic_history,
+    get_academic_history
+)
+
 from app.utils.pdf_generator import (
     generate_spreadsheet_pdf,
-    generate_student_result_pdf
+    generate_student_result_pdf,
+    get_logo_path,
+    invalidate_pdf_assets
+)
+
+from app.utils.spreadsheet import (
+    spreadsheet_students_data,
+    spreadsheet_courses_data,
+    spreadsheet_matrix_error,
+    build_spreadsheet_pdf,
+    cached_spreadsheet_pdf
+)
+
+from app.utils.artifact_cache import (
+    get_artifact_cache
+)
+
+from app.utils.revisions import (
+    get_revisions,
+    revision_token,
+    current_revision,
+    mark_changed,
+    session_scope,
+    course_scope,
+    class_scope,
+    RevisionCache,
+    GLOBAL_SCOPE,
+    COURSES_SCOPE,
+    USERS_SCOPE,
+    SESSIONS_SCOPE,
+    LOGO_SCOPE
+)
+
+from app.utils.result_summary import (
+    summarize_results,
+    get_results_summary
+)
+
+from app.utils.course_stats import (
+    load_course_scores,
+    compute_course_stats,
+    get_course_stats
+)
+
+from app.utils.moderation import (
+    get_moderation_set,
+    parse_scenario,
+    adjust_scores,
+    simulate_moderation
+)
+
+from app.utils.dashboard_stats import (
+    compute_dashboard_stats,
+    get_dashboard_stats
+)
+
+from app.utils.pagination import (
+    keyset_paginate,
+    capped_count,
+    estimate_row_count,
+    cached_count,
+    encode_cursor,
+    decode_cursor
+)
+
+from app.utils.student_search import (
+    search_students,
+    student_search_clause,
+    rebuild_student_search
+)
+
+from app.utils.result_slips import (
+    build_result_slip,
+    result_slip_config,
+    result_slip_filename,
+    result_slips_zip_filename,
+    load_result_slips,
+    render_result_slips,
+    iter_result_slips_zip
+)
+
+from app.utils.uploads import (
+    streamed_upload
+)
+
+from app.utils.jobs import (
+    submit_job,
+    get_job_runner
 )
 
 __all__ = [
     'get_grade_info',
+    'get_grade_info_bulk',
+    'get_grading_table',
+    'invalidate_grading_cache',
     'calculate_gpa',
     'calculate_cgpa',
     'get_credit_units_summary',
@@ -37,8 +151,7 @@ __all__ = [
     'format_score_grade',
     'is_pass_grade',
     'validate_scores',
-    'process_carryovers_for_student',
-    'check_and_clear_carryovers',
+    'reconcile_course_carryovers',
     'get_outstanding_carryovers',
     'validate_carryover_registration',
     'check_carryover_has_score',
@@ -46,8 +159,72 @@ __all__ = [
     'allowed_file',
     'parse_student_csv',
     'parse_results_csv',
+    'iter_student_csv',
+    'iter_results_csv',
+    'detect_csv_encoding',
     'generate_sample_student_csv',
     'generate_sample_results_csv',
+    'ingest_course_results',
+    'ingest_results_csv',
+    'ingest_student_roster',
+    'record_upload',
+    'build_result_matrix',
+    'summarize_cells',
+    'get_academic_standing',
+    'refresh_academic_history',
+    'rebuild_academic_history',
+    'get_academic_history',
     'generate_spreadsheet_pdf',
-    'generate_student_result_pdf'
+    'generate_student_result_pdf',
+    'get_logo_path',
+    'invalidate_pdf_assets',
+    'spreadsheet_students_data',
+    'spreadsheet_courses_data',
+    'spreadsheet_matrix_error',
+    'build_spreadsheet_pdf',
+    'cached_spreadsheet_pdf',
+    'get_artifact_cache',
+    'get_revisions',
+    'revision_token',
+    'current_revision',
+    'mark_changed',
+    'session_scope',
+    'course_scope',
+    'class_scope',
+    'RevisionCache',
+    'GLOBAL_SCOPE',
+    'COURSES_SCOPE',
+    'USERS_SCOPE',
+    'SESSIONS_SCOPE',
+    'LOGO_SCOPE',
+    'summarize_results',
+    'get_results_summary',
+    'load_course_scores',
+    'compute_course_stats',
+    'get_course_stats',
+    'get_moderation_set',
+    'parse_scenario',
+    'adjust_scores',
+    'simulate_moderation',
+    'compute_dashboard_stats',
+    'get_dashboard_stats',
+    'keyset_paginate',
+    'capped_count',
+    'estimate_row_count',
+    'cached_count',
+    'encode_cursor',
+    'decode_cursor',
+    'search_students',
+    'student_search_clause',
+    'rebuild_student_search',
+    'build_result_slip',
+    'result_slip_config',
+    'result_slip_filename',
+    'result_slips_zip_filename',
+    'load_result_slips',
+    'render_result_slips',
+    'iter_result_slips_zip',
+    'streamed_upload',
+    'submit_job',
+    'get_job_runner'
 ]
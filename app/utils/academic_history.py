@@ -0,0 +1,174 @@
+"""Maintenance of precomputed StudentAcademicHistory rows"""
+from datetime import datetime
+from sqlalchemy import insert, update, delete
+from app import db
+from app.models import Student, Result, Course, AcademicSession, StudentAcademicHistory
+from app.utils.result_matrix import ResultCell, summarize_cells
+
+# Matric numbers refreshed per batch of queries
+REFRESH_BATCH_SIZE = 500
+
+
+def get_academic_standing(cgpa, units_registered):
+    """
+    Academic standing remark for a session.
+
+    Args:
+        cgpa: Cumulative GPA up to and including the session
+        units_registered: Credit units with results in the session
+
+    Returns:
+        str: 'Good Standing', 'Probation', 'At Risk' or 'No Results'
+    """
+    if units_registered <= 0:
+        return 'No Results'
+    if cgpa >= 1.50:
+        return 'Good Standing'
+    if cgpa >= 1.00:
+        return 'Probation'
+    return 'At Risk'
+
+
+def _compute_batch(matrics, now):
+    """History values of every session record of the given students, keyed by (matric, session ID)"""
+    # 1. The student's record in each session, in session order
+    records = db.session.query(
+        Student.id, Student.matric_number, Student.session_id, Student.level, Student.program
+    ).join(AcademicSession, Student.session_id == AcademicSession.id).filter(
+        Student.matric_number.in_(matrics)
+    ).order_by(Student.matric_number, AcademicSession.session_name).all()
+
+    # 2. Their results for the session of each record
+    cells = {}
+    for row in db.session.query(
+            Result.id, Result.student_id, Result.total_score, Result.grade, Result.grade_point,
+            Course.semester, Course.credit_unit
+    ).join(Course, Result.course_id == Course.id).join(Student, Result.student_id == Student.id).filter(
+        Student.matric_number.in_(matrics),
+        Result.session_id == Student.session_id
+    ).all():
+        cell = ResultCell(row.id, row.total_score, row.grade, row.grade_point or 0, row.credit_unit)
+        cells.setdefault(row.student_id, []).append((row.semester, cell))
+
+    computed = {}
+    cumulative = {}
+    for record in records:
+        student_cells = cells.get(record.id, [])
+        first = summarize_cells([cell for semester, cell in student_cells if semester == 1])
+        second = summarize_cells([cell for semester, cell in student_cells if semester == 2])
+        session = summarize_cells([cell for _, cell in student_cells])
+
+        history = cumulative.setdefault(record.matric_number, [])
+        history.extend(cell for _, cell in student_cells)
+        cgpa = summarize_cells(history)['gpa']
+
+        values = {
+            'level': record.level,
+            'program': record.program,
+            'first_semester_gpa': first['gpa'],
+            'second_semester_gpa': second['gpa'],
+            'cgpa': cgpa,
+            'total_units_registered': session['total'],
+            'total_units_passed': session['passed'],
+            'total_units_failed': session['failed'],
+            'remarks': get_academic_standing(cgpa, session['total']),
+            'updated_at': now
+        }
+        computed[(record.matric_number, record.session_id)] = values
+    return computed
+
+
+def _refresh_batch(matrics, now):
+    computed = _compute_batch(matrics, now)
+
+    # 3. Existing history rows
+    existing = {
+        (row.student_matric, row.session_id): row.id
+        for row in db.session.query(
+            StudentAcademicHistory.id, StudentAcademicHistory.student_matric, StudentAcademicHistory.session_id
+        ).filter(StudentAcademicHistory.student_matric.in_(matrics)).all()
+    }
+
+    inserts = []
+    updates = []
+    for (matric, session_id), values in computed.items():
+        history_id = existing.pop((matric, session_id), None)
+        if history_id is None:
+            inserts.append(dict(values, student_matric=matric, session_id=session_id, created_at=now))
+        else:
+            updates.append(dict(values, id=history_id))
+
+    if inserts:
+        db.session.execute(insert(StudentAcademicHistory), inserts)
+    if updates:
+        db.session.execute(update(StudentAcademicHistory), updates)
+    if existing:
+        # Sessions the student no longer has a record in
+        db.session.execute(delete(StudentAcademicHistory).where(
+            StudentAcademicHistory.id.in_(list(existing.values()))
+        ))
+    return len(computed)
+
+
+def refresh_academic_history(matrics):
+    """
+    Recompute the history rows of the given students across all their sessions.
+
+    Call after results for these students are created, updated or deleted.
+    CGPA is cumulative, so every session of an affected student is refreshed.
+    Each batch of students costs three queries plus bulk writes. Nothing is
+    committed; the caller commits with the result changes.
+
+    Args:
+        matrics: Matric numbers of the affected students
+
+    Returns:
+        int: Number of history rows written
+    """
+    matrics = sorted(set(matrics))
+    now = datetime.utcnow()
+    written = 0
+    for start in range(0, len(matrics), REFRESH_BATCH_SIZE):
+        written += _refresh_batch(matrics[start:start + REFRESH_BATCH_SIZE], now)
+    return written
+
+
+def rebuild_academic_history():
+    """
+    Recompute history rows for every student, committing after each batch.
+
+    Returns:
+        int: Number of history rows written
+    """
+    matrics = [m for (m,) in db.session.query(Student.matric_number).distinct().order_by(Student.matric_number)]
+    now = datetime.utcnow()
+    written = 0
+    for start in range(0, len(matrics), REFRESH_BATCH_SIZE):
+        written += _refresh_batch(matrics[start:start + REFRESH_BATCH_SIZE], now)
+        db.session.commit()
+    return written
+
+
+def get_academic_history(matric_number):
+    """
+    Get a student's history rows keyed by session ID.
+
+    Read-only: rows missing for any of the student's sessions (new students,
+    or data from before history was maintained) are computed and returned
+    as unsaved objects. They are stored by the next refresh from a result
+    change, or by rebuild_academic_history.py.
+
+    Returns:
+        dict: {session_id: StudentAcademicHistory}
+    """
+    rows = {
+        row.session_id: row for row in StudentAcademicHistory.query.filter_by(student_matric=matric_number).all()
+    }
+    session_ids = {
+        session_id for (session_id,) in db.session.query(Student.session_id).filter_by(matric_number=matric_number)
+    }
+    if not session_ids.issubset(rows):
+        for (matric, session_id), values in _compute_batch([matric_number], datetime.utcnow()).items():
+            if session_id not in rows:
+                rows[session_id] = StudentAcademicHistory(student_matric=matric, session_id=session_id, **values)
+    return rows
@@ -0,0 +1,131 @@
+"""Content-addressed disk cache for rendered report files"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+class ArtifactCache:
+    """
+    Rendered files on disk, keyed by a digest of everything they depend on.
+
+    An entry never goes stale: when the inputs change, so does the key, and
+    the old entry simply stops being read until it is evicted. Entries are
+    evicted least recently used first once the folder grows past max_bytes;
+    a hit touches the file's modification time to mark it as used.
+    """
+
+    def __init__(self, folder=None, max_bytes=200 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, app):
+        """Take settings from the app config"""
+        self.folder = app.config['ARTIFACT_CACHE_FOLDER']
+        self.max_bytes = app.config.get('ARTIFACT_CACHE_MAX_BYTES', self.max_bytes)
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def key(kind, *parts):
+        """
+        Cache key for an artifact.
+
+        Args:
+            kind: Artifact type, used as the file name prefix
+            *parts: JSON-serializable inputs the artifact is rendered from
+
+        Returns:
+            str: '<kind>-<sha256 of the inputs>'
+        """
+        payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+        return f'{kind}-{hashlib.sha256(payload.encode()).hexdigest()}'
+
+    def _path(self, key):
+        return os.path.join(self.folder, key)
+
+    def get(self, key):
+        """Path of a cached artifact, or None"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, data):
+        """
+        Store an artifact and evict old entries if the cache is over size.
+
+        Returns:
+            str: Path of the stored artifact
+        """
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self.evict(keep=key)
+        return path
+
+    def get_or_render(self, key, render):
+        """
+        Path of a cached artifact, rendering and storing it on a miss.
+
+        Args:
+            key: Cache key from key()
+            render: Function returning the artifact's bytes
+
+        Returns:
+            str: Path of the artifact
+        """
+        return self.get(key) or self.put(key, render())
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.folder):
+                if not entry.is_file() or entry.name.startswith('.tmp-'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.name))
+                total += stat.st_size
+
+            for mtime, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if name == keep:
+                    continue
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        """Delete every entry"""
+        with self._lock:
+            for entry in os.scandir(self.folder):
+                if entry.is_file():
+                    os.remove(entry.path)
+            self.hits = self.misses = 0
+
+
+_artifact_cache = ArtifactCache()
+
+
+def init_artifact_cache(app):
+    """Configure the shared artifact cache from the app config"""
+    _artifact_cache.configure(app)
+
+
+def get_artifact_cache():
+    """Get the shared artifact cache"""
+    return _artifact_cache
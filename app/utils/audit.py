@@ -0,0 +1,331 @@
+"""Request-scoped recording of result alterations and asynchronous audit logging"""
+import atexit
+import queue
+import threading
+import time
+from flask import g, request, has_app_context
+from flask_login import current_user
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from app import db
+from app.models import AuditLog, ResultAlteration
+from app.utils.geolocation import PENDING_LOCATION, get_geo_locator
+
+
+def get_client_info():
+    """
+    Identify the client's IP, user agent and device once per request.
+
+    Cheap enough for every audited page view and login attempt: no database
+    query and no location lookup.
+
+    Returns:
+        dict: ip_address, user_agent, device_type, browser, operating_system,
+            device_username
+    """
+    info = g.get('client_info')
+    if info is not None:
+        return info
+
+    from app.routes.auth import parse_user_agent
+
+    # Get user agent - try both methods
+    user_agent_str = request.headers.get('User-Agent', '')
+    if not user_agent_str and request.user_agent:
+        user_agent_str = request.user_agent.string or ''
+
+    device_type, browser, os = parse_user_agent(user_agent_str)
+
+    # Get IP address (handle proxy/load balancer)
+    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
+    if ip_address and ',' in ip_address:
+        ip_address = ip_address.split(',')[0].strip()
+
+    # Try to get computer username from various headers
+    device_username = (
+        request.headers.get('X-Computer-Name') or
+        request.headers.get('X-Device-Name') or
+        request.environ.get('COMPUTERNAME') or
+        request.environ.get('USERNAME') or
+        'Unknown'
+    )
+
+    info = {
+        'ip_address': ip_address,
+        'user_agent': user_agent_str[:512] if user_agent_str else None,
+        'device_type': device_type,
+        'browser': browser,
+        'operating_system': os,
+        'device_username': device_username[:128] if device_username else None
+    }
+    g.client_info = info
+    return info
+
+
+def get_client_fingerprint():
+    """
+    Client info plus its location, once per request (for result alterations).
+
+    Returns:
+        dict: get_client_info() plus location, latitude, longitude
+    """
+    fingerprint = g.get('client_fingerprint')
+    if fingerprint is not None:
+        return fingerprint
+
+    from app.routes.auth import get_location_from_ip
+
+    info = get_client_info()
+    location, latitude, longitude = get_location_from_ip(info['ip_address'])
+    fingerprint = dict(info, location=location, latitude=latitude, longitude=longitude)
+    g.client_fingerprint = fingerprint
+    return fingerprint
+
+
+class AlterationRecorder:
+    """
+    Buffers ResultAlteration rows for one request (or background job).
+
+    Rows are bulk-inserted by a before_commit hook, so they are written in
+    the same transaction as the result changes they describe: a commit
+    always carries its alteration rows and a rollback discards both.
+    """
+
+    def __init__(self, fingerprint, altered_by_id, altered_by_name=None, altered_by_role=None):
+        self.fingerprint = fingerprint
+        self.altered_by = {
+            'altered_by_id': altered_by_id,
+            'altered_by_name': altered_by_name,
+            'altered_by_role': altered_by_role
+        }
+        self.pending = []
+
+    @classmethod
+    def from_request(cls):
+        """Create a recorder for the current request and user"""
+        return cls(get_client_fingerprint(), current_user.id,
+                   current_user.full_name, current_user.role)
+
+    def record(self, result_id, student, course, session_name, alteration_type,
+               old_result=None, new_result=None, reason=None):
+        """Buffer one alteration; written on the next commit"""
+        row = {
+            'result_id': result_id,
+            'student_matric': student.matric_number,
+            'student_name': student.full_name,
+            'course_code': course.course_code,
+            'course_title': course.course_title,
+            'session_name': session_name,
+            'alteration_type': alteration_type,
+            'old_ca_score': old_result.ca_score if old_result else None,
+            'new_ca_score': new_result.ca_score if new_result else None,
+            'old_exam_score': old_result.exam_score if old_result else None,
+            'new_exam_score': new_result.exam_score if new_result else None,
+            'old_total_score': old_result.total_score if old_result else None,
+            'new_total_score': new_result.total_score if new_result else None,
+            'old_grade': old_result.grade if old_result else None,
+            'new_grade': new_result.grade if new_result else None,
+            'reason': reason
+        }
+        row.update(self.altered_by)
+        row.update(self.fingerprint)
+        self.pending.append(row)
+
+    def flush(self, session):
+        """Bulk-insert buffered rows through the given session"""
+        if not self.pending:
+            return
+        if self.fingerprint.get('location') == PENDING_LOCATION:
+            self._refresh_location()
+        session.execute(insert(ResultAlteration), self.pending)
+        self.pending = []
+
+    def _refresh_location(self):
+        """Use the location if it was resolved since the rows were recorded"""
+        location = get_geo_locator().cached(self.fingerprint['ip_address'])
+        if location is None:
+            return
+        resolved = dict(zip(('location', 'latitude', 'longitude'), location))
+        self.fingerprint.update(resolved)
+        for row in self.pending:
+            row.update(resolved)
+
+    def discard(self):
+        """Drop buffered rows whose result changes were rolled back"""
+        self.pending = []
+
+
+def get_alteration_recorder():
+    """Get the alteration recorder bound to the current request"""
+    recorder = g.get('alteration_recorder')
+    if recorder is None:
+        recorder = AlterationRecorder.from_request()
+        g.alteration_recorder = recorder
+    return recorder
+
+
+def _flush_alterations(session):
+    """before_commit hook: write buffered alterations in the same transaction"""
+    if has_app_context():
+        recorder = g.get('alteration_recorder')
+        if recorder is not None:
+            recorder.flush(session)
+
+
+def _discard_alterations(session):
+    """after_rollback hook: forget alterations for rolled back changes"""
+    if has_app_context():
+        recorder = g.get('alteration_recorder')
+        if recorder is not None:
+            recorder.discard()
+
+
+class AuditWriter:
+    """
+    Writes AuditLog rows in the background.
+
+    Records go onto a bounded queue and a writer thread inserts them in
+    batches (when AUDIT_BATCH_SIZE rows are waiting or AUDIT_FLUSH_INTERVAL
+    seconds have passed) through its own session, so page views do not take
+    the database write lock. When the queue is full the record is written
+    synchronously instead, and the queue is drained on shutdown.
+    """
+
+    def __init__(self, queue_size=10000, batch_size=200, flush_interval=1.0, enabled=True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.app = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._worker = None
+        self._atexit_registered = False
+        self.queued = 0        # Records accepted onto the queue
+        self.flushed = 0       # Records written to the database
+        self.sync_writes = 0   # Records written inline because the queue was full
+        self.dropped = 0       # Records lost because their write failed
+
+    def configure(self, app):
+        """Bind to an app and read the AUDIT_* settings"""
+        self.shutdown()
+        self.app = app
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+        self.enabled = app.config.get('AUDIT_ASYNC', self.enabled)
+        self._queue = queue.Queue(maxsize=app.config.get('AUDIT_QUEUE_SIZE', self._queue.maxsize))
+
+    def write(self, row):
+        """Queue an audit record, or write it now if async logging is off or the queue is full"""
+        if self.enabled:
+            try:
+                self._queue.put_nowait(row)
+                with self._lock:
+                    self.queued += 1
+                self._start_worker()
+                return
+            except queue.Full:
+                with self._lock:
+                    self.sync_writes += 1
+        self._write([row])
+
+    def flush(self):
+        """Write everything still queued in the calling thread"""
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(rows), self.batch_size):
+            self._write(rows[start:start + self.batch_size])
+
+    def shutdown(self, timeout=5):
+        """Stop the writer thread and flush remaining records"""
+        worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._stopping.set()
+            worker.join(timeout)
+        self._worker = None
+        self._stopping.clear()
+        if self.app is not None:
+            self.flush()
+
+    def stats(self):
+        """Counters for monitoring the audit pipeline"""
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'flushed': self.flushed,
+                'sync_writes': self.sync_writes,
+                'dropped': self.dropped,
+                'pending': self._queue.qsize()
+            }
+
+    def _write(self, rows):
+        if not has_app_context():
+            with self.app.app_context():
+                return self._write(rows)
+        try:
+            # Own session: never commits or rolls back the request's work
+            with Session(db.engine) as session:
+                session.execute(insert(AuditLog), rows)
+                session.commit()
+            with self._lock:
+                self.flushed += len(rows)
+        except Exception as e:
+            with self._lock:
+                self.dropped += len(rows)
+            print(f"Error writing {len(rows)} audit log records: {e}")
+
+    def _next_batch(self):
+        """Wait for a record, then gather more until the batch is full or the interval ends"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                batch = self._next_batch()
+                if batch:
+                    self._write(batch)
+
+    def _start_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+            self._worker = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._worker.start()
+
+
+_audit_writer = AuditWriter()
+
+
+def get_audit_writer():
+    """Get the shared audit log writer"""
+    return _audit_writer
+
+
+def init_audit(app):
+    """Register the session hooks that write buffered alterations and configure the audit writer"""
+    if not event.contains(db.session, 'before_commit', _flush_alterations):
+        event.listen(db.session, 'before_commit', _flush_alterations)
+        event.listen(db.session, 'after_rollback', _discard_alterations)
+    _audit_writer.configure(app)
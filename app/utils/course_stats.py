@@ -0,0 +1,100 @@
+"""Score statistics of a course's results, computed on NumPy arrays"""
+import numpy as np
+from sqlalchemy import select
+from app import db
+from app.models import Result
+from app.utils.revisions import RevisionCache, course_scope
+
+# Score histogram bins: 0-9, 10-19, ..., 90-100
+HISTOGRAM_EDGES = np.arange(0, 101, 10)
+
+# Grades in display order; other grades found in the data are listed after these
+GRADE_ORDER = ['A', 'B', 'C', 'D', 'E', 'F']
+
+_course_stats_cache = RevisionCache()
+
+
+def load_course_scores(course_id, session_id):
+    """
+    CA, exam and total scores and grades of a course's results.
+
+    Returns:
+        tuple: (ca, exam, total, grades) as parallel NumPy arrays
+    """
+    rows = db.session.execute(
+        select(Result.ca_score, Result.exam_score, Result.total_score, Result.grade)
+        .where(Result.course_id == course_id, Result.session_id == session_id)
+    ).all()
+    if not rows:
+        empty = np.empty(0, dtype=float)
+        return empty, empty, empty, np.empty(0, dtype=object)
+    ca, exam, total, grades = zip(*rows)
+    return (np.array(ca, dtype=float), np.array(exam, dtype=float), np.array(total, dtype=float),
+            np.array(grades, dtype=object))
+
+
+def compute_course_stats(ca, exam, total, grades):
+    """
+    Summary statistics of one course's scores.
+
+    Args:
+        ca, exam, total: Score arrays, one entry per result
+        grades: Grade array, parallel to the scores
+
+    Returns:
+        dict: count, passed, failed, pass_rate (%), mean, median, std
+            (population), min, q1, q3, max, histogram (list of
+            {'range', 'count'}), grades ({grade: count}) and
+            ca_exam_correlation (Pearson r, None when undefined).
+            Score figures are None when there are no results.
+    """
+    count = int(total.size)
+    stats = {
+        'count': count, 'passed': 0, 'failed': 0, 'pass_rate': 0.0,
+        'mean': None, 'median': None, 'std': None, 'min': None, 'q1': None, 'q3': None, 'max': None,
+        'histogram': [], 'grades': {}, 'ca_exam_correlation': None
+    }
+
+    labels, counts = np.unique(grades, return_counts=True)
+    found = dict(zip(labels.tolist(), counts.tolist()))
+    stats['grades'] = {grade: found.pop(grade, 0) for grade in GRADE_ORDER}
+    stats['grades'].update(sorted(found.items()))
+
+    histogram, _ = np.histogram(total, bins=HISTOGRAM_EDGES)
+    stats['histogram'] = [
+        {'range': f'{low}-{high - 1 if high < 100 else 100}', 'count': int(n)}
+        for low, high, n in zip(HISTOGRAM_EDGES[:-1].tolist(), HISTOGRAM_EDGES[1:].tolist(), histogram)
+    ]
+    if not count:
+        return stats
+
+    stats['failed'] = stats['grades']['F']
+    stats['passed'] = count - stats['failed']
+    stats['pass_rate'] = round(stats['passed'] / count * 100, 2)
+
+    low, q1, median, q3, high = np.quantile(total, [0, 0.25, 0.5, 0.75, 1]).tolist()
+    stats.update(mean=round(float(total.mean()), 2), median=round(median, 2), std=round(float(total.std()), 2),
+                 min=low, q1=round(q1, 2), q3=round(q3, 2), max=high)
+
+    if count > 1 and ca.std() > 0 and exam.std() > 0:
+        stats['ca_exam_correlation'] = round(float(np.corrcoef(ca, exam)[0, 1]), 4)
+    return stats
+
+
+def get_course_stats(course_id, session_id):
+    """
+    Statistics of a course's results in a session, cached until they change.
+
+    Returns:
+        dict: As for compute_course_stats; treat it as read-only
+    """
+    return _course_stats_cache.get_or_compute(
+        (course_id, session_id),
+        (course_scope(session_id, course_id),),
+        lambda: compute_course_stats(*load_course_scores(course_id, session_id))
+    )
+
+
+def get_course_stats_cache():
+    """Get the cache behind get_course_stats"""
+    return _course_stats_cache
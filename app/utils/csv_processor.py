@@ -1,8 +1,27 @@
 """CSV processing utility functions"""
+import codecs
 import csv
 import io
 from werkzeug.utils import secure_filename
 
+# Records yielded per chunk by the streaming parsers
+CSV_CHUNK_SIZE = 1000
+
+# Row errors kept per file; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Bytes read to detect the encoding, and per read afterwards
+ENCODING_SNIFF_SIZE = 64 * 1024
+
+# Byte order marks, longest first (the UTF-32 LE mark starts with the UTF-16 LE one)
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
 
 def allowed_file(filename, allowed_extensions):
     """
@@ -19,85 +38,275 @@ def allowed_file(filename, allowed_extensions):
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 
-def parse_student_csv(file_content):
+def detect_csv_encoding(head):
     """
-    Parse student records from CSV file.
-    Expected columns: Matric Number, Surname, First Name, Other Names (optional)
+    Detect the encoding of a CSV file from its first bytes.
+    
+    A byte order mark wins; otherwise UTF-8 if the bytes decode as UTF-8,
+    else Windows-1252 (what Excel on Windows saves as "CSV").
     
     Args:
-        file_content: The CSV file content (string or file object)
+        head: The first bytes of the file
     
     Returns:
-        tuple: (records, errors)
-            records: List of dicts with student data
-            errors: List of error messages
+        str: Codec name to decode the whole file with
     """
-    records = []
-    errors = []
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # A multi-byte character cut off at the end of head is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Raw stream returning already-read bytes before the rest of a stream"""
+    
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        if self.head:
+            data, self.head = self.head[:len(buffer)], self.head[len(buffer):]
+        else:
+            data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_csv_text(source):
+    """
+    Open an uploaded CSV as text without reading it all into memory.
+    
+    Args:
+        source: CSV content as str or bytes, or a binary file object such as
+            an uploaded FileStorage
+    
+    Returns:
+        A text file object decoded incrementally in the detected encoding
+    """
+    if isinstance(source, str):
+        return io.StringIO(source, newline='')
+    if isinstance(source, io.TextIOBase):
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    
+    head = source.read(ENCODING_SNIFF_SIZE)
+    raw = io.BufferedReader(_PrefixedStream(head, source), ENCODING_SNIFF_SIZE)
+    return io.TextIOWrapper(raw, encoding=detect_csv_encoding(head), errors='replace', newline='')
+
+
+def _iter_csv_chunks(source, map_columns, required, parse_row, chunk_size, errors, max_errors,
+                     missing_hint=''):
+    """
+    Shared streaming loop of the student and result parsers.
+    
+    parse_row(row, column_map, row_num) returns a record dict, or an error
+    message string for an invalid row.
+    """
+    chunk = []
+    error_count = 0
+    
+    def add_error(message):
+        nonlocal error_count
+        error_count += 1
+        if max_errors is None or error_count <= max_errors:
+            errors.append(message)
     
     try:
-        if isinstance(file_content, bytes):
-            file_content = file_content.decode('utf-8-sig')  # Handle BOM
+        reader = csv.DictReader(open_csv_text(source))
         
-        reader = csv.DictReader(io.StringIO(file_content))
-        
-        # Normalize column names
         fieldnames = reader.fieldnames
         if not fieldnames:
-            return ([], ['CSV file is empty or has no headers'])
+            add_error('CSV file is empty or has no headers')
+            return
         
-        # Map expected column names (case-insensitive)
-        column_map = {}
-        for field in fieldnames:
-            field_lower = field.lower().strip()
-            if 'matric' in field_lower:
-                column_map['matric_number'] = field
-            elif 'surname' in field_lower or 'last' in field_lower:
-                column_map['surname'] = field
-            elif 'first' in field_lower:
-                column_map['first_name'] = field
-            elif 'other' in field_lower or 'middle' in field_lower:
-                column_map['other_names'] = field
-            elif 'gender' in field_lower or 'sex' in field_lower:
-                column_map['gender'] = field
+        column_map = map_columns(fieldnames)
         
         # Validate required columns
-        required = ['matric_number', 'surname', 'first_name']
         missing = [col for col in required if col not in column_map]
         if missing:
-            return ([], [f'Missing required columns: {", ".join(missing)}'])
+            add_error(f'Missing required columns: {", ".join(missing)}{missing_hint}')
+            return
         
         for row_num, row in enumerate(reader, start=2):
             try:
-                matric = row.get(column_map['matric_number'], '').strip()
-                surname = row.get(column_map['surname'], '').strip()
-                first_name = row.get(column_map['first_name'], '').strip()
-                other_names = row.get(column_map.get('other_names', ''), '').strip() if 'other_names' in column_map else ''
-                gender = row.get(column_map.get('gender', ''), '').strip().upper() if 'gender' in column_map else ''
-                
-                if not matric:
-                    errors.append(f'Row {row_num}: Missing matric number')
-                    continue
-                if not surname:
-                    errors.append(f'Row {row_num}: Missing surname')
-                    continue
-                if not first_name:
-                    errors.append(f'Row {row_num}: Missing first name')
-                    continue
-                
-                records.append({
-                    'matric_number': matric.upper(),
-                    'surname': surname.upper(),
-                    'first_name': first_name.title(),
-                    'other_names': other_names.title() if other_names else None,
-                    'gender': gender if gender in ['M', 'F'] else None
-                })
+                record = parse_row(row, column_map, row_num)
             except Exception as e:
-                errors.append(f'Row {row_num}: {str(e)}')
+                record = f'Row {row_num}: {str(e)}'
+            if isinstance(record, str):
+                add_error(record)
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
         
     except Exception as e:
-        errors.append(f'Error parsing CSV: {str(e)}')
+        add_error(f'Error parsing CSV: {str(e)}')
+    
+    finally:
+        if max_errors is not None and error_count > max_errors:
+            errors.append(f'... and {error_count - max_errors} more errors')
+    
+    if chunk:
+        yield chunk
+
+
+def _map_student_columns(fieldnames):
+    """Map expected student column names (case-insensitive)"""
+    column_map = {}
+    for field in fieldnames:
+        field_lower = field.lower().strip()
+        if 'matric' in field_lower:
+            column_map['matric_number'] = field
+        elif 'surname' in field_lower or 'last' in field_lower:
+            column_map['surname'] = field
+        elif 'first' in field_lower:
+            column_map['first_name'] = field
+        elif 'other' in field_lower or 'middle' in field_lower:
+            column_map['other_names'] = field
+        elif 'gender' in field_lower or 'sex' in field_lower:
+            column_map['gender'] = field
+    return column_map
+
+
+def _parse_student_row(row, column_map, row_num):
+    """Validate one student row; returns a record or an error message"""
+    matric = (row.get(column_map['matric_number']) or '').strip()
+    surname = (row.get(column_map['surname']) or '').strip()
+    first_name = (row.get(column_map['first_name']) or '').strip()
+    other_names = (row.get(column_map['other_names']) or '').strip() if 'other_names' in column_map else ''
+    gender = (row.get(column_map['gender']) or '').strip().upper() if 'gender' in column_map else ''
+    
+    if not matric:
+        return f'Row {row_num}: Missing matric number'
+    if not surname:
+        return f'Row {row_num}: Missing surname'
+    if not first_name:
+        return f'Row {row_num}: Missing first name'
+    
+    return {
+        'matric_number': matric.upper(),
+        'surname': surname.upper(),
+        'first_name': first_name.title(),
+        'other_names': other_names.title() if other_names else None,
+        'gender': gender if gender in ['M', 'F'] else None
+    }
+
+
+def _map_result_columns(fieldnames):
+    """Map expected result column names (case-insensitive)"""
+    column_map = {}
+    for field in fieldnames:
+        field_lower = field.lower().strip()
+        if 'matric' in field_lower:
+            column_map['matric_number'] = field
+        elif 'ca' in field_lower or 'continuous' in field_lower or 'assessment' in field_lower:
+            column_map['ca_score'] = field
+        elif 'exam' in field_lower:
+            column_map['exam_score'] = field
+    return column_map
+
+
+def _parse_result_row(row, column_map, row_num):
+    """Validate one result row; returns a record or an error message"""
+    matric = (row.get(column_map['matric_number']) or '').strip()
+    ca_score_str = (row.get(column_map['ca_score']) or '').strip()
+    exam_score_str = (row.get(column_map['exam_score']) or '').strip()
+    
+    if not matric:
+        return f'Row {row_num}: Missing matric number'
+    
+    try:
+        ca_score = float(ca_score_str) if ca_score_str else 0
+    except ValueError:
+        return f'Row {row_num}: Invalid CA score "{ca_score_str}"'
+    
+    try:
+        exam_score = float(exam_score_str) if exam_score_str else 0
+    except ValueError:
+        return f'Row {row_num}: Invalid Exam score "{exam_score_str}"'
+    
+    # Validate score ranges
+    if ca_score < 0 or ca_score > 30:
+        return f'Row {row_num}: CA score must be between 0 and 30 (got {ca_score})'
     
+    if exam_score < 0 or exam_score > 70:
+        return f'Row {row_num}: Exam score must be between 0 and 70 (got {exam_score})'
+    
+    return {
+        'matric_number': matric.upper(),
+        'ca_score': ca_score,
+        'exam_score': exam_score,
+        'total_score': ca_score + exam_score
+    }
+
+
+def iter_student_csv(source, chunk_size=CSV_CHUNK_SIZE, errors=None, max_errors=MAX_REPORTED_ERRORS):
+    """
+    Stream validated student records from a CSV file in chunks.
+    Expected columns: Matric Number, Surname, First Name, Other Names (optional)
+    
+    The file is decoded incrementally (BOM and encoding are detected from
+    its first bytes), so memory use does not grow with the file size.
+    
+    Args:
+        source: CSV content (str or bytes) or a binary file object
+        chunk_size: Maximum records per yielded list
+        errors: List that row and header error messages are appended to
+        max_errors: Error messages kept before only counting them (None keeps all)
+    
+    Yields:
+        list: Dicts with student data
+    """
+    return _iter_csv_chunks(source, _map_student_columns, ['matric_number', 'surname', 'first_name'],
+                            _parse_student_row, chunk_size, errors if errors is not None else [], max_errors)
+
+
+def iter_results_csv(source, chunk_size=CSV_CHUNK_SIZE, errors=None, max_errors=MAX_REPORTED_ERRORS):
+    """
+    Stream validated result records from a CSV file in chunks.
+    Expected columns: Matric Number, CA Score, Exam Score
+    
+    Args:
+        source: CSV content (str or bytes) or a binary file object
+        chunk_size: Maximum records per yielded list
+        errors: List that row and header error messages are appended to
+        max_errors: Error messages kept before only counting them (None keeps all)
+    
+    Yields:
+        list: Dicts with result data
+    """
+    return _iter_csv_chunks(source, _map_result_columns, ['matric_number', 'ca_score', 'exam_score'],
+                            _parse_result_row, chunk_size, errors if errors is not None else [], max_errors,
+                            missing_hint='. Expected: Matric Number, CA Score, Exam Score')
+
+
+def parse_student_csv(file_content):
+    """
+    Parse student records from CSV file.
+    Expected columns: Matric Number, Surname, First Name, Other Names (optional)
+    
+    Args:
+        file_content: The CSV file content (string or file object)
+    
+    Returns:
+        tuple: (records, errors)
+            records: List of dicts with student data
+            errors: List of error messages
+    """
+    errors = []
+    records = [record for chunk in iter_student_csv(file_content, errors=errors, max_errors=None)
+               for record in chunk]
     return (records, errors)
 
 
@@ -114,79 +323,9 @@ def parse_results_csv(file_content):
             records: List of dicts with result data
             errors: List of error messages
     """
-    records = []
     errors = []
-    
-    try:
-        if isinstance(file_content, bytes):
-            file_content = file_content.decode('utf-8-sig')
-        
-        reader = csv.DictReader(io.StringIO(file_content))
-        
-        fieldnames = reader.fieldnames
-        if not fieldnames:
-            return ([], ['CSV file is empty or has no headers'])
-        
-        # Map expected column names (case-insensitive)
-        column_map = {}
-        for field in fieldnames:
-            field_lower = field.lower().strip()
-            if 'matric' in field_lower:
-                column_map['matric_number'] = field
-            elif 'ca' in field_lower or 'continuous' in field_lower or 'assessment' in field_lower:
-                column_map['ca_score'] = field
-            elif 'exam' in field_lower:
-                column_map['exam_score'] = field
-        
-        # Validate required columns
-        required = ['matric_number', 'ca_score', 'exam_score']
-        missing = [col for col in required if col not in column_map]
-        if missing:
-            return ([], [f'Missing required columns: {", ".join(missing)}. Expected: Matric Number, CA Score, Exam Score'])
-        
-        for row_num, row in enumerate(reader, start=2):
-            try:
-                matric = row.get(column_map['matric_number'], '').strip()
-                ca_score_str = row.get(column_map['ca_score'], '').strip()
-                exam_score_str = row.get(column_map['exam_score'], '').strip()
-                
-                if not matric:
-                    errors.append(f'Row {row_num}: Missing matric number')
-                    continue
-                
-                try:
-                    ca_score = float(ca_score_str) if ca_score_str else 0
-                except ValueError:
-                    errors.append(f'Row {row_num}: Invalid CA score "{ca_score_str}"')
-                    continue
-                
-                try:
-                    exam_score = float(exam_score_str) if exam_score_str else 0
-                except ValueError:
-                    errors.append(f'Row {row_num}: Invalid Exam score "{exam_score_str}"')
-                    continue
-                
-                # Validate score ranges
-                if ca_score < 0 or ca_score > 30:
-                    errors.append(f'Row {row_num}: CA score must be between 0 and 30 (got {ca_score})')
-                    continue
-                
-                if exam_score < 0 or exam_score > 70:
-                    errors.append(f'Row {row_num}: Exam score must be between 0 and 70 (got {exam_score})')
-                    continue
-                
-                records.append({
-                    'matric_number': matric.upper(),
-                    'ca_score': ca_score,
-                    'exam_score': exam_score,
-                    'total_score': ca_score + exam_score
-                })
-            except Exception as e:
-                errors.append(f'Row {row_num}: {str(e)}')
-        
-    except Exception as e:
-        errors.append(f'Error parsing CSV: {str(e)}')
-    
+    records = [record for chunk in iter_results_csv(file_content, errors=errors, max_errors=None)
+               for record in chunk]
     return (records, errors)
 
 
@@ -0,0 +1,136 @@
+"""Dashboard counters and breakdowns, computed with aggregates and cached briefly"""
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app import db
+from app.models import Student, Course, Result, User
+from app.utils.revisions import GLOBAL_SCOPE, get_revisions
+
+
+def compute_dashboard_stats(level=None, program=None, breakdowns=False):
+    """
+    Dashboard statistics, optionally limited to one level and program.
+
+    Every counter is a COUNT in a single statement; no student, course or
+    result rows are loaded.
+
+    Args:
+        level: Only count this level's students, courses and results
+        program: Only count this program's students, courses and results
+        breakdowns: Also count students by program and by level
+
+    Returns:
+        dict: 'stats' (total_students, total_courses, total_results,
+            total_users), 'students_by_program' and 'students_by_level'
+            as lists of (value, count)
+    """
+    student_filters = []
+    course_filters = [Course.is_active == True]
+    if level:
+        student_filters.append(Student.level == level)
+        course_filters.append(Course.level == level)
+    if program:
+        student_filters.append(Student.program == program)
+        course_filters.append(Course.program == program)
+
+    students = select(func.count(Student.id)).where(*student_filters)
+    courses = select(func.count(Course.id)).where(*course_filters)
+    results = select(func.count(Result.id))
+    if student_filters:
+        results = results.join(Student, Result.student_id == Student.id).where(*student_filters)
+    users = select(func.count(User.id)).where(User.is_active == True)
+
+    row = db.session.execute(select(
+        students.scalar_subquery(), courses.scalar_subquery(),
+        results.scalar_subquery(), users.scalar_subquery()
+    )).one()
+    stats = {
+        'total_students': row[0],
+        'total_courses': row[1],
+        'total_results': row[2],
+        'total_users': row[3]
+    }
+
+    students_by_program = []
+    students_by_level = []
+    if breakdowns:
+        students_by_program = [tuple(r) for r in db.session.execute(
+            select(Student.program, func.count(Student.id)).where(*student_filters).group_by(Student.program)
+        )]
+        students_by_level = [tuple(r) for r in db.session.execute(
+            select(Student.level, func.count(Student.id)).where(*student_filters)
+            .group_by(Student.level).order_by(Student.level)
+        )]
+
+    return {
+        'stats': stats,
+        'students_by_program': students_by_program,
+        'students_by_level': students_by_level
+    }
+
+
+class DashboardStatsCache:
+    """
+    Dashboard statistics per (level, program, breakdowns, session).
+
+    An entry is reused until its TTL runs out or anything it counts is
+    changed (the global revision moves on), so a visit normally costs one
+    primary-key lookup however many students are enrolled.
+    """
+
+    def __init__(self, ttl=timedelta(seconds=60)):
+        self.ttl = ttl
+        self._cache = {}   # key -> (revision, expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, app):
+        """Take settings from the app config"""
+        self.ttl = app.config.get('DASHBOARD_STATS_TTL', self.ttl)
+        self.invalidate()
+
+    def get(self, session_id=None, level=None, program=None, breakdowns=False):
+        """
+        Cached statistics, recomputed when stale.
+
+        Args:
+            session_id: Current session, part of the cache key
+            level, program, breakdowns: As for compute_dashboard_stats
+
+        Returns:
+            dict: As returned by compute_dashboard_stats
+        """
+        key = (session_id, level, program, breakdowns)
+        revision = get_revisions(GLOBAL_SCOPE)[GLOBAL_SCOPE]
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == revision and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = compute_dashboard_stats(level, program, breakdowns)
+        with self._lock:
+            self._cache[key] = (revision, now + self.ttl, value)
+        return value
+
+    def invalidate(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+
+_dashboard_stats = DashboardStatsCache()
+
+
+def init_dashboard_stats(app):
+    """Configure the shared dashboard statistics cache from the app config"""
+    _dashboard_stats.configure(app)
+
+
+def get_dashboard_stats():
+    """Get the shared dashboard statistics cache"""
+    return _dashboard_stats
@@ -0,0 +1,333 @@
+"""IP geolocation with a persistent cache and background resolution"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+import requests
+from flask import has_app_context
+from app import db
+from app.models import IpLocation, ResultAlteration
+from app.utils.ip_ranges import IpRangeDatabase
+
+# Stored on alterations until the background worker resolves the IP
+PENDING_LOCATION = 'Pending lookup'
+UNKNOWN_LOCATION = ('Unknown', None, None)
+
+
+class GeoResolver:
+    """Turns an IP address into a location. Subclass to plug in a backend."""
+
+    def resolve(self, ip_address):
+        """
+        Look up an IP address.
+
+        Returns:
+            tuple: (location, latitude, longitude), or None if the lookup failed
+        """
+        raise NotImplementedError
+
+
+class IpApiResolver(GeoResolver):
+    """Resolver using ip-api.com (free, no API key required, 45 requests/minute)"""
+
+    def __init__(self, timeout=2):
+        self.timeout = timeout
+
+    def resolve(self, ip_address):
+        try:
+            response = requests.get(f'http://ip-api.com/json/{ip_address}', timeout=self.timeout)
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('status') == 'success':
+                    location_parts = [p for p in [data.get('city', ''), data.get('regionName', ''),
+                                                  data.get('country', '')] if p]
+                    location = ', '.join(location_parts) if location_parts else 'Unknown'
+                    return location, data.get('lat'), data.get('lon')
+        except Exception as e:
+            print(f"Error getting location for IP {ip_address}: {e}")
+        return None
+
+
+class StaticResolver(GeoResolver):
+    """Resolver backed by a dict of known addresses, for tests and offline use"""
+
+    def __init__(self, locations=None):
+        self.locations = dict(locations or {})
+        self.calls = []
+
+    def resolve(self, ip_address):
+        self.calls.append(ip_address)
+        return self.locations.get(ip_address)
+
+
+class GeoLocator:
+    """
+    Non-blocking IP geolocation.
+
+    Lookups are answered from the offline IP-range database when one is
+    installed, otherwise from an in-memory LRU, then from the ip_locations
+    table. Misses return a pending placeholder straight away and are queued
+    for a background worker, which resolves them within the resolver's rate
+    limit, stores them with a TTL and fills in the location of any result
+    alterations that were recorded while the lookup was pending. The queue
+    holds at most queue_size addresses; misses beyond that are answered as
+    Unknown and not queued, so a burst of new addresses cannot grow it
+    without bound.
+    """
+
+    def __init__(self, resolver=None, cache_size=4096, ttl=timedelta(days=30),
+                 failure_ttl=timedelta(hours=1), rate_limit=45, background=True,
+                 online=True, database_path=None, queue_size=1024):
+        self.resolver = resolver or IpApiResolver()
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.rate_limit = rate_limit
+        self.background = background
+        self.online = online
+        self.database_path = database_path
+        self.queue_size = queue_size
+        self.dropped = 0               # misses not queued because the queue was full
+        self.app = None
+        self._database = None
+        self._database_mtime = None
+        self._cache = OrderedDict()    # ip -> (location, latitude, longitude, expires_at)
+        self._queue = OrderedDict()    # ip -> None, de-duplicated FIFO of misses
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._calls = deque()          # resolver call times for rate limiting
+        self._worker = None
+
+    def configure(self, app):
+        """Bind to an app and read the GEOLOCATION_* settings"""
+        self.app = app
+        self.cache_size = app.config.get('GEOLOCATION_CACHE_SIZE', self.cache_size)
+        self.ttl = app.config.get('GEOLOCATION_TTL', self.ttl)
+        self.failure_ttl = app.config.get('GEOLOCATION_FAILURE_TTL', self.failure_ttl)
+        self.rate_limit = app.config.get('GEOLOCATION_RATE_LIMIT', self.rate_limit)
+        self.background = app.config.get('GEOLOCATION_BACKGROUND', self.background)
+        self.online = app.config.get('GEOLOCATION_ONLINE_LOOKUPS', self.online)
+        self.database_path = app.config.get('GEOIP_DATABASE_PATH', self.database_path)
+        self.queue_size = app.config.get('GEOLOCATION_QUEUE_SIZE', self.queue_size)
+        self.dropped = 0
+        with self._lock:
+            self._cache.clear()
+            self._queue.clear()
+            self._close_database()
+            self._database_mtime = None
+
+    def cached(self, ip_address):
+        """Return the location from memory only, or None"""
+        with self._lock:
+            entry = self._cache.get(ip_address)
+            if entry is None:
+                return None
+            if entry[3] <= datetime.utcnow():
+                del self._cache[ip_address]
+                return None
+            self._cache.move_to_end(ip_address)
+            return entry[:3]
+
+    def lookup(self, ip_address):
+        """
+        Get the location of an IP address without waiting on the network.
+
+        Returns:
+            tuple: (location, latitude, longitude); PENDING_LOCATION with no
+                coordinates while the address is being resolved
+        """
+        database = self.database()
+        if database is not None:
+            try:
+                location = database.lookup(ip_address)
+            except ValueError:
+                # Closed by a reload in another thread; read the new file instead
+                database = self.database()
+                location = database.lookup(ip_address) if database is not None else None
+            if location is not None:
+                return location
+
+        location = self.cached(ip_address)
+        if location is not None:
+            return location
+        if not self.online:
+            return UNKNOWN_LOCATION
+
+        row = IpLocation.query.filter_by(ip_address=ip_address).first()
+        if row is not None:
+            location = (row.location, row.latitude, row.longitude)
+            if row.expires_at > datetime.utcnow():
+                self._remember(ip_address, location, row.expires_at)
+            else:
+                # Serve the stale entry while it is refreshed
+                self.enqueue(ip_address)
+            return location
+
+        if not self.enqueue(ip_address):
+            return UNKNOWN_LOCATION
+        return (PENDING_LOCATION, None, None)
+
+    def _close_database(self):
+        """Unmap the open IP-range database, if any (call with the lock held)"""
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+
+    def database(self):
+        """
+        Get the offline IP-range database, reopening it after a rebuild.
+
+        The previous mapping is closed when the file is replaced, so a
+        long-running process keeps one mapping however often it is rebuilt.
+
+        Returns:
+            IpRangeDatabase or None if no database is installed
+        """
+        try:
+            mtime = os.stat(self.database_path).st_mtime_ns if self.database_path else None
+        except OSError:
+            mtime = None
+        if mtime != self._database_mtime:
+            with self._lock:
+                if mtime != self._database_mtime:
+                    self._close_database()
+                    if mtime is not None:
+                        try:
+                            self._database = IpRangeDatabase(self.database_path)
+                        except (OSError, ValueError) as e:
+                            print(f"Error opening IP database {self.database_path}: {e}")
+                    self._database_mtime = mtime
+        return self._database
+
+    def enqueue(self, ip_address):
+        """
+        Queue an address for resolution.
+
+        Returns:
+            bool: False if the queue is full and the address was dropped
+        """
+        with self._lock:
+            if ip_address not in self._queue and len(self._queue) >= self.queue_size:
+                self.dropped += 1
+                return False
+            self._queue[ip_address] = None
+        if self.background:
+            self._start_worker()
+            self._wakeup.set()
+        return True
+
+    def process_pending(self, limit=None):
+        """
+        Resolve queued addresses in the calling thread.
+
+        Used by the background worker, and directly by tests and scripts when
+        GEOLOCATION_BACKGROUND is off.
+
+        Returns:
+            int: Number of addresses resolved
+        """
+        if not has_app_context():
+            with self.app.app_context():
+                return self.process_pending(limit)
+
+        processed = 0
+        while limit is None or processed < limit:
+            with self._lock:
+                if not self._queue:
+                    break
+                ip_address, _ = self._queue.popitem(last=False)
+            self._throttle()
+            self._store(ip_address, self.resolver.resolve(ip_address))
+            processed += 1
+        return processed
+
+    def _store(self, ip_address, location):
+        """Save a lookup result and fill in alterations waiting on it"""
+        now = datetime.utcnow()
+        is_resolved = location is not None
+        if not is_resolved:
+            location = UNKNOWN_LOCATION
+        expires_at = now + (self.ttl if is_resolved else self.failure_ttl)
+
+        try:
+            row = IpLocation.query.filter_by(ip_address=ip_address).first()
+            if row is None:
+                row = IpLocation(ip_address=ip_address)
+                db.session.add(row)
+            row.location, row.latitude, row.longitude = location
+            row.is_resolved = is_resolved
+            row.expires_at = expires_at
+
+            ResultAlteration.query.filter_by(
+                ip_address=ip_address, location=PENDING_LOCATION
+            ).update({
+                'location': location[0],
+                'latitude': location[1],
+                'longitude': location[2]
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving location for IP {ip_address}: {e}")
+
+        self._remember(ip_address, location, expires_at)
+
+    def _remember(self, ip_address, location, expires_at):
+        with self._lock:
+            self._cache[ip_address] = (*location, expires_at)
+            self._cache.move_to_end(ip_address)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _throttle(self):
+        """Sleep until another resolver call fits in the per-minute limit"""
+        if not self.rate_limit:
+            return
+        while True:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= 60:
+                self._calls.popleft()
+            if len(self._calls) < self.rate_limit:
+                self._calls.append(now)
+                return
+            time.sleep(60 - (now - self._calls[0]))
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._run, name='geolocation-worker', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                self.process_pending()
+            except Exception as e:
+                print(f"Geolocation worker error: {e}")
+
+
+_locator = GeoLocator()
+
+
+def init_geolocation(app):
+    """Configure the shared locator from the app config"""
+    _locator.configure(app)
+
+
+def get_geo_locator():
+    """Get the shared locator"""
+    return _locator
+
+
+def set_geo_resolver(resolver):
+    """Replace the backend used to resolve cache misses"""
+    _locator.resolver = resolver
+
+
+def lookup_location(ip_address):
+    """Get (location, latitude, longitude) for an IP address without blocking"""
+    return _locator.lookup(ip_address)
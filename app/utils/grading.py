@@ -1,8 +1,189 @@
 """Grading utility functions"""
+import threading
+from bisect import bisect_right
+import numpy as np
 from app.models import GradingSystem
+from app.utils.revisions import GRADING_SCOPE, current_revision
 from flask_login import current_user
 
 
+# Default grading used when a degree type has no rows in the database.
+# (grade, min_score, grade_point) in ascending order of min_score.
+DEFAULT_GRADING = [
+    ('F', 0, 0),
+    ('E', 40, 1),
+    ('D', 45, 2),
+    ('C', 50, 3),
+    ('B', 60, 4),
+    ('A', 70, 5),
+]
+
+# Process-wide cache of compiled grading tables, keyed by degree type, each
+# tagged with the grading revision it was loaded at
+_grading_tables = {}
+_grading_lock = threading.Lock()
+
+
+class GradingTable:
+    """
+    Grading rows for one degree type compiled into sorted breakpoint arrays.
+    
+    Scores are looked up by bisecting the sorted min_score array, so grading
+    a score costs O(log n) and never touches the database.
+    """
+    
+    def __init__(self, rows, contiguous=False):
+        """
+        Args:
+            rows: Iterable of (grade, min_score, max_score, grade_point)
+            contiguous: True if each band runs up to the next band's
+                min_score (default grading), False to honour max_score
+        """
+        rows = sorted(rows, key=lambda r: r[1])
+        self.grades = [r[0] for r in rows]
+        self.min_scores = [r[1] for r in rows]
+        self.max_scores = [r[2] for r in rows]
+        self.grade_points = [r[3] for r in rows]
+        self.contiguous = contiguous
+        
+        # Array copies for vectorized lookups
+        self._min_array = np.array(self.min_scores, dtype=float)
+        self._max_array = np.array([np.inf if m is None else m for m in self.max_scores], dtype=float)
+        self._grade_array = np.array(self.grades, dtype=object)
+        self._point_array = np.array(self.grade_points, dtype=int)
+    
+    @classmethod
+    def from_grading_rows(cls, grading):
+        """Compile GradingSystem rows"""
+        return cls([(g.grade, g.min_score, g.max_score, g.grade_point) for g in grading])
+    
+    @classmethod
+    def default(cls):
+        """Compile the built-in default grading"""
+        return cls([(grade, min_score, None, points) for grade, min_score, points in DEFAULT_GRADING],
+                   contiguous=True)
+    
+    def with_boundaries(self, boundaries):
+        """
+        Copy of the table with some grades' lower boundaries moved.
+
+        For tables that honour max_score, the band below each moved grade
+        is stretched or shrunk to end one mark under the new boundary.
+
+        Args:
+            boundaries: Dict of grade -> new min_score, e.g. {'C': 48}
+
+        Returns:
+            GradingTable: The adjusted table
+
+        Raises:
+            ValueError: If a grade is unknown or the boundaries would no
+                longer be in ascending grade order
+        """
+        unknown = set(boundaries) - set(self.grades)
+        if unknown:
+            raise ValueError(f"Unknown grade(s): {', '.join(sorted(unknown))}")
+
+        min_scores = [boundaries.get(grade, low) for grade, low in zip(self.grades, self.min_scores)]
+        if any(a >= b for a, b in zip(min_scores, min_scores[1:])):
+            raise ValueError('Grade boundaries must stay in ascending order')
+
+        max_scores = list(self.max_scores)
+        for i, grade in enumerate(self.grades[1:], start=1):
+            if grade in boundaries and max_scores[i - 1] is not None:
+                max_scores[i - 1] = min_scores[i] - 1
+
+        return GradingTable(zip(self.grades, min_scores, max_scores, self.grade_points),
+                            contiguous=self.contiguous)
+
+    def lookup(self, score):
+        """
+        Get grade and grade point for a score.
+        
+        Returns:
+            tuple: (grade, grade_point), ('F', 0) if no band matches
+        """
+        i = bisect_right(self.min_scores, score) - 1
+        if i < 0:
+            # Below the lowest band
+            if self.contiguous:
+                return (self.grades[0], self.grade_points[0])
+            return ('F', 0)
+        if self.contiguous or score <= self.max_scores[i]:
+            return (self.grades[i], self.grade_points[i])
+        return ('F', 0)
+    
+    def lookup_many(self, scores):
+        """
+        Get grades and grade points for many scores in one vectorized pass.
+        
+        Args:
+            scores: Sequence or NumPy array of total scores
+        
+        Returns:
+            tuple: (grades, grade_points) as parallel NumPy arrays
+        """
+        scores = np.asarray(scores, dtype=float)
+        index = np.searchsorted(self._min_array, scores, side='right') - 1
+        
+        if self.contiguous:
+            index = np.clip(index, 0, None)
+            return (self._grade_array[index], self._point_array[index])
+        
+        matched = index >= 0
+        index = np.clip(index, 0, None)
+        matched &= scores <= self._max_array[index]
+        
+        grades = np.where(matched, self._grade_array[index], 'F').astype(object)
+        grade_points = np.where(matched, self._point_array[index], 0)
+        return (grades, grade_points)
+
+
+def get_grading_table(degree_type='BSc'):
+    """
+    Get the compiled grading table for a degree type, loading it from the
+    database on first use and again once the grading revision moves on
+    (so changes saved by another worker process are picked up).
+    
+    Args:
+        degree_type: The degree type (BSc, PGD, MSc, PhD)
+    
+    Returns:
+        GradingTable: The compiled grading table
+    """
+    revision = current_revision(GRADING_SCOPE)
+    entry = _grading_tables.get(degree_type)
+    if entry is not None and (revision is None or entry[0] == revision):
+        return entry[1]
+    
+    with _grading_lock:
+        entry = _grading_tables.get(degree_type)
+        if entry is None or (revision is not None and entry[0] != revision):
+            grading = GradingSystem.query.filter_by(degree_type=degree_type).all()
+            if grading:
+                table = GradingTable.from_grading_rows(grading)
+            else:
+                table = GradingTable.default()
+            entry = _grading_tables[degree_type] = (revision, table)
+    return entry[1]
+
+
+def invalidate_grading_cache(degree_type=None):
+    """
+    Drop compiled grading tables so they are reloaded on next use.
+    Tables are also reloaded when the grading revision moves on; call this
+    when grading rows change outside the revision hooks.
+    
+    Args:
+        degree_type: The degree type to invalidate, or None for all
+    """
+    with _grading_lock:
+        if degree_type is None:
+            _grading_tables.clear()
+        else:
+            _grading_tables.pop(degree_type, None)
+
+
 def get_accessible_filters():
     """
     Get filters based on user access level.
@@ -28,30 +209,22 @@ def get_grade_info(score, degree_type='BSc'):
     Returns:
         tuple: (grade, grade_point) e.g., ('A', 5)
     """
-    grading = GradingSystem.query.filter_by(degree_type=degree_type).all()
-    
-    # If no custom grading exists, use default
-    if not grading:
-        if score >= 70:
-            return ('A', 5)
-        elif score >= 60:
-            return ('B', 4)
-        elif score >= 50:
-            return ('C', 3)
-        elif score >= 45:
-            return ('D', 2)
-        elif score >= 40:
-            return ('E', 1)
-        else:
-            return ('F', 0)
+    return get_grading_table(degree_type).lookup(score)
+
+
+def get_grade_info_bulk(scores, degree_type='BSc'):
+    """
+    Get grades and grade points for a whole column of scores at once.
     
-    # Use custom grading from database
-    for grade in grading:
-        if grade.min_score <= score <= grade.max_score:
-            return (grade.grade, grade.grade_point)
+    Args:
+        scores: Sequence or NumPy array of total scores (0-100)
+        degree_type: The degree type (BSc, PGD, MSc, PhD)
     
-    # Default fallback
-    return ('F', 0)
+    Returns:
+        tuple: (grades, grade_points) as parallel NumPy arrays,
+            e.g. (array(['A', 'C'], dtype=object), array([5, 3]))
+    """
+    return get_grading_table(degree_type).lookup_many(scores)
 
 
 def calculate_gpa(results):
@@ -213,81 +386,105 @@ def validate_scores(ca_score, exam_score):
     return (True, None)
 
 
-def process_carryovers_for_student(student_matric, session_id, db):
-    """
-    Process failed courses and create carryover records for a student.
-    Called after results are uploaded.
-    
-    Args:
-        student_matric: The student's matric number
-        session_id: The current session ID
-        db: Database session
+def reconcile_course_carryovers(course_id, session_id, matrics=None):
     """
-    from app.models import Student, Result, Carryover, Course
+    Bring the carryover records for a course in line with its results for a session.
     
-    # Get all students with this matric number in the given session
-    students = Student.query.filter_by(matric_number=student_matric, session_id=session_id).all()
+    - A failed result creates a carryover for the session if there is none
+    - A passing result clears the student's first open carryover for the course
+    - A carryover cleared by a result that has since failed is reopened
+    - Results of students retaking a course carried over from an earlier
+      session are flagged is_carryover
     
-    for student in students:
-        # Get all failed results for this student in this session
-        failed_results = Result.query.filter_by(
-            student_id=student.id,
-            session_id=session_id
-        ).filter(Result.grade == 'F').all()
-        
-        for result in failed_results:
-            # Check if carryover already exists
-            existing = Carryover.query.filter_by(
-                student_matric=student_matric,
-                course_id=result.course_id,
-                original_session_id=session_id
-            ).first()
-            
-            if not existing:
-                # Create new carryover record
-                carryover = Carryover(
-                    student_matric=student_matric,
-                    course_id=result.course_id,
-                    original_session_id=session_id,
-                    original_level=student.level,
-                    is_cleared=False
-                )
-                db.session.add(carryover)
-    
-    db.session.commit()
-
-
-def check_and_clear_carryovers(student_matric, course_id, session_id, result_id, db):
-    """
-    Check if a newly uploaded result clears any carryover.
+    Results and carryovers are loaded with one query each and the changes
+    are applied with bulk statements. Nothing is committed; the caller
+    commits together with the result changes.
     
     Args:
-        student_matric: The student's matric number
         course_id: The course ID
-        session_id: The session when the result was uploaded
-        result_id: The result ID that might clear the carryover
-        db: Database session
-    """
-    from app.models import Carryover, Result
+        session_id: The session the results belong to
+        matrics: Optional matric numbers to limit reconciliation to
     
-    # Get the result
-    result = Result.query.get(result_id)
-    if not result or result.grade == 'F':
-        return  # No clearing if failed again
-    
-    # Find any uncleared carryover for this course
-    carryover = Carryover.query.filter_by(
-        student_matric=student_matric,
-        course_id=course_id,
-        is_cleared=False
-    ).first()
+    Returns:
+        dict: {'created': count, 'cleared': count, 'reopened': count}
+    """
+    from datetime import datetime
+    from sqlalchemy import insert, update
+    from app import db
+    from app.models import Student, Result, Carryover
+    
+    results_query = db.session.query(
+        Result.id, Result.grade, Result.is_carryover, Student.matric_number, Student.level
+    ).join(Student, Result.student_id == Student.id).filter(
+        Result.course_id == course_id,
+        Result.session_id == session_id
+    )
+    carryovers_query = db.session.query(
+        Carryover.id, Carryover.student_matric, Carryover.original_session_id,
+        Carryover.is_cleared, Carryover.cleared_session_id, Carryover.cleared_result_id
+    ).filter(Carryover.course_id == course_id)
+    if matrics is not None:
+        matrics = list(matrics)
+        results_query = results_query.filter(Student.matric_number.in_(matrics))
+        carryovers_query = carryovers_query.filter(Carryover.student_matric.in_(matrics))
+    
+    results = results_query.all()
+    has_session_carryover = set()
+    open_carryovers = {}       # matric -> first open carryover ID
+    cleared_by_result = {}     # result ID -> carryover IDs it cleared
+    retaking = set()           # matrics with a carryover from an earlier session still due this session
+    for carryover in carryovers_query.order_by(Carryover.id).all():
+        if carryover.original_session_id == session_id:
+            has_session_carryover.add(carryover.student_matric)
+        elif not carryover.is_cleared or carryover.cleared_session_id == session_id:
+            retaking.add(carryover.student_matric)
+        if not carryover.is_cleared:
+            open_carryovers.setdefault(carryover.student_matric, carryover.id)
+        elif carryover.cleared_result_id is not None:
+            cleared_by_result.setdefault(carryover.cleared_result_id, []).append(carryover.id)
+    
+    now = datetime.utcnow()
+    inserts = []
+    changes = []
+    flags = []
+    summary = {'created': 0, 'cleared': 0, 'reopened': 0}
     
-    if carryover:
-        # Clear the carryover
-        carryover.is_cleared = True
-        carryover.cleared_session_id = session_id
-        carryover.cleared_result_id = result_id
-        db.session.commit()
+    for result in results:
+        is_carryover = result.matric_number in retaking
+        if bool(result.is_carryover) != is_carryover:
+            flags.append({'id': result.id, 'is_carryover': is_carryover})
+        
+        if result.grade == 'F':
+            if result.matric_number not in has_session_carryover:
+                inserts.append({
+                    'student_matric': result.matric_number,
+                    'course_id': course_id,
+                    'original_session_id': session_id,
+                    'original_level': result.level,
+                    'is_cleared': False,
+                    'created_at': now,
+                    'updated_at': now
+                })
+                has_session_carryover.add(result.matric_number)
+            for carryover_id in cleared_by_result.get(result.id, []):
+                changes.append({'id': carryover_id, 'is_cleared': False, 'cleared_session_id': None,
+                                'cleared_result_id': None, 'updated_at': now})
+                summary['reopened'] += 1
+        elif result.matric_number in open_carryovers:
+            changes.append({'id': open_carryovers.pop(result.matric_number), 'is_cleared': True,
+                            'cleared_session_id': session_id, 'cleared_result_id': result.id,
+                            'updated_at': now})
+            summary['cleared'] += 1
+    
+    if inserts:
+        db.session.execute(insert(Carryover), inserts)
+        summary['created'] = len(inserts)
+    if changes:
+        db.session.execute(update(Carryover), changes)
+    if flags:
+        db.session.execute(update(Result), flags)
+    
+    return summary
 
 
 def get_outstanding_carryovers(student_matric):
@@ -0,0 +1,314 @@
+"""Set-based ingestion of uploaded records"""
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import insert, update
+from app import db
+from app.models import Student, Result, UploadLog
+from app.utils.grading import get_grade_info_bulk, reconcile_course_carryovers
+from app.utils.csv_processor import iter_results_csv, CSV_CHUNK_SIZE
+from app.utils.academic_history import refresh_academic_history
+from app.utils.audit import get_alteration_recorder
+
+# Student columns written from a roster record, with their maximum lengths
+ROSTER_COLUMNS = {
+    'matric_number': Student.matric_number.type.length,
+    'surname': Student.surname.type.length,
+    'first_name': Student.first_name.type.length,
+    'other_names': Student.other_names.type.length,
+    'gender': Student.gender.type.length
+}
+
+# Unmatched matric numbers kept for the upload summary; the rest are only counted
+MAX_REPORTED_NOT_FOUND = 50
+
+
+def ingest_course_results(records, course, session_id, uploaded_by, source='CSV upload'):
+    """
+    Apply parsed result records for one course using set-based queries.
+
+    Students and existing results are prefetched with one IN-query each,
+    inserts and updates are worked out in memory and then written with bulk
+    INSERT/UPDATE statements. Carryovers are left to
+    reconcile_course_carryovers, which the caller runs once the results are
+    written. Nothing is committed; the caller commits once so the whole
+    upload is a single transaction.
+
+    Args:
+        records: List of dicts with matric_number, ca_score, exam_score, total_score
+        course: The Course the results belong to
+        session_id: The academic session ID
+        uploaded_by: ID of the user uploading the results
+        source: Label used in alteration reasons, e.g. 'CSV upload'
+
+    Returns:
+        dict: {
+            'added': number of results created,
+            'updated': number of results updated,
+            'failed': number of records not applied,
+            'not_found': matric numbers with no matching student,
+            'matrics': matric numbers whose results were written,
+            'alterations': list of dicts ready for log_result_alteration
+        }
+    """
+    summary = {'added': 0, 'updated': 0, 'failed': 0, 'not_found': [], 'matrics': [], 'alterations': []}
+    if not records:
+        return summary
+
+    matrics = list(dict.fromkeys(record['matric_number'] for record in records))
+
+    # 1. Students registered for this course in the session
+    students = {
+        s.matric_number: s for s in Student.query.filter(
+            Student.matric_number.in_(matrics),
+            Student.session_id == session_id,
+            Student.level == course.level,
+            Student.program == course.program
+        ).all()
+    }
+
+    # 2. Existing results for those students
+    existing = {}
+    if students:
+        rows = db.session.query(
+            Result.id, Result.student_id, Result.ca_score, Result.exam_score,
+            Result.total_score, Result.grade
+        ).filter(
+            Result.course_id == course.id,
+            Result.session_id == session_id,
+            Result.student_id.in_([s.id for s in students.values()])
+        ).all()
+        existing = {row.student_id: dict(row._mapping) for row in rows}
+
+    grades, grade_points = get_grade_info_bulk(
+        [record['total_score'] for record in records], course.degree_type or 'BSc'
+    )
+
+    now = datetime.utcnow()
+    inserts = {}   # student_id -> row for a new result
+    updates = {}   # result_id -> row for an existing result
+
+    for record, grade, grade_point in zip(records, grades.tolist(), grade_points.tolist()):
+        student = students.get(record['matric_number'])
+        if not student:
+            summary['not_found'].append(record['matric_number'])
+            summary['failed'] += 1
+            continue
+
+        values = {
+            'ca_score': record['ca_score'],
+            'exam_score': record['exam_score'],
+            'total_score': record['total_score'],
+            'grade': grade,
+            'grade_point': grade_point,
+            'uploaded_by': uploaded_by,
+            'updated_at': now
+        }
+        new_result = SimpleNamespace(ca_score=values['ca_score'], exam_score=values['exam_score'],
+                                     total_score=values['total_score'], grade=grade)
+
+        # A result already in the database or earlier in this file is an update
+        current = existing.get(student.id) or inserts.get(student.id)
+        if current is not None:
+            if (current['ca_score'] != values['ca_score'] or current['exam_score'] != values['exam_score'] or
+                    current['total_score'] != values['total_score'] or current['grade'] != grade):
+                summary['alterations'].append({
+                    'student': student,
+                    'alteration_type': 'UPDATE',
+                    'old_result': SimpleNamespace(ca_score=current['ca_score'], exam_score=current['exam_score'],
+                                                  total_score=current['total_score'], grade=current['grade']),
+                    'new_result': new_result,
+                    'reason': f'{source} update'
+                })
+            current.update(values)
+            if student.id in existing:
+                updates[current['id']] = current
+            summary['updated'] += 1
+        else:
+            inserts[student.id] = dict(values, student_id=student.id, course_id=course.id,
+                                       session_id=session_id, created_at=now)
+            summary['alterations'].append({
+                'student': student,
+                'alteration_type': 'CREATE',
+                'old_result': None,
+                'new_result': new_result,
+                'reason': f'{source} creation'
+            })
+            summary['added'] += 1
+
+    # Apply inserts, then updates
+    result_ids = {student_id: row['id'] for student_id, row in existing.items()}
+    if inserts:
+        inserted = db.session.execute(
+            insert(Result).returning(Result.id, Result.student_id),
+            list(inserts.values())
+        ).all()
+        result_ids.update({row.student_id: row.id for row in inserted})
+
+    if updates:
+        db.session.execute(update(Result), [
+            {key: row[key] for key in ('id', 'ca_score', 'exam_score', 'total_score', 'grade',
+                                       'grade_point', 'uploaded_by', 'updated_at')}
+            for row in updates.values()
+        ])
+
+    for alteration in summary['alterations']:
+        alteration['result_id'] = result_ids[alteration['student'].id]
+    summary['matrics'] = [s.matric_number for s in students.values() if s.id in result_ids]
+
+    return summary
+
+
+def ingest_results_csv(source, course, session, uploaded_by, chunk_size=CSV_CHUNK_SIZE, errors=None,
+                       progress=None):
+    """
+    Stream a results CSV into the database chunk by chunk.
+
+    Each chunk of parsed records is applied with ingest_course_results and
+    its alterations and academic history are written straight away, so
+    memory stays flat however large the file is. Carryovers for the course
+    are reconciled once at the end. Nothing is committed; the caller
+    commits once so the whole file is a single transaction.
+
+    Args:
+        source: The CSV content or a binary file object (e.g. an uploaded file)
+        course: The Course the results belong to
+        session: The AcademicSession the results belong to
+        uploaded_by: ID of the user uploading the results
+        chunk_size: Records parsed and written per batch
+        errors: List that CSV row errors are appended to
+        progress: Optional callable given the running totals after each chunk
+
+    Returns:
+        dict: {
+            'records': number of valid records in the file,
+            'added', 'updated', 'failed': totals as for ingest_course_results,
+            'not_found': up to MAX_REPORTED_NOT_FOUND unmatched matric numbers
+        }
+    """
+    totals = {'records': 0, 'added': 0, 'updated': 0, 'failed': 0, 'not_found': []}
+    recorder = get_alteration_recorder()
+
+    for records in iter_results_csv(source, chunk_size, errors):
+        summary = ingest_course_results(records, course, session.id, uploaded_by)
+
+        for alteration in summary['alterations']:
+            recorder.record(course=course, session_name=session.session_name, **alteration)
+        recorder.flush(db.session)
+
+        # Update GPA/CGPA history of students whose results changed
+        refresh_academic_history(summary['matrics'])
+
+        totals['records'] += len(records)
+        for key in ('added', 'updated', 'failed'):
+            totals[key] += summary[key]
+        room = MAX_REPORTED_NOT_FOUND - len(totals['not_found'])
+        totals['not_found'].extend(summary['not_found'][:room])
+        if progress is not None:
+            progress(totals)
+
+    if totals['added'] or totals['updated']:
+        # Create, clear or reopen carryovers for the uploaded results
+        reconcile_course_carryovers(course.id, session.id)
+
+    return totals
+
+
+def ingest_student_roster(chunks, level, program, session_id, errors=None):
+    """
+    Insert or update a session's student roster with bulk statements.
+
+    The matric numbers already registered in the session are loaded with a
+    single query; each chunk is then split into inserts and updates in
+    memory and written with one bulk INSERT and one bulk UPDATE. A matric
+    number repeated in the file updates the earlier row, as uploading it
+    one row at a time did. The academic history of updated students is
+    refreshed, so it keeps their new level and program. Nothing is
+    committed.
+
+    Args:
+        chunks: Iterable of lists of student records (e.g. iter_student_csv)
+        level: Level assigned to every student in the roster
+        program: Program assigned to every student in the roster
+        session_id: The academic session ID
+        errors: List that messages for rejected records are appended to
+
+    Returns:
+        dict: {'records', 'added', 'updated', 'failed'} counts
+    """
+    summary = {'records': 0, 'added': 0, 'updated': 0, 'failed': 0}
+    errors = errors if errors is not None else []
+
+    # 1. Students already in the session
+    existing = dict(db.session.query(Student.matric_number, Student.id).filter(
+        Student.session_id == session_id
+    ).all())
+
+    for records in chunks:
+        summary['records'] += len(records)
+        now = datetime.utcnow()
+        inserts = {}   # matric -> row for a new student
+        updates = {}   # student_id -> row for an existing student
+        updated_matrics = []
+
+        for record in records:
+            too_long = [column for column, length in ROSTER_COLUMNS.items()
+                        if record.get(column) and len(record[column]) > length]
+            if too_long:
+                summary['failed'] += 1
+                errors.append(f"{record['matric_number']}: {', '.join(too_long)} too long")
+                continue
+
+            values = {column: record.get(column) for column in ROSTER_COLUMNS}
+            values.update(level=level, program=program, updated_at=now)
+
+            student_id = existing.get(record['matric_number'])
+            if student_id is not None:
+                updates[student_id] = dict(values, id=student_id)
+                updated_matrics.append(record['matric_number'])
+                summary['updated'] += 1
+            elif record['matric_number'] in inserts:
+                inserts[record['matric_number']].update(values)
+                summary['updated'] += 1
+            else:
+                inserts[record['matric_number']] = dict(values, session_id=session_id, created_at=now)
+                summary['added'] += 1
+
+        # 2. One bulk INSERT and one bulk UPDATE per chunk
+        if inserts:
+            inserted = db.session.execute(
+                insert(Student).returning(Student.id, Student.matric_number),
+                list(inserts.values())
+            ).all()
+            existing.update({row.matric_number: row.id for row in inserted})
+        if updates:
+            db.session.execute(update(Student), list(updates.values()))
+
+            # Keep the history rows' level and program in step
+            refresh_academic_history(updated_matrics)
+
+    return summary
+
+
+def record_upload(user_id, upload_type, filename, processed, failed, errors):
+    """
+    Add an UploadLog entry for a finished upload (not committed).
+
+    Args:
+        user_id: ID of the uploading user
+        upload_type: 'students' or 'results'
+        filename: Name recorded for the uploaded file
+        processed: Records added or updated
+        failed: Records not applied
+        errors: Error messages from parsing and applying the file
+    """
+    log = UploadLog(
+        user_id=user_id,
+        upload_type=upload_type,
+        filename=filename,
+        records_processed=processed,
+        records_failed=failed,
+        status='success' if failed == 0 else 'partial',
+        error_message='; '.join(errors) if errors else None
+    )
+    db.session.add(log)
+    return log
@@ -0,0 +1,178 @@
+"""
+Offline IP-range geolocation database
+
+An IP-range CSV (start, end, city, region, country, lat, lon) is compiled
+into a binary file of sorted big-endian range keys that is memory-mapped
+and searched with a binary search, so every worker process shares one
+copy of the table and a lookup takes a few microseconds.
+
+File layout:
+    header      magic, IPv4 range count, IPv6 range count, location count
+    IPv4        sorted 4-byte starts, 4-byte ends, 4-byte location indexes
+    IPv6        sorted 16-byte starts, 16-byte ends, 4-byte location indexes
+    locations   latitude, longitude, name offset, name length per location
+    names       UTF-8 location names
+"""
+import csv
+import io
+import ipaddress
+import mmap
+import os
+import struct
+
+MAGIC = b'IPRANGE1'
+HEADER = struct.Struct('>8sIII')
+LOCATION = struct.Struct('>ddIH')
+INDEX = struct.Struct('>I')
+NO_COORDINATE = float('nan')
+
+
+def _parse_address(value):
+    """Parse an address or an integer into an ipaddress object"""
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return ipaddress.IPv4Address(number) if number <= 0xFFFFFFFF else ipaddress.IPv6Address(number)
+    return ipaddress.ip_address(value)
+
+
+def _parse_coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NO_COORDINATE
+
+
+def build_ip_database(csv_source, output_path):
+    """
+    Compile an IP-range CSV into the binary lookup table.
+
+    The file is written next to the target and renamed into place, so
+    processes that have the old table mapped keep working.
+
+    Args:
+        csv_source: Path to the CSV file, or its text content
+        output_path: Where to write the compiled table
+
+    Returns:
+        dict: {'ipv4': count, 'ipv6': count, 'locations': count, 'skipped': count}
+    """
+    if os.path.exists(csv_source):
+        with open(csv_source, 'r', encoding='utf-8-sig', newline='') as f:
+            text = f.read()
+    else:
+        text = csv_source
+
+    ranges = {4: [], 6: []}
+    locations = {}   # (name, lat, lon) -> index
+    skipped = 0
+
+    for row in csv.reader(io.StringIO(text)):
+        if not row or row[0].strip().lower() in ('start', 'start_ip', 'ip_start'):
+            continue
+        try:
+            start, end = _parse_address(row[0]), _parse_address(row[1])
+            if start.version != end.version or int(start) > int(end):
+                raise ValueError('invalid range')
+        except (ValueError, IndexError):
+            skipped += 1
+            continue
+
+        row = row + [''] * (7 - len(row))
+        name_parts = [p.strip() for p in row[2:5] if p.strip()]
+        key = (', '.join(name_parts) if name_parts else 'Unknown',
+               _parse_coordinate(row[5]), _parse_coordinate(row[6]))
+        index = locations.setdefault(key, len(locations))
+        ranges[start.version].append((start.packed, end.packed, index))
+
+    names = bytearray()
+    location_table = bytearray()
+    for name, latitude, longitude in locations:
+        encoded = name.encode('utf-8')[:0xFFFF]
+        location_table += LOCATION.pack(latitude, longitude, len(names), len(encoded))
+        names += encoded
+
+    tmp_path = f'{output_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(ranges[4]), len(ranges[6]), len(locations)))
+        for version in (4, 6):
+            entries = sorted(ranges[version])
+            f.write(b''.join(entry[0] for entry in entries))
+            f.write(b''.join(entry[1] for entry in entries))
+            f.write(b''.join(INDEX.pack(entry[2]) for entry in entries))
+        f.write(location_table)
+        f.write(names)
+    os.replace(tmp_path, output_path)
+
+    return {'ipv4': len(ranges[4]), 'ipv6': len(ranges[6]),
+            'locations': len(locations), 'skipped': skipped}
+
+
+class IpRangeDatabase:
+    """Memory-mapped, read-only view of a compiled IP-range table"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, v4_count, v6_count, location_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f'{path} is not a compiled IP-range database')
+
+        offset = HEADER.size
+        self._sections = {}
+        for version, width, count in ((4, 4, v4_count), (6, 16, v6_count)):
+            self._sections[version] = (offset, width, count)
+            offset += count * (2 * width + INDEX.size)
+        self._locations_offset = offset
+        self._names_offset = offset + location_count * LOCATION.size
+        self.counts = {'ipv4': v4_count, 'ipv6': v6_count, 'locations': location_count}
+
+    def lookup(self, ip_address):
+        """
+        Find the range containing an address.
+
+        Returns:
+            tuple: (location, latitude, longitude), or None if not covered
+        """
+        try:
+            address = ipaddress.ip_address(ip_address)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        offset, width, count = self._sections[address.version]
+        key = address.packed
+        data = self._map
+
+        # Rightmost range whose start <= key (big-endian bytes sort numerically)
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            position = offset + mid * width
+            if data[position:position + width] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return None
+        i = lo - 1
+
+        ends_offset = offset + count * width
+        if data[ends_offset + i * width:ends_offset + (i + 1) * width] < key:
+            return None
+
+        (index,) = INDEX.unpack_from(data, offset + count * 2 * width + i * INDEX.size)
+        latitude, longitude, name_offset, name_length = LOCATION.unpack_from(
+            data, self._locations_offset + index * LOCATION.size)
+        start = self._names_offset + name_offset
+        name = data[start:start + name_length].decode('utf-8')
+        return (name,
+                None if latitude != latitude else latitude,    # NaN means no coordinate
+                None if longitude != longitude else longitude)
+
+    def close(self):
+        """Unmap the file; lookups afterwards raise ValueError. Safe to call twice."""
+        self._map.close()
@@ -0,0 +1,419 @@
+"""Local background job runner for CSV uploads and report builds"""
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import g, current_app
+from flask_login import current_user
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Job, Course, AcademicSession, User
+from app.utils.audit import AlterationRecorder, get_client_fingerprint
+from app.utils.csv_processor import iter_student_csv, CSV_CHUNK_SIZE
+from app.utils.ingest import ingest_results_csv, ingest_student_roster, record_upload
+from app.utils.pdf_generator import get_logo_path
+from app.utils.result_slips import load_result_slips, iter_result_slips_zip, result_slips_zip_filename
+from app.utils.spreadsheet import cached_spreadsheet_pdf
+
+# job_type -> handler(JobContext) returning a summary message
+JOB_HANDLERS = {}
+
+
+def job_handler(job_type):
+    """Register the function that runs jobs of the given type"""
+    def decorator(fn):
+        JOB_HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+
+class JobError(Exception):
+    """A job failed for a reason worth showing to the user as is"""
+
+
+class JobContext:
+    """
+    What a job handler works with.
+
+    Attributes:
+        job: The Job row (bound to the job's own database session)
+        params: Parameters given when the job was submitted
+        input_path: Uploaded file saved for the job, or None
+    """
+
+    def __init__(self, runner, job):
+        self.runner = runner
+        self.job = job
+        self.params = json.loads(job.params or '{}')
+        self.input_path = job.input_path
+
+    def progress(self, percent):
+        """Report progress; kept in memory and saved to the job row every JOB_PROGRESS_INTERVAL"""
+        percent = max(0, min(99, int(percent)))
+        self.runner._progress[self.job.id] = percent
+        self.runner._save_progress(self.job.id, percent)
+
+    def artifact_path(self, filename, mimetype):
+        """Path to write the job's downloadable result to"""
+        self.job.result_path = os.path.join(self.runner.folder, f'{self.job.id}-{os.path.basename(filename)}')
+        self.job.result_name = filename
+        self.job.result_mimetype = mimetype
+        return self.job.result_path
+
+
+class JobRunner:
+    """
+    Runs submitted jobs on a thread pool without any external broker.
+
+    Jobs are rows in the jobs table, so their status and artifacts outlive
+    the request that submitted them. Progress of running jobs is kept in
+    memory and saved to Job.progress at most every JOB_PROGRESS_INTERVAL
+    seconds on a separate connection, so other worker processes can report
+    it; the save is skipped rather than waited for while the job's own
+    transaction holds the database. Each job records the worker process
+    that runs it, so jobs orphaned by a restart can be failed at startup.
+    When JOBS_BACKGROUND is off (tests) jobs run inline on submit.
+    """
+
+    def __init__(self, max_workers=2):
+        self.app = None
+        self.max_workers = max_workers
+        self.background = True
+        self.folder = None
+        self.retention = None
+        self.progress_interval = 2
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+        self._executor = None
+        self._lock = threading.Lock()
+        self._progress = {}
+        self._progress_saved = {}    # job id -> monotonic time of the last saved progress
+
+    def configure(self, app):
+        """Take settings from the app config"""
+        self.app = app
+        self.max_workers = app.config.get('JOB_WORKERS', self.max_workers)
+        self.background = app.config.get('JOBS_BACKGROUND', True)
+        self.folder = app.config['JOB_FOLDER']
+        self.retention = app.config.get('JOB_RETENTION')
+        self.progress_interval = app.config.get('JOB_PROGRESS_INTERVAL', self.progress_interval)
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            return self._executor
+
+    def submit(self, job_type, params, user_id, upload=None):
+        """
+        Record a job and queue it.
+
+        Args:
+            job_type: A registered job type
+            params: JSON-serializable job parameters
+            user_id: ID of the user the job runs as
+            upload: Optional uploaded FileStorage saved for the job to read
+
+        Returns:
+            Job: The committed job row
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f'Unknown job type: {job_type}')
+        self.purge_expired()
+
+        job = Job(job_type=job_type, params=json.dumps(params), user_id=user_id, worker=self.worker)
+        db.session.add(job)
+        db.session.flush()
+        if upload is not None:
+            job.input_path = os.path.join(self.folder, f'{job.id}-input')
+            upload.save(job.input_path)
+        db.session.commit()
+
+        if self.background:
+            self._get_executor().submit(self.run, job.id)
+        else:
+            self.run(job.id)
+            db.session.refresh(job)
+        return job
+
+    def run(self, job_id):
+        """Run one job in its own app context and record the outcome"""
+        with self.app.app_context():
+            job = db.session.get(Job, job_id)
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+            self._progress[job_id] = 0
+            self._progress_saved[job_id] = time.monotonic()
+
+            context = JobContext(self, job)
+            actor = context.params.get('actor', {})
+            g.alteration_recorder = AlterationRecorder(
+                actor.get('fingerprint', {}), job.user_id, actor.get('name'), actor.get('role')
+            )
+
+            try:
+                message = JOB_HANDLERS[job.job_type](context)
+                db.session.commit()
+                job.status = 'succeeded'
+                job.progress = 100
+                job.message = message
+            except Exception as e:
+                artifact = job.result_path
+                db.session.rollback()
+                job.status = 'failed'
+                job.message = str(e) if isinstance(e, JobError) else f'{type(e).__name__}: {e}'
+                if artifact and os.path.exists(artifact):
+                    os.remove(artifact)
+                job.result_path = None
+            finally:
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                self._progress.pop(job_id, None)
+                self._progress_saved.pop(job_id, None)
+                if job.input_path and os.path.exists(job.input_path):
+                    os.remove(job.input_path)
+
+    def progress(self, job):
+        """Current progress of a job in percent"""
+        return self._progress.get(job.id, job.progress or 0)
+
+    def _save_progress(self, job_id, percent):
+        """
+        Write a running job's progress to its row if JOB_PROGRESS_INTERVAL has passed.
+
+        Uses its own connection and does not wait for locks, so a job whose
+        transaction holds the database (an upload on SQLite) keeps going and
+        its progress is saved at a later report. Inline jobs (tests) share the
+        request's connection and are not saved.
+        """
+        if not self.background:
+            return
+        now = time.monotonic()
+        if now - self._progress_saved.get(job_id, 0) < self.progress_interval:
+            return
+        try:
+            with db.engine.connect() as connection:
+                busy_timeout = None
+                if connection.dialect.name == 'sqlite':
+                    busy_timeout = connection.exec_driver_sql('PRAGMA busy_timeout').scalar()
+                    connection.exec_driver_sql('PRAGMA busy_timeout = 0')
+                try:
+                    connection.execute(update(Job).where(Job.id == job_id).values(progress=percent))
+                    connection.commit()
+                finally:
+                    if busy_timeout is not None:
+                        connection.exec_driver_sql(f'PRAGMA busy_timeout = {int(busy_timeout)}')
+        except OperationalError:
+            return
+        self._progress_saved[job_id] = now
+
+    def recover(self):
+        """
+        Fail jobs left queued or running by a worker process that has exited.
+
+        Called at startup. Jobs of live processes, and of other hosts (whose
+        processes cannot be checked), are left alone. Inputs of the failed
+        jobs are deleted from JOB_FOLDER.
+
+        Returns:
+            int: Number of jobs failed
+        """
+        host = socket.gethostname()
+        orphaned = []
+        try:
+            unfinished = Job.query.filter(Job.status.in_(['queued', 'running'])).all()
+        except OperationalError as e:
+            # Database from before the worker column; see migrate_add_job_worker.py
+            db.session.rollback()
+            print(f"Skipping job recovery: {e}")
+            return 0
+        for job in unfinished:
+            worker_host, _, pid = (job.worker or '').rpartition(':')
+            if job.worker and (worker_host != host or _process_alive(int(pid))):
+                continue
+            orphaned.append(job)
+
+        for job in orphaned:
+            job.status = 'failed'
+            job.message = 'Interrupted by a server restart. Please submit it again.'
+            job.finished_at = datetime.utcnow()
+            for path in (job.input_path, job.result_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+            job.result_path = None
+        if orphaned:
+            db.session.commit()
+        return len(orphaned)
+
+    def purge_expired(self):
+        """Delete finished jobs older than JOB_RETENTION and their files"""
+        if not self.retention:
+            return
+        cutoff = datetime.utcnow() - self.retention
+        expired = Job.query.filter(Job.status.in_(['succeeded', 'failed']), Job.finished_at < cutoff).all()
+        for job in expired:
+            if job.result_path and os.path.exists(job.result_path):
+                os.remove(job.result_path)
+            db.session.delete(job)
+        if expired:
+            db.session.commit()
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and optionally wait for running ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def _process_alive(pid):
+    """Whether a process with this ID is running on this host"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_job_runner = JobRunner()
+
+
+def init_jobs(app):
+    """Configure the shared job runner from the app config"""
+    _job_runner.configure(app)
+
+
+def get_job_runner():
+    """Get the shared job runner"""
+    return _job_runner
+
+
+def recover_jobs():
+    """Fail jobs orphaned by a restart (called at startup, once the tables exist)"""
+    return _job_runner.recover()
+
+
+def submit_job(job_type, params, upload=None):
+    """
+    Submit a job as the current user from within a request.
+
+    The user's name, role and client fingerprint are stored with the job so
+    result alterations it makes are attributed as if made by the request.
+
+    Returns:
+        Job: The submitted job
+    """
+    params = dict(params, actor={
+        'name': current_user.full_name,
+        'role': current_user.role,
+        'fingerprint': get_client_fingerprint()
+    })
+    return _job_runner.submit(job_type, params, current_user.id, upload)
+
+
+@job_handler('results_upload')
+def run_results_upload(context):
+    """Apply an uploaded results CSV for one course"""
+    params = context.params
+    course = db.session.get(Course, params['course_id'])
+    session = db.session.get(AcademicSession, params['session_id'])
+    size = os.path.getsize(context.input_path) or 1
+    errors = []
+
+    with open(context.input_path, 'rb') as f:
+        summary = ingest_results_csv(
+            f, course, session, context.job.user_id,
+            chunk_size=current_app.config.get('CSV_CHUNK_SIZE', CSV_CHUNK_SIZE), errors=errors,
+            progress=lambda totals: context.progress(95 * f.tell() / size)
+        )
+    if not summary['records']:
+        raise JobError(f'No valid records found. Errors: {"; ".join(errors)}')
+
+    added, updated, failed = summary['added'], summary['updated'], summary['failed']
+    record_upload(context.job.user_id, 'results', f"{course.course_code}_{params['filename']}",
+                  added + updated, failed, errors)
+
+    message = f'Results upload for {course.course_code}: {added} added, {updated} updated, {failed} failed.'
+    if summary['not_found']:
+        message += f' Students not found: {", ".join(summary["not_found"][:10])}'
+        message += '...' if len(summary['not_found']) > 10 else ''
+    return message
+
+
+@job_handler('students_upload')
+def run_students_upload(context):
+    """Apply an uploaded student roster CSV"""
+    params = context.params
+    size = os.path.getsize(context.input_path) or 1
+    errors = []
+
+    with open(context.input_path, 'rb') as f:
+        def chunks():
+            for records in iter_student_csv(f, current_app.config.get('CSV_CHUNK_SIZE', CSV_CHUNK_SIZE), errors):
+                yield records
+                context.progress(95 * f.tell() / size)
+
+        summary = ingest_student_roster(chunks(), params['level'], params['program'], params['session_id'], errors)
+    if not summary['records']:
+        raise JobError(f'No valid records found. Errors: {"; ".join(errors)}')
+
+    added, updated, failed = summary['added'], summary['updated'], summary['failed']
+    record_upload(context.job.user_id, 'students', params['filename'], added + updated, failed, errors)
+    return f'Upload complete: {added} added, {updated} updated, {failed} failed.'
+
+
+@job_handler('spreadsheet_pdf')
+def run_spreadsheet_pdf(context):
+    """Build the examination spreadsheet PDF"""
+    params = context.params
+    session = db.session.get(AcademicSession, params['session_id'])
+    user = db.session.get(User, context.job.user_id)
+
+    try:
+        pdf_path, filename = cached_spreadsheet_pdf(
+            session, params['level'], params['program'], params['semester'], params['dean_name'],
+            font_size=params.get('font_size', 10), fallback_adviser_name=user.full_name
+        )
+    except ValueError as e:
+        raise JobError(str(e))
+    shutil.copyfile(pdf_path, context.artifact_path(filename, 'application/pdf'))
+    return f'Spreadsheet for {params["program"]} {params["level"]} Level is ready.'
+
+
+@job_handler('result_slips_zip')
+def run_result_slips_zip(context):
+    """Render the result slips of a level and program into one ZIP"""
+    params = context.params
+    session = db.session.get(AcademicSession, params['session_id'])
+
+    documents = load_result_slips(session, params['level'], params['program'], params['semester'])
+    if not documents:
+        raise JobError('No students found for the selected criteria.')
+    context.progress(10)
+
+    filename = result_slips_zip_filename(session, params['level'], params['program'])
+    archive = iter_result_slips_zip(documents, current_app.config.get('PDF_WORKERS'), get_logo_path() or '')
+    with open(context.artifact_path(filename, 'application/zip'), 'wb') as f:
+        for done, data in enumerate(archive):
+            f.write(data)
+            context.progress(10 + 89 * done / len(documents))
+    return f'Result slips for {len(documents)} {params["program"]} {params["level"]} Level students are ready.'
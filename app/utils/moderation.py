@@ -0,0 +1,233 @@
+"""Read-only "what-if" simulation of moderating a course's scores"""
+from dataclasses import dataclass
+import numpy as np
+from sqlalchemy import func, select
+from app import db
+from app.models import Result, Course, Student
+from app.utils.course_stats import GRADE_ORDER
+from app.utils.grading import get_grading_table
+from app.utils.revisions import RevisionCache, COURSES_SCOPE, GRADING_SCOPE, session_scope
+
+# Scenario keys and their defaults (no change)
+SCENARIO_DEFAULTS = {
+    'offset': 0.0,       # Marks added to every total
+    'scale': 1.0,        # Factor every total is multiplied by (before the offset)
+    'bonus': 0.0,        # Marks added to every total, ...
+    'bonus_cap': None,   # ... but never lifting a total above this mark
+    'boundaries': {},    # grade -> new lower boundary, e.g. {'C': 48}
+}
+
+_moderation_cache = RevisionCache(max_entries=64)
+
+
+@dataclass
+class ModerationSet:
+    """One course's results and its students' other results in the same semester, as arrays"""
+    course_id: int
+    session_id: int
+    course_code: str
+    credit_unit: int
+    degree_type: str
+    matric_numbers: np.ndarray   # object
+    names: np.ndarray            # object
+    totals: np.ndarray           # float, stored total scores
+    grades: np.ndarray           # object, stored grades
+    grade_points: np.ndarray     # int, stored grade points
+    other_points: np.ndarray     # float, quality points from the student's other courses this semester
+    other_units: np.ndarray      # float, credit units of those courses
+
+
+def load_moderation_set(course, session_id):
+    """
+    Load a course's scores and its students' other same-semester results.
+
+    Two queries: the course's results with their students, and the quality
+    points and credit units of the students' other courses in the semester,
+    summed per student in SQL.
+
+    Args:
+        course: The Course
+        session_id: Academic session ID
+
+    Returns:
+        ModerationSet: The loaded arrays, ordered by matric number
+    """
+    rows = db.session.execute(
+        select(Result.student_id, Student.matric_number, Student.surname, Student.first_name, Student.other_names,
+               Result.total_score, Result.grade, Result.grade_point)
+        .join(Student, Result.student_id == Student.id)
+        .where(Result.course_id == course.id, Result.session_id == session_id)
+        .order_by(Student.matric_number)
+    ).all()
+
+    others = dict.fromkeys((row.student_id for row in rows), (0.0, 0.0))
+    if rows:
+        student_ids = select(Result.student_id).where(
+            Result.course_id == course.id, Result.session_id == session_id
+        ).scalar_subquery()
+        for student_id, points, units in db.session.execute(
+            select(Result.student_id, func.sum(Result.grade_point * Course.credit_unit),
+                   func.sum(Course.credit_unit))
+            .join(Course, Result.course_id == Course.id)
+            .where(Result.session_id == session_id, Course.semester == course.semester,
+                   Result.course_id != course.id, Result.student_id.in_(student_ids))
+            .group_by(Result.student_id)
+        ):
+            others[student_id] = (float(points), float(units))
+
+    return ModerationSet(
+        course_id=course.id,
+        session_id=session_id,
+        course_code=course.course_code,
+        credit_unit=course.credit_unit,
+        degree_type=course.degree_type or 'BSc',
+        matric_numbers=np.array([row.matric_number for row in rows], dtype=object),
+        names=np.array([' '.join(filter(None, [row.surname.upper(), (row.first_name or '').title(),
+                                               (row.other_names or '').title()])) for row in rows], dtype=object),
+        totals=np.array([row.total_score for row in rows], dtype=float),
+        grades=np.array([row.grade for row in rows], dtype=object),
+        grade_points=np.array([row.grade_point for row in rows], dtype=int),
+        other_points=np.array([others[row.student_id][0] for row in rows], dtype=float),
+        other_units=np.array([others[row.student_id][1] for row in rows], dtype=float),
+    )
+
+
+def get_moderation_set(course, session_id):
+    """load_moderation_set(), cached until the session's results, the courses or the grading change"""
+    return _moderation_cache.get_or_compute(
+        (course.id, session_id),
+        (session_scope(session_id), COURSES_SCOPE, GRADING_SCOPE),
+        lambda: load_moderation_set(course, session_id)
+    )
+
+
+def parse_scenario(data):
+    """
+    Validate a scenario from a request.
+
+    Args:
+        data: Dict with any of the SCENARIO_DEFAULTS keys, plus an optional 'name'
+
+    Returns:
+        dict: Complete scenario with numeric values
+
+    Raises:
+        ValueError: If a field is unknown, not a number or out of range
+    """
+    if not isinstance(data, dict):
+        raise ValueError('A scenario must be an object')
+    unknown = set(data) - set(SCENARIO_DEFAULTS) - {'name'}
+    if unknown:
+        raise ValueError(f"Unknown scenario field(s): {', '.join(sorted(unknown))}")
+
+    scenario = dict(SCENARIO_DEFAULTS, name=data.get('name'))
+    try:
+        for key in ('offset', 'scale', 'bonus'):
+            if data.get(key) is not None:
+                scenario[key] = float(data[key])
+        if data.get('bonus_cap') is not None:
+            scenario['bonus_cap'] = float(data['bonus_cap'])
+        boundaries = data.get('boundaries') or {}
+        scenario['boundaries'] = {str(grade): float(score) for grade, score in boundaries.items()}
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError('Scenario values must be numbers')
+
+    if scenario['scale'] < 0:
+        raise ValueError('Scale must not be negative')
+    if not all(0 <= score <= 100 for score in scenario['boundaries'].values()):
+        raise ValueError('Boundaries must be between 0 and 100')
+    return scenario
+
+
+def adjust_scores(totals, offset=0.0, scale=1.0, bonus=0.0, bonus_cap=None):
+    """
+    Apply moderation adjustments to total scores.
+
+    Scores are scaled, then offset, then given the bonus (which never lifts
+    a score above bonus_cap, nor lowers one already above it), and finally
+    clipped to 0-100.
+
+    Returns:
+        np.ndarray: Adjusted scores
+    """
+    adjusted = totals * scale + offset
+    if bonus:
+        boosted = adjusted + bonus
+        if bonus_cap is not None:
+            boosted = np.minimum(boosted, np.maximum(adjusted, bonus_cap))
+        adjusted = boosted
+    return np.clip(adjusted, 0, 100)
+
+
+def _distribution(grades):
+    labels, counts = np.unique(grades, return_counts=True)
+    found = dict(zip(labels.tolist(), counts.tolist()))
+    distribution = {grade: found.pop(grade, 0) for grade in GRADE_ORDER}
+    distribution.update(sorted(found.items()))
+    return distribution
+
+
+def _gpa(points, units):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(units > 0, np.round(points / units, 2), 0.0)
+
+
+def simulate_moderation(moderation_set, scenario):
+    """
+    Regrade a course under a scenario without writing anything.
+
+    Args:
+        moderation_set: ModerationSet from get_moderation_set
+        scenario: Scenario from parse_scenario
+
+    Returns:
+        dict: 'before' and 'after' summaries (grades, passed, failed,
+            pass_rate, mean), 'changed' (number of students whose grade
+            changes) and 'students' (one entry per such student with their
+            score, grade and semester GPA before and after)
+
+    Raises:
+        ValueError: If the boundaries are invalid for the course's grading
+    """
+    ms = moderation_set
+    table = get_grading_table(ms.degree_type)
+    if scenario['boundaries']:
+        table = table.with_boundaries(scenario['boundaries'])
+
+    scores = adjust_scores(ms.totals, scenario['offset'], scenario['scale'], scenario['bonus'],
+                           scenario['bonus_cap'])
+    grades, grade_points = table.lookup_many(scores)
+
+    units = ms.other_units + ms.credit_unit
+    gpa_before = _gpa(ms.other_points + ms.grade_points * ms.credit_unit, units)
+    gpa_after = _gpa(ms.other_points + grade_points * ms.credit_unit, units)
+
+    def summary(score_array, grade_array):
+        count = len(grade_array)
+        failed = int(np.count_nonzero(grade_array == 'F'))
+        return {
+            'grades': _distribution(grade_array),
+            'passed': count - failed,
+            'failed': failed,
+            'pass_rate': round((count - failed) / count * 100, 2) if count else 0.0,
+            'mean': round(float(score_array.mean()), 2) if count else None
+        }
+
+    changed = np.flatnonzero(grades != ms.grades)
+    return {
+        'name': scenario.get('name'),
+        'scenario': {key: scenario[key] for key in SCENARIO_DEFAULTS},
+        'before': summary(ms.totals, ms.grades),
+        'after': summary(scores, grades),
+        'changed': int(changed.size),
+        'students': [{
+            'matric_number': ms.matric_numbers[i],
+            'name': ms.names[i],
+            'score_before': round(float(ms.totals[i]), 2),
+            'score_after': round(float(scores[i]), 2),
+            'grade_before': ms.grades[i],
+            'grade_after': grades[i],
+            'semester_gpa_before': float(gpa_before[i]),
+            'semester_gpa_after': float(gpa_after[i])
+        } for i in changed.tolist()]
+    }
@@ -0,0 +1,239 @@
+"""Keyset (seek) pagination and cheap row counts for the list views"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, func, select, tuple_
+from app import db
+from app.utils.revisions import RevisionCache
+
+# Counts of filtered listings stop at this many rows ("10,000+")
+APPROXIMATE_COUNT_CAP = 10000
+
+# Query arguments that position a page; dropped when linking to another page
+CURSOR_ARGS = ('after', 'before', 'page')
+
+_count_cache = RevisionCache(max_entries=512)
+
+
+def encode_cursor(values):
+    """
+    Opaque, URL-safe token for a row's position in a keyset ordering.
+
+    Args:
+        values: The row's sort key values, e.g. (matric_number, id)
+
+    Returns:
+        str: base64url-encoded JSON of the values
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """
+    Position encoded by encode_cursor, checked against the sort keys.
+
+    Args:
+        cursor: Token from encode_cursor
+        keys: The sort key columns the token was made for
+
+    Returns:
+        list: The sort key values, or None if the cursor is missing or malformed
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return [datetime.fromisoformat(value) if isinstance(key.type, DateTime) else value
+                for key, value in zip(keys, values)]
+    except (ValueError, TypeError):
+        return None
+
+
+class Count:
+    """A row count that may be a lower bound or an estimate"""
+
+    def __init__(self, value, exact=True, capped=False):
+        self.value = value
+        self.exact = exact
+        self.capped = capped
+
+    def __int__(self):
+        return self.value
+
+    def __str__(self):
+        if self.capped:
+            return f'{self.value:,}+'
+        return f'{self.value:,}' if self.exact else f'~{self.value:,}'
+
+
+def capped_count(query, model, cap=APPROXIMATE_COUNT_CAP):
+    """
+    Count a query's rows, stopping once cap is exceeded.
+
+    The database reads at most cap + 1 index entries or rows, however large
+    the table, instead of counting every match.
+
+    Args:
+        query: Flask-SQLAlchemy query on model, filters applied
+        model: The queried model
+        cap: Largest count reported exactly
+
+    Returns:
+        Count: The count, flagged as capped when there are more than cap rows
+    """
+    limited = query.order_by(None).with_entities(model.id).limit(cap + 1).subquery()
+    value = db.session.execute(select(func.count()).select_from(limited)).scalar()
+    return Count(min(value, cap), exact=value <= cap, capped=value > cap)
+
+
+def estimate_row_count(model):
+    """
+    Estimated number of rows in a table from its ID range.
+
+    Exact for tables whose rows are never deleted, and read from the primary
+    key index in constant time.
+
+    Returns:
+        Count: The estimate (not exact)
+    """
+    low, high = db.session.execute(select(func.min(model.id), func.max(model.id))).one()
+    return Count(high - low + 1 if high is not None else 0, exact=False)
+
+
+def cached_count(query, scopes):
+    """
+    Exact row count of a query, cached until one of its scopes changes.
+
+    Entries are keyed by the query's SQL and parameters, so every filter set
+    (including a user's access restrictions) has its own count, and paging
+    through a listing counts it once.
+
+    Args:
+        query: Flask-SQLAlchemy query, filters applied
+        scopes: Revision scopes covering the rows and filters of the query
+
+    Returns:
+        Count: The exact count
+    """
+    query = query.order_by(None)
+    compiled = query.statement.compile(dialect=db.session.get_bind().dialect)
+    key = (str(compiled), tuple(sorted((name, repr(value)) for name, value in compiled.params.items())))
+    return _count_cache.get_or_compute(key, scopes, lambda: Count(query.count()))
+
+
+def get_count_cache():
+    """The RevisionCache behind cached_count"""
+    return _count_cache
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated listing.
+
+    next_cursor and prev_cursor are opaque tokens for the pages after and
+    before this one (None at either end); pass them back as the 'after' and
+    'before' query arguments, or use next_args/prev_args to build links.
+    """
+
+    def __init__(self, items, per_page, has_next, has_prev, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor if has_next else None
+        self.prev_cursor = prev_cursor if has_prev else None
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def next_args(self, args=None):
+        """Query arguments linking to the next page, keeping the other args (e.g. request.args)"""
+        return self._link_args(args, after=self.next_cursor)
+
+    def prev_args(self, args=None):
+        """Query arguments linking to the previous page, keeping the other args"""
+        return self._link_args(args, before=self.prev_cursor)
+
+    def first_args(self, args=None):
+        """Query arguments linking to the first page, keeping the other args"""
+        return self._link_args(args)
+
+    @staticmethod
+    def _link_args(args, **cursor):
+        link = {key: value for key, value in (args or {}).items() if key not in CURSOR_ARGS}
+        link.update(cursor)
+        return link
+
+    def to_dict(self):
+        """Paging details for a JSON response (the items are left to the caller)"""
+        return {
+            'count': len(self.items),
+            'per_page': self.per_page,
+            'total': int(self.total) if self.total is not None else None,
+            'total_exact': self.total.exact if self.total is not None else None,
+            'next': self.next_cursor,
+            'prev': self.prev_cursor
+        }
+
+
+def keyset_paginate(query, keys, after=None, before=None, per_page=50, descending=False, total=None):
+    """
+    Page through a query in sort key order, seeking from a cursor.
+
+    Each page is read from the row after (or before) the cursor on, so with
+    an index on the sort keys a page costs the same however deep it is,
+    unlike OFFSET pagination. The keys must be NOT NULL and end with a
+    unique column (normally the ID) so every row has its own position; they
+    may come from joined tables.
+
+    Args:
+        query: Flask-SQLAlchemy query, filters applied
+        keys: Sort key columns, e.g. (Student.matric_number, Student.id)
+        after: Cursor of the last row of the previous page (next page)
+        before: Cursor of the first row of the following page (previous page)
+        per_page: Rows per page
+        descending: Sort newest/highest first
+        total: Optional Count to attach to the page
+
+    Returns:
+        KeysetPage: The page; cursors that cannot be decoded, and 'before'
+            cursors with no rows before them, start from the first row
+    """
+    keys = list(keys)
+    key = tuple_(*keys)
+    after, before = decode_cursor(after, keys), decode_cursor(before, keys)
+    forward = [column.desc() if descending else column.asc() for column in keys]
+    backward = [column.asc() if descending else column.desc() for column in keys]
+    query = query.order_by(None).add_columns(*keys)
+
+    def cursor(row):
+        return encode_cursor(row[1:])
+
+    if before is not None:
+        # Previous page: the rows just before the cursor, read backwards and reversed
+        seek = key > tuple_(*before) if descending else key < tuple_(*before)
+        rows = query.filter(seek).order_by(*backward).limit(per_page + 1).all()
+        if not rows:
+            before = None
+    if before is not None:
+        has_prev = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        return KeysetPage([row[0] for row in rows], per_page, has_next=True, has_prev=has_prev,
+                          next_cursor=cursor(rows[-1]), prev_cursor=cursor(rows[0]), total=total)
+
+    if after is not None:
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    rows = query.order_by(*forward).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage([row[0] for row in rows], per_page, has_next=has_next,
+                      has_prev=after is not None and bool(rows),
+                      next_cursor=cursor(rows[-1]) if rows else None,
+                      prev_cursor=cursor(rows[0]) if rows else None, total=total)
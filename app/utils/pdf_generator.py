@@ -3,14 +3,30 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, Flowable
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Flowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib.utils import ImageReader
+from PIL import Image as PILImage
 from io import BytesIO
 import os
+import threading
+from app.utils.revisions import LOGO_SCOPE, current_revision
 from datetime import datetime
 
+# Largest size the logo is drawn at, and the resolution it is kept at
+LOGO_RENDER_SIZE = 2*cm
+LOGO_RENDER_DPI = 200
+
+# Process-wide render assets shared by every generated PDF. Styles and header
+# paragraphs never change; logo entries are dropped by invalidate_pdf_assets
+# and whenever the logo revision moves on (a logo saved by another process).
+_pdf_styles = None
+_header_frags = {}
+_logo_cache = {}
+_assets_lock = threading.Lock()
+
 
 class VerticalText(Flowable):
     """Flowable for rendering vertical text rotated 90 degrees"""
@@ -34,18 +50,129 @@ class VerticalText(Flowable):
         self.canv.restoreState()
 
 
+class LogoFlowable(Flowable):
+    """Flowable drawing a pre-decoded logo image shared between documents"""
+    def __init__(self, reader, width, height, hAlign='CENTER'):
+        Flowable.__init__(self)
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+def _check_logo_revision():
+    """Drop the cached logo if it was replaced since it was loaded"""
+    revision = current_revision(LOGO_SCOPE)
+    if revision is not None and _logo_cache.get('revision') != revision:
+        with _assets_lock:
+            if _logo_cache.get('revision') != revision:
+                _logo_cache.clear()
+                _logo_cache['revision'] = revision
+
+
 def get_logo_path():
-    """Get the university logo path"""
+    """Get the university logo path (looked up once until the logo changes)"""
     from flask import current_app
+    _check_logo_revision()
     logo_dir = current_app.config.get('LOGO_FOLDER', 'app/static/logos')
+    key = ('path', logo_dir, current_app.root_path)
+    if key in _logo_cache:
+        return _logo_cache[key]
+    
     custom_logo = os.path.join(logo_dir, 'university_logo.jpg')
     default_logo = os.path.join(current_app.root_path, 'static', 'images', 'default_logo.png')
     
     if os.path.exists(custom_logo):
-        return custom_logo
+        logo_path = custom_logo
     elif os.path.exists(default_logo):
-        return default_logo
-    return None
+        logo_path = default_logo
+    else:
+        logo_path = None
+    _logo_cache[key] = logo_path
+    return logo_path
+
+
+def load_logo_image(logo_path):
+    """
+    Decode a logo image once, scaled down to the largest size it is drawn at.
+    
+    Args:
+        logo_path: Path of the logo image
+    
+    Returns:
+        ImageReader: Decoded logo, or None if the file cannot be read
+    """
+    try:
+        with PILImage.open(logo_path) as image:
+            transparent = 'A' in image.getbands() or 'transparency' in image.info
+            image = image.convert('RGBA' if transparent else 'RGB')
+        pixels = round(LOGO_RENDER_SIZE / inch * LOGO_RENDER_DPI)
+        image.thumbnail((pixels, pixels))
+        
+        buffer = BytesIO()
+        if transparent:
+            image.save(buffer, 'PNG')
+        else:
+            image.save(buffer, 'JPEG', quality=90)
+        buffer.seek(0)
+        
+        reader = ImageReader(buffer)
+        reader.getRGBData()  # decode now rather than in every document
+        return reader
+    except Exception:
+        return None
+
+
+def get_logo_image(logo_path):
+    """Get the decoded logo for a path, loading it on first use"""
+    if not logo_path:
+        return None
+    _check_logo_revision()
+    key = ('image', logo_path)
+    if key not in _logo_cache:
+        with _assets_lock:
+            if key not in _logo_cache:
+                _logo_cache[key] = load_logo_image(logo_path) if os.path.exists(logo_path) else None
+    return _logo_cache[key]
+
+
+def invalidate_pdf_assets():
+    """Forget the cached logo path and image (call after the logo changes)"""
+    with _assets_lock:
+        _logo_cache.clear()
+
+
+def get_pdf_styles():
+    """Get the shared PDF stylesheet, built on first use"""
+    global _pdf_styles
+    if _pdf_styles is None:
+        with _assets_lock:
+            if _pdf_styles is None:
+                _pdf_styles = create_header_styles()
+    return _pdf_styles
+
+
+def header_paragraph(text, style_name):
+    """
+    Paragraph for a fixed header line, parsed once per text and style.
+    
+    Only use for text drawn from a small fixed set (university details,
+    titles); every distinct text is kept for the life of the process.
+    """
+    styles = get_pdf_styles()
+    key = (text, style_name)
+    frags = _header_frags.get(key)
+    if frags is None:
+        paragraph = Paragraph(text, styles[style_name])
+        _header_frags[key] = paragraph.frags
+        return paragraph
+    return Paragraph(text, styles[style_name], frags=frags)
 
 
 def create_header_styles():
@@ -112,9 +239,116 @@ def create_header_styles():
         fontName='Helvetica-Bold'
     ))
     
+    # Signature section of the spreadsheet
+    styles.add(ParagraphStyle(
+        name='SignatureName',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='SignaturePosition',
+        parent=styles['Normal'],
+        fontSize=9,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='SignatureLine',
+        parent=styles['Normal'],
+        fontSize=9,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    ))
+    
+    # Student result slip
+    styles.add(ParagraphStyle(
+        name='StudentInfo',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=4
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='Summary',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=6,
+        fontName='Helvetica-Bold'
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='Footer',
+        parent=styles['Normal'],
+        fontSize=9,
+        alignment=TA_CENTER
+    ))
+    
     return styles
 
 
+def measure_column_widths(table_data, column_count, header_rows, header_font_size, font_size, padding):
+    """
+    Measure the content width of every table column in one pass.
+    
+    Each distinct cell text is measured once per font at unit size, and each
+    column keeps its widest header and data text. Widths are then scaled to
+    the font sizes, so a cell like "70A" repeated across 500 rows costs one
+    font-metric call rather than 500.
+    
+    Args:
+        table_data: Table rows; cells are text or VerticalText
+        column_count: Number of columns to measure
+        header_rows: Leading rows drawn in bold at header_font_size
+        header_font_size: Font size of the header rows
+        font_size: Font size of the data rows
+        padding: Space added to the widest text of a column
+    
+    Returns:
+        list: Width of each column in points (0 for columns with no content)
+    """
+    # Widest line at unit font size per column; -1 marks columns with no text
+    header_widths = [-1.0] * column_count
+    data_widths = [-1.0] * column_count
+    vertical_widths = [0.0] * column_count
+    header_cache = {}
+    data_cache = {}
+    
+    for row_idx, row in enumerate(table_data):
+        if row_idx < header_rows:
+            widths, cache, font_name = header_widths, header_cache, 'Helvetica-Bold'
+        else:
+            widths, cache, font_name = data_widths, data_cache, 'Helvetica'
+        
+        for col_idx, cell in enumerate(row[:column_count]):
+            if isinstance(cell, VerticalText):
+                # Rotated text is as wide as its font size plus a minimal margin
+                vertical_widths[col_idx] = max(vertical_widths[col_idx], cell.fontSize + 0.15*cm)
+                continue
+            
+            text = cell if isinstance(cell, str) else str(cell)
+            width = cache.get(text)
+            if width is None:
+                # Multi-line text is as wide as its longest line
+                width = max(stringWidth(line, font_name, 1) for line in text.split('\n'))
+                cache[text] = width
+            if width > widths[col_idx]:
+                widths[col_idx] = width
+    
+    content_widths = []
+    for col_idx in range(column_count):
+        width = vertical_widths[col_idx]
+        if header_widths[col_idx] >= 0:
+            width = max(width, header_widths[col_idx] * header_font_size + padding)
+        if data_widths[col_idx] >= 0:
+            width = max(width, data_widths[col_idx] * font_size + padding)
+        content_widths.append(width)
+    return content_widths
+
+
 def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
     """
     Generate the examination record spreadsheet PDF.
@@ -152,20 +386,19 @@ def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
         bottomMargin=0.5*cm
     )
     
-    styles = create_header_styles()
+    styles = get_pdf_styles()
     elements = []
     
     # Header with logo
-    header_data = []
-    logo_path = get_logo_path()
+    logo = get_logo_image(get_logo_path())
     
     # Build header table with logo on left
     header_content = []
     
     # University info
-    header_content.append(Paragraph(config.get('university_name', 'EDO STATE UNIVERSITY UZAIRUE'), styles['UniversityName']))
-    header_content.append(Paragraph(f"FACULTY: {config.get('faculty_name', 'Faculty of Science')}", styles['FacultyName']))
-    header_content.append(Paragraph("EXAMINATION RECORD SHEET", styles['SheetTitle']))
+    header_content.append(header_paragraph(config.get('university_name', 'EDO STATE UNIVERSITY UZAIRUE'), 'UniversityName'))
+    header_content.append(header_paragraph(f"FACULTY: {config.get('faculty_name', 'Faculty of Science')}", 'FacultyName'))
+    header_content.append(header_paragraph("EXAMINATION RECORD SHEET", 'SheetTitle'))
     header_content.append(Spacer(1, 6))
     
     # Level, Program, Department info - create styled paragraphs with bold keys
@@ -188,18 +421,13 @@ def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
     session_para.alignment = TA_CENTER
     header_content.append(session_para)
     
-    if logo_path and os.path.exists(logo_path):
-        try:
-            logo = Image(logo_path, width=1.5*cm, height=1.5*cm)
-            header_table = Table([[logo, header_content]], colWidths=[2*cm, None])
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ]))
-            elements.append(header_table)
-        except:
-            for item in header_content:
-                elements.append(item)
+    if logo:
+        header_table = Table([[LogoFlowable(logo, 1.5*cm, 1.5*cm), header_content]], colWidths=[2*cm, None])
+        header_table.setStyle(TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+        ]))
+        elements.append(header_table)
     else:
         for item in header_content:
             elements.append(item)
@@ -423,39 +651,12 @@ def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
         
         table_data.append(row)
     
-    # Calculate dynamic column widths based on content
-    col_widths = []
+    # Calculate dynamic column widths based on content (header rows at 8pt)
     padding = 0.2*cm  # Reduced padding for better space utilization
+    content_widths = measure_column_widths(table_data, total_cols, 4, 8, font_size, padding)
+    col_widths = []
     
-    # Calculate width for each column
-    for col_idx in range(total_cols):
-        max_width = 0
-        
-        # Check all rows for this column
-        for row_idx, row in enumerate(table_data):
-            if col_idx < len(row):
-                cell_content = row[col_idx]
-                
-                # Handle VerticalText objects
-                if isinstance(cell_content, VerticalText):
-                    # For vertical text, width is just the font size + minimal padding
-                    cell_width = cell_content.fontSize + 0.15*cm
-                else:
-                    # For regular text, calculate based on string width
-                    text = str(cell_content)
-                    # Use appropriate font size based on row
-                    if row_idx <= 3:  # Header rows
-                        cell_font_size = 8
-                    else:  # Data rows - use the configurable font size
-                        cell_font_size = font_size
-                    
-                    # Calculate width for multi-line text (take max line width)
-                    lines = text.split('\n')
-                    max_line_width = max([stringWidth(line, 'Helvetica-Bold' if row_idx <= 3 else 'Helvetica', cell_font_size) for line in lines] or [0])
-                    cell_width = max_line_width + padding
-                
-                max_width = max(max_width, cell_width)
-        
+    for col_idx, max_width in enumerate(content_widths):
         # Set minimum widths for specific columns
         if col_idx == 0:  # S/N
             max_width = max(max_width, 0.7*cm)
@@ -527,6 +728,11 @@ def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
         ('FONTNAME', (0, 4), (-1, -1), 'Helvetica'),
         ('FONTSIZE', (0, 4), (-1, -1), actual_font_size),
         
+        # Cell padding as allowed for in the column widths, so scaled-down
+        # columns of wide sheets never end up narrower than their padding
+        ('LEFTPADDING', (0, 0), (-1, -1), padding / 2),
+        ('RIGHTPADDING', (0, 0), (-1, -1), padding / 2),
+        
         # Grid - Black lines
         ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
         ('BOX', (0, 0), (-1, -1), 1.5, colors.black),
@@ -603,29 +809,9 @@ def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
     elements.append(Spacer(1, 1.5*cm))
     
     # Create signature lines
-    name_style = ParagraphStyle(
-        name='SignatureName',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        fontName='Helvetica-Bold'
-    )
-    
-    position_style = ParagraphStyle(
-        name='SignaturePosition',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_CENTER,
-        fontName='Helvetica'
-    )
-    
-    line_style = ParagraphStyle(
-        name='SignatureLine',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_CENTER,
-        fontName='Helvetica'
-    )
+    name_style = styles['SignatureName']
+    position_style = styles['SignaturePosition']
+    line_style = styles['SignatureLine']
     
     # Get signatory names or use defaults
     if signatories is None:
@@ -671,7 +857,7 @@ def generate_spreadsheet_pdf(data, config, signatories=None, font_size=10):
     return buffer
 
 
-def generate_student_result_pdf(student_data, results_data, config):
+def generate_student_result_pdf(student_data, results_data, config, logo_path=None):
     """
     Generate individual student result PDF.
     
@@ -679,6 +865,7 @@ def generate_student_result_pdf(student_data, results_data, config):
         student_data: Student information dictionary
         results_data: Dictionary with semester results
         config: System configuration
+        logo_path: Logo image path; None looks it up in the app, '' leaves it out
     
     Returns:
         BytesIO: PDF file buffer
@@ -694,33 +881,25 @@ def generate_student_result_pdf(student_data, results_data, config):
         bottomMargin=1*cm
     )
     
-    styles = create_header_styles()
+    styles = get_pdf_styles()
     elements = []
     
     # Header
-    logo_path = get_logo_path()
-    if logo_path and os.path.exists(logo_path):
-        try:
-            logo = Image(logo_path, width=2*cm, height=2*cm)
-            logo.hAlign = 'CENTER'
-            elements.append(logo)
-        except:
-            pass
-    
-    elements.append(Paragraph(config.get('university_name', 'EDO STATE UNIVERSITY UZAIRUE'), styles['UniversityName']))
-    elements.append(Paragraph(f"FACULTY: {config.get('faculty_name', 'Faculty of Science')}", styles['FacultyName']))
-    elements.append(Paragraph(f"DEPARTMENT: {config.get('department_name', 'Computer Science')}", styles['FacultyName']))
+    if logo_path is None:
+        logo_path = get_logo_path()
+    logo = get_logo_image(logo_path)
+    if logo:
+        elements.append(LogoFlowable(logo, 2*cm, 2*cm))
+    
+    elements.append(header_paragraph(config.get('university_name', 'EDO STATE UNIVERSITY UZAIRUE'), 'UniversityName'))
+    elements.append(header_paragraph(f"FACULTY: {config.get('faculty_name', 'Faculty of Science')}", 'FacultyName'))
+    elements.append(header_paragraph(f"DEPARTMENT: {config.get('department_name', 'Computer Science')}", 'FacultyName'))
     elements.append(Spacer(1, 10))
-    elements.append(Paragraph("STUDENT RESULT SLIP", styles['SheetTitle']))
+    elements.append(header_paragraph("STUDENT RESULT SLIP", 'SheetTitle'))
     elements.append(Spacer(1, 15))
     
     # Student Information
-    info_style = ParagraphStyle(
-        name='StudentInfo',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=4
-    )
+    info_style = styles['StudentInfo']
     
     # Format student name with (Miss) prefix for females
     student_name = student_data['name']
@@ -817,13 +996,7 @@ def generate_student_result_pdf(student_data, results_data, config):
     gpa_label = results_data.get('gpa_label', 'Cumulative GPA')
     summary_gpa = results_data.get('summary_gpa', cumulative.get('cgpa', 0.00))
     elements.append(Spacer(1, 10))
-    summary_style = ParagraphStyle(
-        name='Summary',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        fontName='Helvetica-Bold'
-    )
+    summary_style = styles['Summary']
     
     elements.append(Paragraph(summary_title, summary_style))
     elements.append(Paragraph(f"Total Credit Units Passed: {cumulative.get('passed', 0)}", info_style))
@@ -833,12 +1006,7 @@ def generate_student_result_pdf(student_data, results_data, config):
     
     # Footer
     elements.append(Spacer(1, 30))
-    footer_style = ParagraphStyle(
-        name='Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_CENTER
-    )
+    footer_style = styles['Footer']
     elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", footer_style))
     elements.append(Paragraph("This is a computer-generated document and does not require a signature.", footer_style))
     
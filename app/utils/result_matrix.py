@@ -0,0 +1,153 @@
+"""Students x courses result matrix for examination spreadsheets"""
+from collections import namedtuple
+from app import db
+from app.models import Student, Course, Result, Carryover
+
+# One result in the matrix; has the attributes templates read from a Result
+ResultCell = namedtuple('ResultCell', ['result_id', 'total_score', 'grade', 'grade_point', 'credit_unit'])
+
+
+def summarize_cells(cells):
+    """
+    Credit unit and GPA summary for a list of result cells.
+
+    Matches get_credit_units_summary and calculate_gpa for the same results.
+
+    Returns:
+        dict: {'passed', 'failed', 'total', 'gpa', 'tgp', 'count'}
+    """
+    passed = failed = quality_points = 0
+    for cell in cells:
+        # F grade (0 points) is considered failed
+        if cell.grade_point > 0:
+            passed += cell.credit_unit
+        else:
+            failed += cell.credit_unit
+        quality_points += cell.grade_point * cell.credit_unit
+    total = passed + failed
+    return {
+        'passed': passed,
+        'failed': failed,
+        'total': total,
+        'gpa': round(quality_points / total, 2) if total else 0.0,
+        'tgp': quality_points,
+        'count': len(cells)
+    }
+
+
+class ResultMatrix:
+    """
+    Results for one session, level and program pivoted into rows of
+    students and columns of courses.
+
+    Attributes:
+        students: Students ordered by matric number
+        courses: {semester: [Course, ...]} ordered by course code
+        rows: One dict per student: {
+            'student': Student,
+            'cells': {semester: [ResultCell or None per course]},
+            'summaries': {semester: summary, 'session': summary},
+            'remark': 'Proceed' or 'CO: <course codes>'
+        }
+    """
+
+    def __init__(self, students, courses, results, carryovers):
+        self.students = students
+        self.courses = courses
+
+        course_units = {c.id: c.credit_unit for semester_courses in courses.values() for c in semester_courses}
+        cells = {
+            (r.student_id, r.course_id): ResultCell(r.id, r.total_score, r.grade, r.grade_point or 0,
+                                                    course_units[r.course_id])
+            for r in results
+        }
+
+        self.rows = []
+        for student in students:
+            row_cells = {}
+            summaries = {}
+            session_cells = []
+            for semester, semester_courses in courses.items():
+                row_cells[semester] = [cells.get((student.id, c.id)) for c in semester_courses]
+                present = [cell for cell in row_cells[semester] if cell is not None]
+                summaries[semester] = summarize_cells(present)
+                session_cells.extend(present)
+            summaries['session'] = summarize_cells(session_cells)
+
+            codes = carryovers.get(student.matric_number)
+            self.rows.append({
+                'student': student,
+                'cells': row_cells,
+                'summaries': summaries,
+                'remark': 'CO: ' + ', '.join(codes) if codes else 'Proceed'
+            })
+
+    def results_by_course(self, row, semester):
+        """Map course ID to ResultCell for one row and semester"""
+        return {
+            course.id: cell
+            for course, cell in zip(self.courses[semester], row['cells'][semester])
+            if cell is not None
+        }
+
+
+def build_result_matrix(session_id, level, program, semesters=(1, 2)):
+    """
+    Load a results matrix in a fixed number of queries.
+
+    Students, courses, results and open carryovers are each fetched with a
+    single query, whatever the number of students or courses.
+
+    Args:
+        session_id: The academic session ID
+        level: Student level (100, 200, ...)
+        program: Program name
+        semesters: Semesters to include, e.g. (1,), (2,) or (1, 2)
+
+    Returns:
+        ResultMatrix
+    """
+    students = Student.query.filter_by(
+        level=level,
+        program=program,
+        session_id=session_id
+    ).order_by(Student.matric_number).all()
+
+    courses = {semester: [] for semester in semesters}
+    for course in Course.query.filter(
+            Course.level == level,
+            Course.program == program,
+            Course.semester.in_(list(semesters)),
+            Course.is_active == True
+    ).order_by(Course.course_code).all():
+        courses[course.semester].append(course)
+
+    course_ids = [c.id for semester_courses in courses.values() for c in semester_courses]
+    results = []
+    carryovers = {}
+    if students and course_ids:
+        student_ids = db.session.query(Student.id).filter_by(
+            level=level, program=program, session_id=session_id
+        )
+        results = db.session.query(
+            Result.id, Result.student_id, Result.course_id, Result.total_score,
+            Result.grade, Result.grade_point
+        ).filter(
+            Result.session_id == session_id,
+            Result.course_id.in_(course_ids),
+            Result.student_id.in_(student_ids.scalar_subquery())
+        ).all()
+
+    if students:
+        matrics = db.session.query(Student.matric_number).filter_by(
+            level=level, program=program, session_id=session_id
+        )
+        for matric, course_code in db.session.query(Carryover.student_matric, Course.course_code).join(
+                Course, Carryover.course_id == Course.id
+        ).filter(
+            Carryover.is_cleared == False,
+            Carryover.student_matric.in_(matrics.scalar_subquery())
+        ).order_by(Carryover.id).all():
+            carryovers.setdefault(matric, []).append(course_code)
+
+    return ResultMatrix(students, courses, results, carryovers)
@@ -0,0 +1,280 @@
+"""Student result slip PDFs, singly or in parallel batches"""
+import multiprocessing
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.orm import contains_eager
+from app import db
+from app.models import Student, Result, Course, StudentAcademicHistory
+from app.utils.grading import calculate_gpa, get_credit_units_summary
+from app.utils.pdf_generator import generate_student_result_pdf, get_logo_image
+from config import Config
+
+# Slips rendered ahead of the one being written, per worker process
+RENDER_AHEAD_PER_WORKER = 4
+
+# Slip settings and logo path of a render worker, set by _init_render_worker
+_worker_settings = {}
+
+
+def result_slip_config():
+    """University details printed on every slip"""
+    return {
+        'university_name': Config.UNIVERSITY_NAME,
+        'faculty_name': Config.FACULTY_NAME,
+        'department_name': Config.DEPARTMENT_NAME
+    }
+
+
+def result_slip_filename(matric_number, session_name=None):
+    """Download filename of a student's result slip"""
+    return f"result_{matric_number.replace('/', '-')}_{session_name.replace('/', '-') if session_name else 'all'}.pdf"
+
+
+def result_slips_zip_filename(session, level, program):
+    """Download filename of the result slips of a level and program"""
+    return f"results_{program.replace(' ', '_')}_{level}_{session.session_name.replace('/', '-')}.zip"
+
+
+def build_result_slip(student, first_sem_results, second_sem_results, session_name, semester_filter='all',
+                      history=None):
+    """
+    Data for one student's result slip.
+
+    Args:
+        student: The Student
+        first_sem_results: First semester Results with their courses loaded
+        second_sem_results: Second semester Results with their courses loaded
+        session_name: Session printed on the slip ('N/A' when unknown)
+        semester_filter: 'all', or '1'/'first' or '2'/'second' for one semester
+        history: The student's StudentAcademicHistory row for the session, if any
+
+    Returns:
+        tuple: (student_data, results_data) for generate_student_result_pdf
+    """
+    # Apply semester filter (optional)
+    if semester_filter in ['1', 'first', 'first_semester']:
+        second_sem_results = []
+        summary_title = 'FIRST SEMESTER SUMMARY'
+        gpa_label = 'GPA'
+    elif semester_filter in ['2', 'second', 'second_semester']:
+        first_sem_results = []
+        summary_title = 'SECOND SEMESTER SUMMARY'
+        gpa_label = 'GPA'
+    else:
+        summary_title = 'CUMULATIVE SUMMARY'
+        gpa_label = 'Cumulative GPA'
+
+    # Build result data
+    first_sem_data = [{
+        'course_code': r.course.course_code,
+        'course_title': r.course.course_title,
+        'credit_unit': r.course.credit_unit,
+        'total_score': r.total_score,
+        'grade': r.grade,
+        'grade_point': r.grade_point
+    } for r in first_sem_results]
+
+    second_sem_data = [{
+        'course_code': r.course.course_code,
+        'course_title': r.course.course_title,
+        'credit_unit': r.course.credit_unit,
+        'total_score': r.total_score,
+        'grade': r.grade,
+        'grade_point': r.grade_point
+    } for r in second_sem_results]
+
+    # Summaries (semester GPAs from the precomputed history)
+    first_summary = get_credit_units_summary(first_sem_results) if first_sem_results else {}
+    second_summary = get_credit_units_summary(second_sem_results) if second_sem_results else {}
+
+    if first_summary:
+        first_summary['gpa'] = history.first_semester_gpa if history else calculate_gpa(first_sem_results)
+    if second_summary:
+        second_summary['gpa'] = history.second_semester_gpa if history else calculate_gpa(second_sem_results)
+
+    all_results = first_sem_results + second_sem_results
+    cumulative = get_credit_units_summary(all_results) if all_results else {}
+    if cumulative:
+        cumulative['cgpa'] = calculate_gpa(all_results)
+
+    student_data = {
+        'matric_number': student.matric_number,
+        'name': student.full_name,
+        'gender': student.gender,
+        'program': student.program,
+        'level': student.level
+    }
+
+    results_data = {
+        'session': session_name or 'N/A',
+        'first_semester': first_sem_data,
+        'second_semester': second_sem_data,
+        'first_semester_summary': first_summary,
+        'second_semester_summary': second_summary,
+        'cumulative': cumulative,
+        'summary_title': summary_title,
+        'gpa_label': gpa_label,
+        'summary_gpa': calculate_gpa(all_results) if all_results else 0.0
+    }
+
+    return student_data, results_data
+
+
+def load_result_slips(session, level, program, semester_filter='all'):
+    """
+    Slip data for every student of a level and program in a session.
+
+    Students, their results (with courses) and their history rows are
+    fetched with one query each, whatever the number of students.
+
+    Args:
+        session: The AcademicSession
+        level: Student level
+        program: Program name
+        semester_filter: As for build_result_slip
+
+    Returns:
+        list: (filename, student_data, results_data) per student, by matric number
+    """
+    students = Student.query.filter_by(
+        session_id=session.id, level=level, program=program
+    ).order_by(Student.matric_number).all()
+    if not students:
+        return []
+
+    student_ids = db.session.query(Student.id).filter_by(
+        session_id=session.id, level=level, program=program
+    ).scalar_subquery()
+
+    results = {}
+    for result in Result.query.join(Course).filter(
+            Result.session_id == session.id,
+            Result.student_id.in_(student_ids)
+    ).options(contains_eager(Result.course)).order_by(Result.id).all():
+        results.setdefault(result.student_id, {1: [], 2: []})[result.course.semester].append(result)
+
+    histories = {
+        row.student_matric: row for row in StudentAcademicHistory.query.filter(
+            StudentAcademicHistory.session_id == session.id,
+            StudentAcademicHistory.student_matric.in_([s.matric_number for s in students])
+        ).all()
+    }
+
+    documents = []
+    for student in students:
+        by_semester = results.get(student.id, {1: [], 2: []})
+        student_data, results_data = build_result_slip(
+            student, by_semester[1], by_semester[2], session.session_name, semester_filter,
+            histories.get(student.matric_number)
+        )
+        documents.append((result_slip_filename(student.matric_number, session.session_name),
+                          student_data, results_data))
+    return documents
+
+
+def _render_result_slip(student_data, results_data, config, logo_path):
+    """Render one slip to bytes"""
+    return generate_student_result_pdf(student_data, results_data, config, logo_path=logo_path).getvalue()
+
+
+def _init_render_worker(config, logo_path):
+    """
+    Set up a spawned render worker: keep the slip settings and decode the logo.
+
+    Workers only render; they never create the app or open the database.
+    """
+    _worker_settings.update(config=config, logo_path=logo_path)
+    get_logo_image(logo_path)
+
+
+def _render_worker_slip(student_data, results_data):
+    """Render one slip with the worker's settings (runs in a worker process)"""
+    return _render_result_slip(student_data, results_data, _worker_settings['config'],
+                               _worker_settings['logo_path'])
+
+
+def render_result_slips(documents, workers=None, logo_path=''):
+    """
+    Render slips across a pool of worker processes.
+
+    A bounded number of slips is rendered ahead of the consumer, so memory
+    stays flat for large batches while every core is kept busy. Workers are
+    spawned rather than forked: the caller may be a threaded server or a job
+    thread holding locks and database connections a fork would copy. Each
+    worker is given the settings and logo once, when it starts.
+
+    Args:
+        documents: (filename, student_data, results_data) tuples from load_result_slips
+        workers: Worker processes (default: one per CPU core); 1 renders inline
+        logo_path: Logo image for the header ('' for none)
+
+    Yields:
+        tuple: (filename, PDF bytes) in the order of documents
+    """
+    config = result_slip_config()
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(documents) < 2:
+        for filename, student_data, results_data in documents:
+            yield filename, _render_result_slip(student_data, results_data, config, logo_path)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(documents)),
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_render_worker, initargs=(config, logo_path))
+    try:
+        pending = deque()
+        for filename, student_data, results_data in documents:
+            pending.append((filename, executor.submit(_render_worker_slip, student_data, results_data)))
+            if len(pending) >= workers * RENDER_AHEAD_PER_WORKER:
+                filename, future = pending.popleft()
+                yield filename, future.result()
+        while pending:
+            filename, future = pending.popleft()
+            yield filename, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _ZipStream:
+    """Write-only buffer the ZIP writer appends to and the response drains"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_result_slips_zip(documents, workers=None, logo_path=''):
+    """
+    Stream a ZIP archive of result slips as they are rendered.
+
+    The archive is written without seeking, so each slip is sent to the
+    client as soon as it is rendered instead of after the whole batch.
+
+    Args:
+        documents: (filename, student_data, results_data) tuples from load_result_slips
+        workers: Worker processes, as for render_result_slips
+        logo_path: Logo image for the header ('' for none)
+
+    Yields:
+        bytes: The next part of the archive
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf in render_result_slips(documents, workers, logo_path):
+            archive.writestr(filename, pdf)
+            yield stream.drain()
+    yield stream.drain()
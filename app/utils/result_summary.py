@@ -0,0 +1,65 @@
+"""Pass/fail and grade summaries of a session's results, aggregated in SQL"""
+from sqlalchemy import func, select
+from app import db
+from app.models import Result, Course
+from app.utils.revisions import RevisionCache, COURSES_SCOPE, session_scope
+
+_summary_cache = RevisionCache()
+
+
+def summarize_results(session_id, level=None, program=None):
+    """
+    Result counts of a session from one grouped aggregate query.
+
+    Results are counted per (course level, grade); the totals, the grade
+    distribution and the per-level breakdown are all sums of those few rows.
+
+    Args:
+        session_id: Academic session ID
+        level: Only count courses of this level (e.g. from get_accessible_filters)
+        program: Only count courses of this program
+
+    Returns:
+        dict: {
+            'total', 'passed', 'failed': counts,
+            'grades': {grade: count},
+            'by_level': {level: {'total', 'passed', 'failed', 'grades'}} by level
+        }
+    """
+    query = select(Course.level, Result.grade, func.count(Result.id)).join(
+        Course, Result.course_id == Course.id
+    ).where(Result.session_id == session_id).group_by(Course.level, Result.grade)
+    if level:
+        query = query.where(Course.level == level)
+    if program:
+        query = query.where(Course.program == program)
+
+    summary = {'total': 0, 'passed': 0, 'failed': 0, 'grades': {}, 'by_level': {}}
+    for course_level, grade, count in db.session.execute(query.order_by(Course.level, Result.grade)):
+        level_summary = summary['by_level'].setdefault(
+            course_level, {'total': 0, 'passed': 0, 'failed': 0, 'grades': {}}
+        )
+        for totals in (summary, level_summary):
+            totals['total'] += count
+            totals['failed' if grade == 'F' else 'passed'] += count
+            totals['grades'][grade] = totals['grades'].get(grade, 0) + count
+    return summary
+
+
+def get_results_summary(session_id, level=None, program=None):
+    """
+    summarize_results(), cached until the session's results or the courses change.
+
+    Returns:
+        dict: As for summarize_results; treat it as read-only
+    """
+    return _summary_cache.get_or_compute(
+        (session_id, level, program),
+        (session_scope(session_id), COURSES_SCOPE),
+        lambda: summarize_results(session_id, level, program)
+    )
+
+
+def get_results_summary_cache():
+    """Get the cache behind get_results_summary"""
+    return _summary_cache
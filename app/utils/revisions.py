@@ -0,0 +1,422 @@
+"""Revision counters for the result data, bumped by every committed change"""
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from flask import g, has_app_context
+from sqlalchemy import event, inspect, select, update, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import db
+from app.models import DataRevision, Result, Carryover, Student, GradingSystem, Course, User, AcademicSession
+
+GLOBAL_SCOPE = 'global'
+GRADING_SCOPE = 'grading'
+COURSES_SCOPE = 'courses'
+USERS_SCOPE = 'users'
+SESSIONS_SCOPE = 'sessions'
+LOGO_SCOPE = 'logo'
+
+
+def session_scope(session_id):
+    """Scope of every result in a session"""
+    return f'session:{session_id}'
+
+
+def course_scope(session_id, course_id):
+    """Scope of a course's results in a session"""
+    return f'course:{session_id}:{course_id}'
+
+
+def class_scope(session_id, level, program):
+    """Scope of a level and program's results and carryovers in a session"""
+    return f'class:{session_id}:{level}:{program}'
+
+
+def get_revisions(*scopes):
+    """
+    Current revision of each scope in one query.
+
+    Returns:
+        dict: scope -> revision (0 for scopes never changed)
+    """
+    rows = db.session.execute(
+        select(DataRevision.scope, DataRevision.revision).where(DataRevision.scope.in_(scopes))
+    ).all()
+    revisions = dict.fromkeys(scopes, 0)
+    revisions.update(rows)
+    return revisions
+
+
+def revision_token(*scopes):
+    """
+    Cheap "has anything changed?" token for a set of scopes.
+
+    Compare the token with the one stored next to a cached value: if they
+    differ, something in one of the scopes has been committed since. The
+    grading scope is always included, as grading changes every result.
+
+    Returns:
+        str: e.g. 'course:1:5=3;grading=1'
+    """
+    revisions = get_revisions(GRADING_SCOPE, *scopes)
+    return ';'.join(f'{scope}={revisions[scope]}' for scope in sorted(revisions))
+
+
+def current_revision(scope):
+    """
+    Revision of one scope, read once per app context (a request or a job).
+
+    For process-wide caches consulted many times per request, such as the
+    compiled grading tables: the revision is re-read when this process
+    commits a change to the scope, and otherwise on the next request.
+
+    Returns:
+        int: The revision, or None outside an app context
+    """
+    if not has_app_context():
+        return None
+    revisions = g.setdefault('current_revisions', {})
+    if scope not in revisions:
+        revisions[scope] = get_revisions(scope)[scope]
+    return revisions[scope]
+
+
+def mark_changed(*scopes):
+    """
+    Bump scopes when the current transaction commits.
+
+    For changes the session hooks cannot see, such as a replaced logo file.
+    """
+    _changes(db.session()).scopes.update(scopes)
+
+
+_revision_caches = weakref.WeakSet()
+
+
+class RevisionCache:
+    """
+    In-memory values computed from the result data, kept until their scopes change.
+
+    Each entry remembers the revisions of the scopes it was computed from;
+    a lookup re-reads those revisions (one query) and recomputes the value
+    only if one has moved on. The least recently used entries are dropped
+    past max_entries. Every cache is cleared by init_revisions, as a new
+    app may be bound to a different database.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (revisions, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _revision_caches.add(self)
+
+    def get_or_compute(self, key, scopes, compute):
+        """
+        Cached value for key, recomputed if any of its scopes has changed.
+
+        Args:
+            key: Hashable cache key
+            scopes: Scopes the value is computed from
+            compute: Function returning the value
+
+        Returns:
+            The value
+        """
+        revisions = get_revisions(*scopes)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == revisions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (revisions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+class RevisionChanges:
+    """
+    Rows changed in a transaction, resolved to scopes at commit.
+
+    Results and carryovers are kept by their scope columns; the class they
+    belong to is looked up from their students when the transaction commits,
+    with one query however many rows changed.
+    """
+
+    def __init__(self):
+        self.scopes = set()
+        self.results = set()       # (session_id, course_id, student_id)
+        self.carryovers = set()    # (course_id, session_id, student_matric)
+
+    def __bool__(self):
+        return bool(self.scopes or self.results or self.carryovers)
+
+    def add_result(self, session_id, course_id, student_id):
+        self.results.add((session_id, course_id, student_id))
+
+    def add_carryover(self, course_id, session_id, student_matric):
+        if session_id is not None:
+            self.carryovers.add((course_id, session_id, student_matric))
+
+    def add_student(self, session_id, level, program):
+        if session_id is not None:
+            self.scopes.update((session_scope(session_id), class_scope(session_id, level, program)))
+        else:
+            # Students outside any session are only counted in global listings
+            self.scopes.add(GLOBAL_SCOPE)
+
+    def resolve(self, session):
+        """
+        Scopes touched by the recorded changes.
+
+        Returns:
+            set: Scope names to bump
+        """
+        scopes = set(self.scopes)
+        student_ids = set()
+        matrics = set()
+        for session_id, course_id, student_id in self.results:
+            scopes.update((session_scope(session_id), course_scope(session_id, course_id)))
+            student_ids.add(student_id)
+        for course_id, session_id, matric in self.carryovers:
+            scopes.update((session_scope(session_id), course_scope(session_id, course_id)))
+            matrics.add(matric)
+
+        # Results and carryovers also change their student's class sheet
+        if student_ids or matrics:
+            for session_id, level, program in session.execute(
+                select(Student.session_id, Student.level, Student.program).distinct()
+                .where(Student.id.in_(student_ids) | Student.matric_number.in_(matrics))
+            ):
+                scopes.update((session_scope(session_id), class_scope(session_id, level, program)))
+
+        if scopes:
+            scopes.add(GLOBAL_SCOPE)
+        return scopes
+
+
+def _changes(session, create=True):
+    changes = session.info.get('revision_changes')
+    if changes is None and create:
+        changes = session.info['revision_changes'] = RevisionChanges()
+    return changes
+
+
+def _values(obj, *keys):
+    """Current and previous values of attributes of a flushed object"""
+    state = inspect(obj)
+    values = {}
+    for key in keys:
+        history = state.attrs[key].history
+        values[key] = set(history.unchanged or ()) | set(history.added or ()) | set(history.deleted or ())
+        values[key].discard(None)
+    return values
+
+
+# Columns that place a row of each tracked table in its scopes
+_SCOPE_COLUMNS = {
+    Result: ('session_id', 'course_id', 'student_id'),
+    Carryover: ('course_id', 'original_session_id', 'cleared_session_id', 'student_matric'),
+    Student: ('session_id', 'level', 'program'),
+}
+
+
+# Tables tracked as a whole, by the one scope any change to them bumps
+_TABLE_SCOPES = {
+    GradingSystem: GRADING_SCOPE,
+    Course: COURSES_SCOPE,
+    AcademicSession: SESSIONS_SCOPE,
+}
+
+
+def _record_unloaded(session, flush_context, instances):
+    """
+    before_flush hook: record the old scope of objects moved to a new one.
+
+    Attributes are expired on commit and not reloaded when they are set,
+    so the old value of a changed scope column may be unknown at flush.
+    It is read from the database here, one query per table, while the
+    rows still hold it.
+    """
+    ids = {}
+    for obj in session.dirty:
+        attrs = inspect(obj).attrs
+        if any(attrs[key].history.added and not attrs[key].history.deleted
+               for key in _SCOPE_COLUMNS.get(type(obj), ())):
+            ids.setdefault(type(obj), set()).add(obj.id)
+    for model, model_ids in ids.items():
+        columns = [getattr(model, key) for key in _SCOPE_COLUMNS[model]]
+        for row in session.execute(select(*columns).where(model.id.in_(model_ids))).mappings():
+            _record_row(_changes(session), model, row)
+
+
+def _record_objects(session, flush_context):
+    """after_flush hook: record ORM objects added, changed or deleted"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+
+        if isinstance(obj, Result):
+            values = _values(obj, 'session_id', 'course_id', 'student_id')
+            for session_id in values['session_id']:
+                for course_id in values['course_id']:
+                    for student_id in values['student_id']:
+                        _changes(session).add_result(session_id, course_id, student_id)
+        elif isinstance(obj, Carryover):
+            values = _values(obj, 'course_id', 'original_session_id', 'cleared_session_id', 'student_matric')
+            for course_id in values['course_id']:
+                for matric in values['student_matric']:
+                    for session_id in values['original_session_id'] | values['cleared_session_id']:
+                        _changes(session).add_carryover(course_id, session_id, matric)
+        elif isinstance(obj, Student):
+            values = _values(obj, 'session_id', 'level', 'program')
+            for session_id in values['session_id']:
+                for level in values['level']:
+                    for program in values['program']:
+                        _changes(session).add_student(session_id, level, program)
+        elif type(obj) in _TABLE_SCOPES:
+            _changes(session).scopes.add(_TABLE_SCOPES[type(obj)])
+        elif isinstance(obj, User) and (obj not in session.dirty or any(
+                inspect(obj).attrs[key].history.has_changes() for key in ('is_active', 'role'))):
+            # Accounts added, removed, (de)activated or given a new role; logins are not data changes
+            _changes(session).scopes.add(USERS_SCOPE)
+
+
+def _record_row(changes, model, row):
+    if model is Result:
+        changes.add_result(row['session_id'], row['course_id'], row['student_id'])
+    elif model is Carryover:
+        changes.add_carryover(row['course_id'], row.get('original_session_id'), row['student_matric'])
+        changes.add_carryover(row['course_id'], row.get('cleared_session_id'), row['student_matric'])
+    else:
+        changes.add_student(row.get('session_id'), row.get('level'), row.get('program'))
+
+
+def _record_statement(orm_execute_state):
+    """
+    do_orm_execute hook: record bulk INSERT, UPDATE and DELETE statements.
+
+    Inserted rows are recorded from their parameters. Rows an UPDATE or
+    DELETE is about to change are read first, with the statement's own WHERE
+    clause (or the primary keys of a bulk UPDATE), so rows that are deleted
+    or moved to another scope are still recorded under their old scope.
+    """
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model in _TABLE_SCOPES:
+        _changes(orm_execute_state.session).scopes.add(_TABLE_SCOPES[model])
+        return
+    if model not in _SCOPE_COLUMNS:
+        return
+
+    session = orm_execute_state.session
+    changes = _changes(session)
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+
+    if orm_execute_state.is_insert:
+        for row in rows:
+            _record_row(changes, model, row)
+        return
+
+    # Scope columns set for every row by UPDATE ... VALUES
+    values = {}
+    for column, value in (getattr(orm_execute_state.statement, '_values', None) or {}).items():
+        key = getattr(column, 'key', column)
+        if key in _SCOPE_COLUMNS[model]:
+            values[key] = getattr(value, 'value', None)
+
+    whereclause = orm_execute_state.statement.whereclause
+    by_id = {}
+    if whereclause is None and rows and all('id' in row for row in rows):
+        # Bulk UPDATE by primary key
+        by_id = {row['id']: row for row in rows}
+        whereclause = model.id.in_(by_id)
+    query = select(model.id, *[getattr(model, key) for key in _SCOPE_COLUMNS[model]])
+    if whereclause is not None:
+        query = query.where(whereclause)
+    for row in session.execute(query).mappings():
+        _record_row(changes, model, row)
+        moved = dict(values, **{key: value for key, value in by_id.get(row['id'], {}).items()
+                                if key in _SCOPE_COLUMNS[model]})
+        if moved:
+            _record_row(changes, model, dict(row, **moved))
+
+
+def _apply_revisions(session):
+    """before_commit hook: bump the revision of every scope changed in the transaction"""
+    if not (session.new or session.dirty or session.deleted or _changes(session, create=False)):
+        return
+    session.flush()
+    changes = session.info.pop('revision_changes', None)
+    if not changes:
+        return
+
+    scopes = changes.resolve(session)
+    if scopes:
+        _bump(session, scopes)
+
+
+def _bump(session, scopes):
+    """Add one to the revision of each scope, creating missing ones at 1"""
+    now = datetime.utcnow()
+    if has_app_context():
+        # Re-read these in current_revision after the commit
+        for scope in scopes:
+            g.get('current_revisions', {}).pop(scope, None)
+    rows = [{'scope': scope, 'revision': 1, 'updated_at': now} for scope in sorted(scopes)]
+    dialect = session.get_bind(mapper=DataRevision).dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}[dialect](DataRevision)
+        session.execute(upsert.on_conflict_do_update(
+            index_elements=[DataRevision.scope],
+            set_={'revision': DataRevision.revision + 1, 'updated_at': upsert.excluded.updated_at}
+        ), rows)
+        return
+
+    existing = set(session.execute(
+        select(DataRevision.scope).where(DataRevision.scope.in_(scopes))
+    ).scalars())
+    if existing:
+        session.execute(
+            update(DataRevision).where(DataRevision.scope.in_(existing))
+            .values(revision=DataRevision.revision + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    missing = [row for row in rows if row['scope'] not in existing]
+    if missing:
+        session.execute(insert(DataRevision), missing)
+
+
+def _discard_revisions(session):
+    """after_rollback hook: forget changes that were rolled back"""
+    session.info.pop('revision_changes', None)
+
+
+def init_revisions(app):
+    """Register the session hooks that maintain the revision counters"""
+    for cache in list(_revision_caches):
+        cache.clear()
+    if not event.contains(db.session, 'before_commit', _apply_revisions):
+        event.listen(db.session, 'before_flush', _record_unloaded)
+        event.listen(db.session, 'after_flush', _record_objects)
+        event.listen(db.session, 'do_orm_execute', _record_statement)
+        event.listen(db.session, 'before_commit', _apply_revisions)
+        event.listen(db.session, 'after_rollback', _discard_revisions)
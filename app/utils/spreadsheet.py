@@ -0,0 +1,220 @@
+"""Examination record spreadsheet data and PDF, shared by the report route and background jobs"""
+import os
+from app.models import User
+from app.utils.artifact_cache import get_artifact_cache
+from app.utils.grading import format_score_grade
+from app.utils.pdf_generator import generate_spreadsheet_pdf, get_logo_path
+from app.utils.result_matrix import build_result_matrix
+from app.utils.revisions import COURSES_SCOPE, SESSIONS_SCOPE, class_scope, revision_token
+from config import Config
+
+
+def spreadsheet_students_data(matrix, semester):
+    """
+    Per-student rows of the examination spreadsheet.
+
+    Args:
+        matrix: ResultMatrix for the session, level and program
+        semester: '1', '2' or 'both'
+
+    Returns:
+        list: One dict per student with scores by course code and summaries
+    """
+    students_data = []
+
+    for row in matrix.rows:
+        student = row['student']
+        student_row = {
+            'matric_number': student.matric_number,
+            'name': student.full_name,
+            'gender': student.gender,
+            'first_semester': {},
+            'second_semester': {},
+            'first_semester_summary': {'passed_units': 0, 'failed_units': 0, 'total_units': 0, 'gpa': 0},
+            'second_semester_summary': {'passed_units': 0, 'failed_units': 0, 'total_units': 0, 'gpa': 0},
+            'session_summary': {'passed_units': 0, 'failed_units': 0, 'total_units': 0, 'cgpa': 0},
+            'remark': row['remark']
+        }
+
+        for sem, key in ((1, 'first_semester'), (2, 'second_semester')):
+            if sem not in matrix.courses:
+                continue
+            for course, cell in zip(matrix.courses[sem], row['cells'][sem]):
+                student_row[key][course.course_code] = (
+                    format_score_grade(cell.total_score, cell.grade) if cell else '-'
+                )
+            summary = row['summaries'][sem]
+            if summary['count']:
+                student_row[f'{key}_summary'] = {
+                    'passed_units': summary['passed'],
+                    'failed_units': summary['failed'],
+                    'total_units': summary['total'],
+                    'gpa': summary['gpa']
+                }
+
+        # Calculate session summary if both semesters requested
+        session_summary = row['summaries']['session']
+        if semester == 'both' and session_summary['count']:
+            student_row['session_summary'] = {
+                'passed_units': session_summary['passed'],
+                'failed_units': session_summary['failed'],
+                'total_units': session_summary['total'],
+                'cgpa': session_summary['gpa']
+            }
+
+        students_data.append(student_row)
+
+    return students_data
+
+
+def spreadsheet_courses_data(courses):
+    """Course columns of the spreadsheet for the template and PDF"""
+    return [{
+        'code': c.course_code,
+        'title': c.course_title,
+        'status': c.status,
+        'credit_unit': c.credit_unit
+    } for c in courses]
+
+
+def spreadsheet_pdf_inputs(matrix, session, level, program, semester, dean_name, fallback_adviser_name=None):
+    """
+    Everything the examination spreadsheet PDF is rendered from.
+
+    Args:
+        matrix: ResultMatrix for the session, level and program
+        session: The AcademicSession
+        level: Student level
+        program: Program name
+        semester: '1', '2' or 'both'
+        dean_name: Name printed on the Dean's signature line
+        fallback_adviser_name: Course adviser name when the level has no adviser
+
+    Returns:
+        tuple: (data, config, signatories) for generate_spreadsheet_pdf
+    """
+    data = {
+        'students': spreadsheet_students_data(matrix, semester),
+        'first_semester_courses': spreadsheet_courses_data(matrix.courses.get(1, [])),
+        'second_semester_courses': spreadsheet_courses_data(matrix.courses.get(2, [])),
+        'level': level,
+        'program': program,
+        'semester': semester,
+        'session': session.session_name
+    }
+
+    return data, spreadsheet_config(), spreadsheet_signatories(level, program, dean_name, fallback_adviser_name)
+
+
+def spreadsheet_config():
+    """Institution names printed in the spreadsheet header"""
+    return {
+        'university_name': Config.UNIVERSITY_NAME,
+        'faculty_name': Config.FACULTY_NAME,
+        'department_name': Config.DEPARTMENT_NAME
+    }
+
+
+def spreadsheet_signatories(level, program, dean_name, fallback_adviser_name=None):
+    """Names printed on the spreadsheet's signature lines"""
+    # Get Course Adviser (level adviser for this level and program)
+    level_adviser = User.query.filter_by(
+        role='level_adviser',
+        level=level,
+        program=program
+    ).first()
+    course_adviser_name = level_adviser.full_name if level_adviser else fallback_adviser_name
+
+    # Get HOD name (user with role 'hod')
+    hod = User.query.filter_by(role='hod').first()
+    hod_name = hod.full_name if hod else 'N/A'
+
+    return {
+        'course_adviser': course_adviser_name,
+        'hod': hod_name,
+        'dean': dean_name
+    }
+
+
+def spreadsheet_matrix_error(matrix):
+    """Why a result matrix has nothing to print, or None if it can be printed"""
+    if not matrix.students:
+        return 'No students found for the selected criteria.'
+    if not any(matrix.courses.values()):
+        return 'No courses found for the selected criteria.'
+    return None
+
+
+def spreadsheet_pdf_filename(session, level, program, semester):
+    """Download filename of the examination spreadsheet PDF"""
+    return f"results_{program.replace(' ', '_')}_{level}_{semester}_{session.session_name.replace('/', '-')}.pdf"
+
+
+def build_spreadsheet_pdf(matrix, session, level, program, semester, dean_name, font_size=10,
+                          fallback_adviser_name=None):
+    """
+    Render the examination spreadsheet PDF from a result matrix.
+
+    Args:
+        matrix: ResultMatrix for the session, level and program
+        session: The AcademicSession
+        level: Student level
+        program: Program name
+        semester: '1', '2' or 'both'
+        dean_name: Name printed on the Dean's signature line
+        font_size: Table font size (minimum 10)
+        fallback_adviser_name: Course adviser name when the level has no adviser
+
+    Returns:
+        tuple: (BytesIO with the PDF, download filename)
+    """
+    data, config, signatories = spreadsheet_pdf_inputs(
+        matrix, session, level, program, semester, dean_name, fallback_adviser_name
+    )
+    pdf_buffer = generate_spreadsheet_pdf(data, config, signatories, font_size=max(10, font_size))
+    return pdf_buffer, spreadsheet_pdf_filename(session, level, program, semester)
+
+
+def cached_spreadsheet_pdf(session, level, program, semester, dean_name, font_size=10,
+                           fallback_adviser_name=None):
+    """
+    Examination spreadsheet PDF from the artifact cache, rendered on a miss.
+
+    The cache key is made from the request (session, level, program,
+    semester, font size), the revisions of the class's results, the grading
+    system, the courses and the sessions, the signatories and the logo, so
+    it is checked before any results are loaded and a cached file is served
+    until something printed on it changes.
+
+    Args:
+        As for build_spreadsheet_pdf, without the matrix
+
+    Returns:
+        tuple: (path of the cached PDF, download filename)
+
+    Raises:
+        ValueError: If the class has no students or no courses to print
+    """
+    font_size = max(10, font_size)
+    logo_path = get_logo_path()
+    logo_stamp = (logo_path, os.path.getmtime(logo_path)) if logo_path and os.path.exists(logo_path) else None
+    signatories = spreadsheet_signatories(level, program, dean_name, fallback_adviser_name)
+    revisions = revision_token(class_scope(session.id, level, program), COURSES_SCOPE, SESSIONS_SCOPE)
+
+    cache = get_artifact_cache()
+    key = cache.key('spreadsheet', session.id, level, program, semester, font_size, revisions,
+                    spreadsheet_config(), signatories, logo_stamp)
+
+    def render():
+        semesters = (1, 2) if semester == 'both' else (int(semester),)
+        matrix = build_result_matrix(session.id, level, program, semesters)
+        error = spreadsheet_matrix_error(matrix)
+        if error:
+            raise ValueError(error)
+        data, config, _ = spreadsheet_pdf_inputs(
+            matrix, session, level, program, semester, dean_name, fallback_adviser_name
+        )
+        return generate_spreadsheet_pdf(data, config, signatories, font_size=font_size).getvalue()
+
+    path = cache.get_or_render(key, render)
+    return path, spreadsheet_pdf_filename(session, level, program, semester)
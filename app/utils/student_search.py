@@ -0,0 +1,153 @@
+"""Full-text search of students by matric number and name (SQLite FTS5)"""
+from flask import current_app
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+from app import db
+from app.models import Student
+
+FTS_TABLE = 'student_search'
+
+# Student columns in the index; the trigram tokenizer matches any substring
+# of three or more characters, so partial matric numbers are found too
+SEARCH_COLUMNS = ('matric_number', 'surname', 'first_name', 'other_names')
+
+# Shortest term the trigram index can match; shorter searches fall back to LIKE
+MIN_TERM_LENGTH = 3
+
+_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{name}' for name in SEARCH_COLUMNS)
+_old_values = ', '.join(f'old.{name}' for name in SEARCH_COLUMNS)
+
+# External-content index over the students table, kept in step by triggers so
+# ORM changes, bulk statements and raw SQL are all indexed
+_DDL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"{_columns}, content='students', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON students BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON students BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); END",
+    f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON students BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+]
+_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _exists():
+    return db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {'name': FTS_TABLE}).first() is not None
+
+
+def rebuild_student_search():
+    """
+    Recreate the full-text index and its triggers, and index every student.
+
+    Returns:
+        int: Number of students indexed, or None if the database is not
+            SQLite or its SQLite lacks FTS5 with the trigram tokenizer
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    try:
+        for statement in _DROP + _DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+    except OperationalError:
+        db.session.rollback()
+        current_app.extensions['student_search'] = False
+        return None
+    current_app.extensions['student_search'] = True
+    return db.session.execute(select(db.func.count()).select_from(Student)).scalar()
+
+
+def ensure_student_search():
+    """
+    Create the full-text index if it is missing (called at startup).
+
+    Returns:
+        bool: Whether full-text search is available
+    """
+    available = db.engine.dialect.name == 'sqlite' and (_exists() or rebuild_student_search() is not None)
+    current_app.extensions['student_search'] = available
+    return available
+
+
+def search_available():
+    """Whether searches use the full-text index (else they fall back to LIKE)"""
+    return current_app.extensions.get('student_search', False)
+
+
+def _match_query(term, columns):
+    """FTS5 query for a search term: every word of three or more characters, in the given columns"""
+    words = [word for word in term.split() if len(word) >= MIN_TERM_LENGTH]
+    if not words:
+        return None
+    phrases = ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+    if tuple(columns) == SEARCH_COLUMNS:
+        return phrases
+    return '{%s} : (%s)' % (' '.join(columns), phrases)
+
+
+def student_search_clause(term, columns=SEARCH_COLUMNS):
+    """
+    Filter matching students whose columns contain the search term.
+
+    Uses the full-text index where available and the term is long enough;
+    otherwise the whole term is matched with ILIKE, as before.
+
+    Args:
+        term: Search text, e.g. 'CSC/2023' or 'adebayo john'
+        columns: Student columns to search (a subset of SEARCH_COLUMNS)
+
+    Returns:
+        SQL expression for Query.filter
+    """
+    match = _match_query(term, columns) if search_available() else None
+    if match is None:
+        return db.or_(*[getattr(Student, name).ilike(f'%{term}%') for name in columns])
+    matched = select(_fts.c.rowid).where(literal_column(FTS_TABLE).op('MATCH')(match))
+    return Student.id.in_(matched)
+
+
+def search_students(term, session_id=None, level=None, program=None, limit=50):
+    """
+    Students matching a search term, best match first.
+
+    Args:
+        term: Search text
+        session_id: Only students of this session
+        level: Only this level (e.g. from get_accessible_filters)
+        program: Only this program (e.g. from get_accessible_filters)
+        limit: Most IDs to return
+
+    Returns:
+        list: Student IDs, ranked by relevance (then matric number)
+    """
+    term = term.strip()
+    if not term:
+        return []
+    match = _match_query(term, SEARCH_COLUMNS) if search_available() else None
+    if match is not None:
+        query = select(Student.id).join(_fts, _fts.c.rowid == Student.id).where(
+            literal_column(FTS_TABLE).op('MATCH')(match)
+        ).order_by(_fts.c.rank, Student.matric_number)
+    else:
+        query = select(Student.id).where(student_search_clause(term)).order_by(Student.matric_number)
+
+    if session_id:
+        query = query.where(Student.session_id == session_id)
+    if level:
+        query = query.where(Student.level == level)
+    if program:
+        query = query.where(Student.program == program)
+    return list(db.session.execute(query.limit(limit)).scalars())
@@ -0,0 +1,26 @@
+"""Request body limits: small by default, larger for the streamed CSV uploads"""
+from flask import Request, current_app
+
+
+def streamed_upload(view):
+    """
+    Allow a view's requests up to UPLOAD_MAX_CONTENT_LENGTH instead of MAX_CONTENT_LENGTH.
+
+    Only for views that stream the uploaded file to disk and parse it in
+    chunks; apply it below @login_required so the mark is carried over.
+    """
+    view.streamed_upload = True
+    return view
+
+
+class UploadRequest(Request):
+    """Request whose body limit follows the matched view (set as app.request_class)"""
+
+    @property
+    def max_content_length(self):
+        # The endpoint is matched before CSRF reads the form, so the raised
+        # limit applies from the first access to the body
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        if getattr(view, 'streamed_upload', False):
+            return current_app.config['UPLOAD_MAX_CONTENT_LENGTH']
+        return current_app.config['MAX_CONTENT_LENGTH']
@@ -0,0 +1,67 @@
+"""
+Generate the result slips of a whole level and program as one ZIP
+
+Slips are rendered in parallel, one worker process per CPU core unless
+--workers says otherwise.
+
+Usage:
+    python batch_student_pdfs.py --level 200 --program "Computer Science"
+    python batch_student_pdfs.py --session 2025/2026 --level 100 --program "Cyber Security" \\
+        --semester 1 --output slips.zip --workers 4
+"""
+import argparse
+import time
+from app import create_app
+from app.models import AcademicSession
+from app.utils.pdf_generator import get_logo_path
+from app.utils.result_slips import load_result_slips, iter_result_slips_zip, result_slips_zip_filename
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate result slips for a level and program')
+    parser.add_argument('--session', help='Session name, e.g. 2025/2026 (default: current session)')
+    parser.add_argument('--level', type=int, required=True)
+    parser.add_argument('--program', required=True)
+    parser.add_argument('--semester', default='all', choices=['all', '1', '2'])
+    parser.add_argument('--output', help='ZIP file to write (default: results_<program>_<level>_<session>.zip)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: PDF_WORKERS or one per core)')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        if args.session:
+            session = AcademicSession.query.filter_by(session_name=args.session).first()
+        else:
+            session = AcademicSession.query.filter_by(is_current=True).first()
+        if not session:
+            print(f"❌ Session not found: {args.session or 'no current session'}")
+            return 1
+
+        print("=" * 60)
+        print(f"Result slips: {args.program} {args.level} Level, {session.session_name}")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        documents = load_result_slips(session, args.level, args.program, args.semester)
+        if not documents:
+            print("❌ No students found for the selected criteria.")
+            return 1
+        print(f"✓ Loaded {len(documents)} students in {time.perf_counter() - start:.2f}s")
+
+        output = args.output or result_slips_zip_filename(session, args.level, args.program)
+        archive = iter_result_slips_zip(documents, args.workers or app.config.get('PDF_WORKERS'),
+                                        get_logo_path() or '')
+        with open(output, 'wb') as f:
+            for data in archive:
+                f.write(data)
+
+        elapsed = time.perf_counter() - start
+        print(f"✓ Wrote {len(documents)} slips to {output} in {elapsed:.2f}s "
+              f"({len(documents) / elapsed:.1f} slips/s)")
+        print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
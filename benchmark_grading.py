@@ -0,0 +1,82 @@
+"""
+Benchmark: per-row grading cost with the compiled grading table cache
+
+Grades a simulated 900-student upload four ways and reports the time and
+number of SQL statements per row:
+  1. Uncached - the original GradingSystem query on every score
+  2. Cold cache - first call compiles the table, the rest bisect
+  3. Warm cache - table already compiled
+  4. Bulk - whole score column graded in one vectorized call
+
+Usage:
+    python benchmark_grading.py [rows]
+"""
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import GradingSystem
+from app.utils.grading import get_grade_info, get_grade_info_bulk, invalidate_grading_cache
+
+
+def uncached_grade_info(score, degree_type='BSc'):
+    """The original implementation: query the grading rows every time"""
+    grading = GradingSystem.query.filter_by(degree_type=degree_type).all()
+    for grade in grading:
+        if grade.min_score <= score <= grade.max_score:
+            return (grade.grade, grade.grade_point)
+    return ('F', 0)
+
+
+def run(label, grade_fn, scores):
+    """Time grade_fn over all scores and count SQL statements issued"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        start = time.perf_counter()
+        for score in scores:
+            grade_fn(score, 'BSc')
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    per_row_us = elapsed / len(scores) * 1_000_000
+    print(f"{label:<14} {elapsed * 1000:10.2f} ms  {per_row_us:10.2f} us/row  "
+          f"{len(statements):6d} queries")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 900
+    random.seed(2026)
+    scores = [round(random.uniform(0, 100), 1) for _ in range(rows)]
+
+    app = create_app('testing')
+    with app.app_context():
+        print("=" * 60)
+        print(f"GRADING BENCHMARK ({rows} rows)")
+        print("=" * 60)
+
+        uncached = run('Uncached', uncached_grade_info, scores)
+        invalidate_grading_cache()
+        run('Cold cache', get_grade_info, scores)
+        warm = run('Warm cache', get_grade_info, scores)
+
+        start = time.perf_counter()
+        get_grade_info_bulk(scores, 'BSc')
+        bulk = time.perf_counter() - start
+        print(f"{'Bulk':<14} {bulk * 1000:10.2f} ms  {bulk / rows * 1_000_000:10.2f} us/row")
+
+        print("-" * 60)
+        print(f"Speed-up (warm vs uncached): {uncached / warm:.0f}x")
+        print(f"Speed-up (bulk vs warm):     {warm / bulk:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Benchmark: column-width measurement of the examination spreadsheet
+
+Measures the columns of a department-scale spreadsheet (500 students,
+40 courses over both semesters by default) two ways and reports the time
+and number of font-metric calls of each:
+  1. Per cell - the original loop, stringWidth on every cell of every column
+  2. Memoized - measure_column_widths, one pass with distinct strings measured once
+
+Then times the whole generate_spreadsheet_pdf for the same class.
+
+Usage:
+    python benchmark_spreadsheet_layout.py [students] [courses]
+"""
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reportlab.lib.units import cm
+from app import create_app
+from app.utils import pdf_generator
+from app.utils.pdf_generator import VerticalText, measure_column_widths, generate_spreadsheet_pdf
+
+GRADES = [(70, 'A'), (60, 'B'), (50, 'C'), (45, 'D'), (40, 'E'), (0, 'F')]
+
+
+def per_cell_widths(table_data, total_cols, font_size, padding):
+    """The original implementation: measure every cell of every column"""
+    col_widths = []
+    for col_idx in range(total_cols):
+        max_width = 0
+        for row_idx, row in enumerate(table_data):
+            if col_idx < len(row):
+                cell_content = row[col_idx]
+                if isinstance(cell_content, VerticalText):
+                    cell_width = cell_content.fontSize + 0.15*cm
+                else:
+                    text = str(cell_content)
+                    cell_font_size = 8 if row_idx <= 3 else font_size
+                    lines = text.split('\n')
+                    max_line_width = max([pdf_generator.stringWidth(line, 'Helvetica-Bold' if row_idx <= 3 else 'Helvetica', cell_font_size) for line in lines] or [0])
+                    cell_width = max_line_width + padding
+                max_width = max(max_width, cell_width)
+        col_widths.append(max_width)
+    return col_widths
+
+
+def grade(score):
+    return next(letter for minimum, letter in GRADES if score >= minimum)
+
+
+def spreadsheet_data(students, courses):
+    """Spreadsheet data shaped like spreadsheet_students_data output"""
+    random.seed(2026)
+    half = courses // 2
+    first = [{'code': f'CSC{100 + i}', 'title': f'Course Title Number {i}', 'status': 'C', 'credit_unit': 3}
+             for i in range(half)]
+    second = [{'code': f'CSC{200 + i}', 'title': f'Course Title Number {i}', 'status': 'E', 'credit_unit': 2}
+              for i in range(courses - half)]
+    summary = lambda: {'passed_units': random.randint(20, 40), 'failed_units': random.randint(0, 9),
+                       'total_units': 45, 'gpa': round(random.uniform(1, 5), 2)}
+    rows = []
+    for i in range(students):
+        scores = lambda course_list: {c['code']: (lambda s: f'{s}{grade(s)}')(random.randint(20, 95))
+                                      for c in course_list}
+        rows.append({
+            'matric_number': f'CSC/2022/{i:04d}',
+            'name': f'SURNAME{i} Firstname Othername',
+            'gender': 'MF'[i % 2],
+            'first_semester': scores(first),
+            'second_semester': scores(second),
+            'first_semester_summary': summary(),
+            'second_semester_summary': summary(),
+            'session_summary': dict(summary(), cgpa=round(random.uniform(1, 5), 2)),
+            'remark': random.choice(['Proceed', 'Proceed', 'Proceed', 'CSC101, CSC203'])
+        })
+    return {'students': rows, 'first_semester_courses': first, 'second_semester_courses': second,
+            'level': 300, 'program': 'Computer Science', 'semester': 'both', 'session': '2025/2026'}
+
+
+def capture_table(data):
+    """Build the spreadsheet once and capture the table it measures"""
+    captured = {}
+    original = pdf_generator.measure_column_widths
+
+    def capture(table_data, total_cols, *args):
+        captured['table'] = ([list(row) for row in table_data], total_cols)
+        return original(table_data, total_cols, *args)
+
+    pdf_generator.measure_column_widths = capture
+    try:
+        start = time.perf_counter()
+        generate_spreadsheet_pdf(data, {})
+        captured['pdf_time'] = time.perf_counter() - start
+    finally:
+        pdf_generator.measure_column_widths = original
+    return captured
+
+
+def run(label, measure):
+    """Time a measurement and count stringWidth calls"""
+    calls = []
+    original = pdf_generator.stringWidth
+    pdf_generator.stringWidth = lambda *args: calls.append(1) or original(*args)
+    try:
+        start = time.perf_counter()
+        widths = measure()
+        elapsed = time.perf_counter() - start
+    finally:
+        pdf_generator.stringWidth = original
+    print(f"{label:<12} {elapsed * 1000:10.2f} ms  {len(calls):8d} stringWidth calls")
+    return elapsed, widths
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    courses = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    app = create_app('testing')
+    with app.app_context():
+        captured = capture_table(spreadsheet_data(students, courses))
+    table_data, total_cols = captured['table']
+
+    print("=" * 60)
+    print(f"SPREADSHEET LAYOUT BENCHMARK ({students} students, {courses} courses, {total_cols} columns)")
+    print("=" * 60)
+
+    padding = 0.2*cm
+    per_cell, reference = run('Per cell', lambda: per_cell_widths(table_data, total_cols, 10, padding))
+    memoized, widths = run('Memoized', lambda: measure_column_widths(table_data, total_cols, 4, 8, 10, padding))
+    assert all(abs(a - b) < 1e-6 for a, b in zip(reference, widths)), 'Column widths differ'
+
+    print("-" * 60)
+    print(f"Speed-up (memoized vs per cell): {per_cell / memoized:.1f}x")
+    print(f"Whole spreadsheet PDF:           {captured['pdf_time'] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
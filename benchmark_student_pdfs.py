@@ -0,0 +1,87 @@
+"""
+Benchmark: batch result slip rendering across worker processes
+
+Renders a synthetic class of result slips (12 courses per student) into a
+ZIP with 1, 2, 4 and one-per-core worker processes, and reports the time
+and slips per second of each. Speed-up is bounded by the number of cores.
+
+Usage:
+    python benchmark_student_pdfs.py [students]
+"""
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.result_slips import iter_result_slips_zip
+
+
+def synthetic_documents(count):
+    """Slip data shaped like load_result_slips output"""
+    random.seed(2026)
+    documents = []
+    for i in range(count):
+        semesters = {}
+        for sem in ('first_semester', 'second_semester'):
+            semesters[sem] = [{
+                'course_code': f'CSC{200 + j}',
+                'course_title': f'Course Title {j}',
+                'credit_unit': 3,
+                'total_score': score,
+                'grade': 'A' if score >= 70 else 'B' if score >= 60 else 'C' if score >= 50 else 'F',
+                'grade_point': 5 if score >= 70 else 4 if score >= 60 else 3 if score >= 50 else 0
+            } for j, score in ((j, random.randint(30, 95)) for j in range(6))]
+        summary = {'total_units': 18, 'passed_units': 15, 'failed_units': 3, 'gpa': 3.5}
+        student_data = {
+            'matric_number': f'CSC/2024/{i:04d}',
+            'name': f'STUDENT{i}, Test',
+            'gender': 'M',
+            'program': 'Computer Science',
+            'level': 200
+        }
+        results_data = dict(semesters, **{
+            'session': '2025/2026',
+            'first_semester_summary': summary,
+            'second_semester_summary': summary,
+            'cumulative': dict(summary, total_units=36, cgpa=3.5),
+            'summary_title': 'CUMULATIVE SUMMARY',
+            'gpa_label': 'Cumulative GPA',
+            'summary_gpa': 3.5
+        })
+        documents.append((f'result_CSC-2024-{i:04d}_2025-2026.pdf', student_data, results_data))
+    return documents
+
+
+def run(workers, documents):
+    """Render documents into an in-memory ZIP with the given worker count"""
+    start = time.perf_counter()
+    size = sum(len(data) for data in iter_result_slips_zip(documents, workers))
+    elapsed = time.perf_counter() - start
+    print(f"{workers:>3} workers {elapsed:10.2f} s  {len(documents) / elapsed:8.1f} slips/s  "
+          f"{size / 1024:10.0f} KB")
+    return elapsed
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    documents = synthetic_documents(students)
+    cores = os.cpu_count() or 1
+
+    print("=" * 60)
+    print(f"RESULT SLIP BATCH BENCHMARK ({students} students, {cores} cores)")
+    print("=" * 60)
+
+    timings = {}
+    for workers in sorted({1, 2, 4, cores}):
+        timings[workers] = run(workers, documents)
+
+    print("-" * 60)
+    for workers, elapsed in timings.items():
+        if workers > 1:
+            print(f"Speed-up ({workers} vs 1 worker): {timings[1] / elapsed:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
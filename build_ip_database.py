@@ -0,0 +1,53 @@
+"""
+Build the offline IP geolocation database from an IP-range CSV
+
+The CSV has one range per row: start, end, city, region, country, lat, lon.
+Start and end may be IPv4/IPv6 addresses or integers. The compiled table is
+written to GEOIP_DATABASE_PATH (instance/ip_ranges.bin by default) and
+running workers pick it up on their next lookup.
+
+Usage:
+    python build_ip_database.py ranges.csv [output_path]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from app.utils.ip_ranges import build_ip_database, IpRangeDatabase
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    csv_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else Config.GEOIP_DATABASE_PATH
+    if not os.path.exists(csv_path):
+        print(f"❌ File not found: {csv_path}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("Building IP geolocation database")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    counts = build_ip_database(csv_path, output_path)
+    elapsed = time.perf_counter() - start
+
+    print(f"IPv4 ranges:  {counts['ipv4']}")
+    print(f"IPv6 ranges:  {counts['ipv6']}")
+    print(f"Locations:    {counts['locations']}")
+    if counts['skipped']:
+        print(f"⚠️  Skipped {counts['skipped']} invalid rows")
+
+    database = IpRangeDatabase(output_path)
+    database.close()
+    print(f"\n✓ Written {output_path} ({os.path.getsize(output_path):,} bytes) in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
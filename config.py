@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -13,6 +14,8 @@ class Config:
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
     LOGO_FOLDER = os.path.join(basedir, 'app', 'static', 'logos')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    UPLOAD_MAX_CONTENT_LENGTH = 256 * 1024 * 1024  # 256MB for the streamed results/student CSV uploads
+    CSV_CHUNK_SIZE = 1000  # CSV records parsed and written per batch
     ALLOWED_EXTENSIONS = {'csv'}
     ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     
@@ -28,6 +31,41 @@ class Config:
     MAX_LOGIN_ATTEMPTS = 5
     LOCKOUT_TIME = timedelta(minutes=15)
     
+    # IP geolocation cache (lookups are resolved by a background worker)
+    GEOLOCATION_CACHE_SIZE = 4096  # Addresses kept in memory
+    GEOLOCATION_TTL = timedelta(days=30)
+    GEOLOCATION_FAILURE_TTL = timedelta(hours=1)  # Retry failed lookups sooner
+    GEOLOCATION_RATE_LIMIT = 45  # Lookups per minute (ip-api.com free tier)
+    GEOLOCATION_QUEUE_SIZE = 1024  # Pending lookups; further misses are stored as Unknown
+    GEOLOCATION_BACKGROUND = True
+    GEOLOCATION_ONLINE_LOOKUPS = True  # Set to False on networks without internet access
+    
+    # Audit log writer (records are batched by a background thread)
+    AUDIT_ASYNC = True
+    AUDIT_QUEUE_SIZE = 10000  # Records beyond this are written synchronously
+    AUDIT_BATCH_SIZE = 200
+    AUDIT_FLUSH_INTERVAL = 1.0  # Seconds
+    
+    # Background jobs (uploads and report builds run on a local thread pool)
+    JOBS_BACKGROUND = True
+    JOB_WORKERS = 2
+    JOB_FOLDER = os.path.join(basedir, 'instance', 'jobs')  # Job uploads and finished artifacts
+    JOB_RETENTION = timedelta(days=7)  # Finished jobs and their files are purged after this
+    JOB_PROGRESS_INTERVAL = 2  # Seconds between progress writes to the jobs table
+    
+    # Rendered report PDFs, reused until the data printed on them changes
+    ARTIFACT_CACHE_FOLDER = os.path.join(basedir, 'instance', 'artifacts')
+    ARTIFACT_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Least recently used entries are evicted past this
+    
+    # Dashboard counters, reused until the data changes or the TTL runs out
+    DASHBOARD_STATS_TTL = timedelta(seconds=60)
+    
+    # Batch result slips (rendered in a process pool)
+    PDF_WORKERS = None  # None: one process per CPU core
+    
+    # Offline IP-range database, rebuilt with build_ip_database.py
+    GEOIP_DATABASE_PATH = os.path.join(basedir, 'instance', 'ip_ranges.bin')
+    
     # University Information
     UNIVERSITY_NAME = "Edo State University Iyamho"
     FACULTY_NAME = "Faculty of Science"
@@ -79,8 +117,21 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SECURE = True
 
 
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'  # In-memory database
+    WTF_CSRF_ENABLED = False
+    GEOLOCATION_BACKGROUND = False  # Tests drive lookups with process_pending()
+    GEOIP_DATABASE_PATH = None
+    AUDIT_ASYNC = False  # Write audit records inline
+    JOBS_BACKGROUND = False  # Run submitted jobs inline
+    JOB_FOLDER = os.path.join(tempfile.gettempdir(), 'result_processing_jobs')
+    ARTIFACT_CACHE_FOLDER = os.path.join(tempfile.gettempdir(), 'result_processing_artifacts')
+
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
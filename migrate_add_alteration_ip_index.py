@@ -0,0 +1,34 @@
+"""
+Database migration: Index result alterations by IP address
+Run this script so the geolocation worker can fill in pending locations
+without scanning the whole alteration log
+"""
+from app import create_app, db
+from app.models import ResultAlteration
+
+INDEX_NAME = 'ix_result_alterations_ip_location'
+
+app = create_app()
+
+with app.app_context():
+    print("=" * 60)
+    print("Adding Result Alteration IP Index")
+    print("=" * 60)
+
+    try:
+        inspector = db.inspect(db.engine)
+        existing = {index['name'] for index in inspector.get_indexes(ResultAlteration.__tablename__)}
+        if INDEX_NAME in existing:
+            print(f"✓ {INDEX_NAME} already exists")
+        else:
+            index = next(i for i in ResultAlteration.__table__.indexes if i.name == INDEX_NAME)
+            print(f"Creating {INDEX_NAME}...")
+            index.create(bind=db.engine)
+            print(f"✓ {INDEX_NAME} created")
+
+        print("\n" + "=" * 60)
+        print("MIGRATION COMPLETED SUCCESSFULLY!")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
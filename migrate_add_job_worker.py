@@ -0,0 +1,35 @@
+"""
+Migration script to add the worker column to the jobs table
+Records which process runs each background job, so jobs interrupted by a
+restart are marked failed when the application starts
+"""
+from app import create_app, db
+from sqlalchemy import text
+
+app = create_app()
+
+with app.app_context():
+    print("Adding worker column to jobs table...")
+
+    try:
+        # Check if column already exists
+        result = db.session.execute(text("""
+            SELECT COUNT(*)
+            FROM pragma_table_info('jobs')
+            WHERE name='worker'
+        """))
+        column_exists = result.scalar() > 0
+
+        if column_exists:
+            print("✓ Worker column already exists!")
+        else:
+            db.session.execute(text("""
+                ALTER TABLE jobs
+                ADD COLUMN worker VARCHAR(128)
+            """))
+            db.session.commit()
+            print("✓ Worker column added successfully!")
+
+    except Exception as e:
+        print(f"✗ Error: {str(e)}")
+        db.session.rollback()
@@ -0,0 +1,39 @@
+"""
+Database migration: Add composite indexes for the student and course lists
+Run this script so the list pages can seek on their sort keys under each filter
+"""
+from app import create_app, db
+from app.models import Student, Course
+
+app = create_app()
+
+with app.app_context():
+    print("=" * 60)
+    print("Adding List Pagination Indexes")
+    print("=" * 60)
+
+    try:
+        inspector = db.inspect(db.engine)
+
+        for model in (Student, Course):
+            table = model.__table__
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if index.name in existing:
+                    print(f"✓ {index.name} already exists")
+                    continue
+                print(f"Creating {index.name}...")
+                index.create(bind=db.engine)
+                print(f"✓ {index.name} created")
+
+        print("\n" + "=" * 60)
+        print("MIGRATION COMPLETED SUCCESSFULLY!")
+        print("=" * 60)
+        print("\nThe student and course lists now:")
+        print("  ✓ Page with cursors instead of OFFSET")
+        print("  ✓ Seek by matric number within a session or class")
+        print("  ✓ Seek by level, semester and course code among active courses")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
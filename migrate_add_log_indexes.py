@@ -0,0 +1,53 @@
+"""
+Database migration: Add composite indexes to the audit and alteration logs
+Run this script so the log pages can seek on id under each filter; it also
+drops the (filter, created_at, id) indexes an earlier version created
+"""
+from sqlalchemy import text
+from app import create_app, db
+from app.models import AuditLog, ResultAlteration
+
+# Indexes from when the pages sorted on created_at, which is nullable
+SUPERSEDED_INDEXES = {
+    AuditLog: ['ix_audit_logs_action_created_id', 'ix_audit_logs_category_created_id',
+               'ix_audit_logs_status_created_id'],
+    ResultAlteration: ['ix_result_alterations_type_created_id'],
+}
+
+app = create_app()
+
+with app.app_context():
+    print("=" * 60)
+    print("Adding Log Pagination Indexes")
+    print("=" * 60)
+
+    try:
+        inspector = db.inspect(db.engine)
+
+        for model in (AuditLog, ResultAlteration):
+            table = model.__table__
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                if index.name in existing:
+                    print(f"✓ {index.name} already exists")
+                    continue
+                print(f"Creating {index.name}...")
+                index.create(bind=db.engine)
+                print(f"✓ {index.name} created")
+            for name in SUPERSEDED_INDEXES[model]:
+                if name in existing:
+                    db.session.execute(text(f'DROP INDEX {name}'))
+                    db.session.commit()
+                    print(f"✓ {name} dropped (superseded)")
+
+        print("\n" + "=" * 60)
+        print("MIGRATION COMPLETED SUCCESSFULLY!")
+        print("=" * 60)
+        print("\nThe audit log and result alteration pages now:")
+        print("  ✓ Page with cursors instead of OFFSET")
+        print("  ✓ Use an index for each action, category, status and type filter")
+        print("  ✓ Show an approximate total instead of counting every row")
+        print("=" * 60)
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
@@ -0,0 +1,34 @@
+"""
+Rebuild the precomputed student academic history (GPA/CGPA per session)
+
+Recomputes StudentAcademicHistory rows for every student from their
+results. Run once to backfill existing data, or after bulk changes made
+outside the application.
+
+Usage:
+    python rebuild_academic_history.py
+"""
+import time
+from app import create_app, db
+from app.models import StudentAcademicHistory
+from app.utils.academic_history import rebuild_academic_history
+
+app = create_app()
+
+with app.app_context():
+    print("=" * 60)
+    print("Rebuilding Student Academic History")
+    print("=" * 60)
+    
+    try:
+        start = time.perf_counter()
+        written = rebuild_academic_history()
+        elapsed = time.perf_counter() - start
+        
+        print(f"✓ {written} session records written in {elapsed:.2f}s")
+        print(f"✓ {StudentAcademicHistory.query.count()} history rows in database")
+        print("=" * 60)
+    
+    except Exception as e:
+        print(f"\n❌ Error during rebuild: {e}")
+        db.session.rollback()
@@ -0,0 +1,22 @@
+"""
+Rebuild the full-text student search index
+Run this script after restoring a database, or if searches miss students that
+exist; it recreates the index and its triggers and indexes every student
+"""
+from app import create_app
+from app.utils import rebuild_student_search
+
+app = create_app()
+
+with app.app_context():
+    print("=" * 60)
+    print("Rebuilding Student Search Index")
+    print("=" * 60)
+
+    indexed = rebuild_student_search()
+    if indexed is None:
+        print("\n❌ Full-text search needs SQLite with FTS5 and the trigram tokenizer (3.34+)")
+        print("   Student searches will keep using LIKE matching")
+    else:
+        print(f"✓ {indexed} students indexed")
+    print("=" * 60)
@@ -21,11 +21,8 @@ import os
 from app import create_app, db
 from app.models import User, AcademicSession, GradingSystem
 
-# Create the Flask application
-app = create_app()
 
-
-def initialize_database():
+def initialize_database(app):
     """Initialize the database with default data."""
     with app.app_context():
         # Create all database tables
@@ -87,8 +84,12 @@ def initialize_database():
 
 
 if __name__ == '__main__':
+    # Create the Flask application here rather than at import: result slip
+    # workers are spawned, and each one re-imports this module
+    app = create_app()
+    
     # Initialize database with default data
-    initialize_database()
+    initialize_database(app)
     
     # Print startup information
     print("\n" + "=" * 60)
@@ -0,0 +1,192 @@
+"""
+Test script for the incrementally maintained student academic history
+Checks the stored GPAs against calculate_gpa, that result changes refresh
+the history in the same transaction, and that the student profile no longer
+queries per session
+"""
+import sys
+import os
+import random
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, StudentAcademicHistory, User
+from app.utils import (
+    calculate_gpa, get_grade_info, refresh_academic_history, rebuild_academic_history,
+    get_academic_history, get_academic_standing
+)
+
+
+def setup_data(student_count, session_count):
+    """Create consecutive sessions with a record, courses and results per student"""
+    random.seed(student_count)
+    sessions = [AcademicSession(session_name=f'{2020 + i}/{2021 + i}', is_current=(i == session_count - 1))
+                for i in range(session_count)]
+    db.session.add_all(sessions)
+    db.session.flush()
+
+    students = []
+    for index, session in enumerate(sessions):
+        level = 100 * (index + 1)
+        courses = [
+            Course(course_code=f'CSC{level // 100}{semester}{i}', course_title=f'Course {level}.{semester}.{i}',
+                   credit_unit=random.choice([2, 3]), semester=semester, level=level, program='Computer Science')
+            for semester in (1, 2) for i in range(3)
+        ]
+        records = [
+            Student(matric_number=f'CSC/2020/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                    program='Computer Science', level=level, session_id=session.id)
+            for i in range(student_count)
+        ]
+        db.session.add_all(courses + records)
+        db.session.flush()
+        for student in records:
+            for course in courses:
+                total = random.randint(10, 95)
+                grade, grade_point = get_grade_info(total, 'BSc')
+                db.session.add(Result(student_id=student.id, course_id=course.id, session_id=session.id,
+                                      ca_score=0, exam_score=total, total_score=total,
+                                      grade=grade, grade_point=grade_point))
+        students.extend(records)
+    db.session.commit()
+    return sessions, students
+
+
+def expected_history(matric):
+    """History computed the original way, one query per session"""
+    expected = {}
+    cumulative = []
+    records = Student.query.filter_by(matric_number=matric).join(AcademicSession).order_by(
+        AcademicSession.session_name).all()
+    for record in records:
+        results = Result.query.filter_by(student_id=record.id, session_id=record.session_id).all()
+        cumulative.extend(results)
+        expected[record.session_id] = {
+            'first': calculate_gpa([r for r in results if r.course.semester == 1]),
+            'second': calculate_gpa([r for r in results if r.course.semester == 2]),
+            'cgpa': calculate_gpa(cumulative),
+            'units': sum(r.course.credit_unit for r in results)
+        }
+    return expected
+
+
+def assert_history_matches(matric):
+    rows = get_academic_history(matric)
+    expected = expected_history(matric)
+    assert set(rows) == set(expected)
+    for session_id, values in expected.items():
+        row = rows[session_id]
+        assert (row.first_semester_gpa, row.second_semester_gpa, row.cgpa) == \
+            (values['first'], values['second'], values['cgpa']), (row.cgpa, values)
+        assert row.total_units_registered == values['units']
+        assert row.remarks == get_academic_standing(values['cgpa'], values['units'])
+
+
+def test_history_matches_calculate_gpa():
+    """Stored semester GPAs, CGPA and standing match the per-result helpers"""
+    print("\n" + "=" * 60)
+    print("TEST: Student academic history")
+    print("=" * 60)
+
+    app = create_app('testing')
+    with app.app_context():
+        _, students = setup_data(20, 3)
+        written = rebuild_academic_history()
+        assert written == 60
+        assert StudentAcademicHistory.query.count() == 60
+        for matric in {s.matric_number for s in students}:
+            assert_history_matches(matric)
+        print("   ✓ Rebuild matches calculate_gpa for 20 students x 3 sessions")
+
+        # Missing rows are computed on read, without writing them
+        StudentAcademicHistory.query.filter_by(student_matric=students[0].matric_number).delete()
+        db.session.commit()
+        assert_history_matches(students[0].matric_number)
+        assert StudentAcademicHistory.query.filter_by(student_matric=students[0].matric_number).count() == 0
+        print("   ✓ Missing history rows are computed on read, and not saved")
+
+
+def test_result_changes_refresh_history():
+    """Editing and deleting results through the routes keeps the history current"""
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context():
+        sessions, students = setup_data(2, 2)
+        rebuild_academic_history()
+        hod_id = User.query.filter_by(role='hod').first().id
+        student = students[0]
+        matric = student.matric_number
+        other_id, other_matric = students[1].id, students[1].matric_number
+        result = Result.query.filter_by(student_id=student.id).first()
+        result_id, old_cgpa = result.id, get_academic_history(matric)[sessions[-1].id].cgpa
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(hod_id)
+        sess['_fresh'] = True
+
+    client.post(f'/results/edit/{result_id}', data={'ca_score': '0', 'exam_score': '0'})
+    with app.app_context():
+        assert_history_matches(matric)
+        assert get_academic_history(matric)[sessions[-1].id].cgpa <= old_cgpa
+        print("   ✓ Editing a result refreshes every session's CGPA")
+
+    client.post(f'/results/delete/{result_id}')
+    with app.app_context():
+        assert db.session.get(Result, result_id) is None
+        assert_history_matches(matric)
+        print("   ✓ Deleting a result refreshes the history")
+
+        # Refresh without commit is rolled back with the request
+        db.session.execute(db.delete(Result).where(Result.student_id == other_id))
+        refresh_academic_history([other_matric])
+        db.session.rollback()
+        assert_history_matches(other_matric)
+        print("   ✓ Uncommitted refresh is rolled back with the results")
+
+        course = Result.query.filter_by(student_id=students[1].id).first().course
+        course_id, form = course.id, {'course_code': course.course_code, 'course_title': course.course_title,
+                                      'credit_unit': str(course.credit_unit + 3), 'semester': str(course.semester),
+                                      'status': 'C', 'degree_type': 'BSc'}
+    client.post(f'/courses/{course_id}/edit', data=form)
+    with app.app_context():
+        assert db.session.get(Course, course_id).credit_unit == int(form['credit_unit'])
+        assert_history_matches(other_matric)
+        print("   ✓ Changing a course's credit units refreshes its students' history")
+
+
+def test_profile_query_count_is_constant():
+    """The student profile takes the same number of queries for any number of sessions"""
+    counts = []
+    for session_count in (1, 4):
+        app = create_app('testing')
+        client = app.test_client()
+        with app.app_context():
+            _, students = setup_data(3, session_count)
+            rebuild_academic_history()
+            hod_id = User.query.filter_by(role='hod').first().id
+            student_id = students[-1].id
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(hod_id)
+            sess['_fresh'] = True
+
+        with app.app_context():
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = client.get(f'/students/{student_id}')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert response.status_code == 200
+            counts.append(len(statements))
+    assert counts[0] == counts[1], counts
+    print(f"   ✓ Student profile takes {counts[1]} queries for 1 or 4 sessions")
+
+
+if __name__ == '__main__':
+    test_history_matches_calculate_gpa()
+    test_result_changes_refresh_history()
+    test_profile_query_count_is_constant()
+    print("\n✅ ALL ACADEMIC HISTORY TESTS PASSED")
@@ -0,0 +1,105 @@
+"""
+Test script for request-scoped result alteration logging
+Verifies that alterations are buffered and written in the same transaction
+as the result changes, and that client details are resolved once per request
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_login import login_user
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, User, ResultAlteration
+import app.routes.auth as auth
+
+
+def setup_data():
+    """Create a session, course and student and log in the HoD"""
+    session = AcademicSession(session_name='2025/2026', is_current=True)
+    db.session.add(session)
+    db.session.flush()
+    course = Course(course_code='CSC301', course_title='Operating Systems', credit_unit=3,
+                    semester=1, level=300, program='Computer Science')
+    student = Student(matric_number='CSC/2023/0001', surname='ADE', first_name='Tola',
+                      program='Computer Science', level=300, session_id=session.id)
+    db.session.add_all([course, student])
+    db.session.commit()
+    login_user(User.query.filter_by(role='hod').first())
+    return course, student
+
+
+def log_many(course, student, count):
+    for i in range(count):
+        auth.log_result_alteration(
+            result_id=i + 1, student=student, course=course, session_name='2025/2026',
+            alteration_type='CREATE',
+            new_result=SimpleNamespace(ca_score=20, exam_score=40, total_score=60, grade='B'),
+            reason='Manual entry creation'
+        )
+
+
+def test_alterations_written_on_commit():
+    """Buffered alterations are inserted when the session commits"""
+    print("\n" + "=" * 60)
+    print("TEST: Result alterations are written with the commit")
+    print("=" * 60)
+
+    app = create_app('testing')
+    with app.test_request_context(headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0) Chrome/120.0'}):
+        course, student = setup_data()
+        log_many(course, student, 50)
+        assert ResultAlteration.query.count() == 0, "Nothing written before commit"
+
+        db.session.commit()
+        assert ResultAlteration.query.count() == 50
+        alteration = ResultAlteration.query.first()
+        assert alteration.altered_by_role == 'hod'
+        assert alteration.student_matric == 'CSC/2023/0001'
+        assert alteration.new_grade == 'B'
+        assert alteration.browser and alteration.location
+        print("   ✓ 50 alterations written in one commit")
+
+
+def test_alterations_discarded_on_rollback():
+    """A rolled back request leaves no alteration rows behind"""
+    app = create_app('testing')
+    with app.test_request_context():
+        course, student = setup_data()
+        log_many(course, student, 5)
+        db.session.rollback()
+        db.session.commit()
+        assert ResultAlteration.query.count() == 0
+        print("   ✓ Rollback discards buffered alterations")
+
+
+def test_client_resolved_once_per_request():
+    """IP location and user agent are looked up once, not per alteration"""
+    app = create_app('testing')
+    calls = []
+    original = auth.get_location_from_ip
+
+    def counting_lookup(ip_address):
+        calls.append(ip_address)
+        return original(ip_address)
+
+    auth.get_location_from_ip = counting_lookup
+    try:
+        with app.test_request_context():
+            course, student = setup_data()
+            log_many(course, student, 20)
+            db.session.commit()
+    finally:
+        auth.get_location_from_ip = original
+
+    assert len(calls) == 1, f"Expected 1 location lookup, got {len(calls)}"
+    print("   ✓ 20 alterations resolved client details once")
+
+
+if __name__ == '__main__':
+    test_alterations_written_on_commit()
+    test_alterations_discarded_on_rollback()
+    test_client_resolved_once_per_request()
+    print("\n✅ ALL ALTERATION RECORDER TESTS PASSED")
@@ -0,0 +1,131 @@
+"""
+Test script for the rendered-artifact cache
+Checks LRU eviction by size, and that repeat spreadsheet downloads are
+served from the cache until something printed on the sheet changes
+"""
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, User
+from app.utils import get_grade_info, get_artifact_cache
+from app.utils import spreadsheet
+from app.utils.artifact_cache import ArtifactCache
+
+
+def test_lru_eviction():
+    """Least recently used entries go first once the cache is over size"""
+    print("\n" + "=" * 60)
+    print("TEST: Rendered-artifact cache")
+    print("=" * 60)
+
+    folder = tempfile.mkdtemp()
+    try:
+        cache = ArtifactCache(folder, max_bytes=250)
+        a, b, c = (cache.key('test', name) for name in 'abc')
+        assert len({a, b, c}) == 3 and a == cache.key('test', 'a') and a.startswith('test-')
+
+        cache.put(a, b'x' * 100)
+        time.sleep(0.01)
+        cache.put(b, b'x' * 100)
+        time.sleep(0.01)
+        assert cache.get(a)  # a is now more recently used than b
+        time.sleep(0.01)
+        cache.put(c, b'x' * 100)
+
+        assert cache.get(a) and cache.get(c) and cache.get(b) is None
+        assert sorted(os.listdir(folder)) == sorted([a, c])
+        print("   ✓ Over-size cache evicted the least recently used entry")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_spreadsheet_served_from_cache():
+    """Repeat downloads reuse the PDF, without loading results, until something printed changes"""
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context():
+        get_artifact_cache().clear()
+        session = AcademicSession(session_name='2025/2026', is_current=True)
+        db.session.add(session)
+        db.session.flush()
+        course = Course(course_code='CSC201', course_title='Data Structures', credit_unit=3,
+                        semester=1, level=200, program='Computer Science')
+        db.session.add(course)
+        db.session.flush()
+        for i in range(5):
+            student = Student(matric_number=f'CSC/2024/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                              program='Computer Science', level=200, session_id=session.id)
+            db.session.add(student)
+            db.session.flush()
+            grade, grade_point = get_grade_info(60 + i, 'BSc')
+            db.session.add(Result(student_id=student.id, course_id=course.id, session_id=session.id,
+                                  ca_score=20, exam_score=40 + i, total_score=60 + i,
+                                  grade=grade, grade_point=grade_point))
+        db.session.commit()
+        hod_id = User.query.filter_by(role='hod').first().id
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(hod_id)
+        sess['_fresh'] = True
+
+    renders, builds = [], []
+    original = spreadsheet.generate_spreadsheet_pdf
+    original_build = spreadsheet.build_result_matrix
+    spreadsheet.generate_spreadsheet_pdf = lambda *args, **kwargs: renders.append(1) or original(*args, **kwargs)
+    spreadsheet.build_result_matrix = lambda *args, **kwargs: builds.append(1) or original_build(*args, **kwargs)
+    form = {'level': 200, 'program': 'Computer Science', 'semester': '1', 'action': 'download',
+            'dean_name': 'Prof. Dean'}
+    try:
+        first = client.post('/reports/spreadsheet', data=form)
+        second = client.post('/reports/spreadsheet', data=form)
+        assert first.status_code == second.status_code == 200
+        assert first.data == second.data and first.data.startswith(b'%PDF')
+        assert 'results_Computer_Science_200_1_2025-2026.pdf' in second.headers['Content-Disposition']
+        assert len(renders) == len(builds) == 1
+        print("   ✓ Second download served from the cache without loading any results")
+
+        client.post('/reports/spreadsheet', data=dict(form, dean_name='Prof. New Dean'))
+        client.post('/reports/spreadsheet', data=dict(form, font_size=12))
+        assert len(renders) == 3
+        print("   ✓ Dean's name and font size are part of the key")
+
+        with app.app_context():
+            result = Result.query.first()
+            result.exam_score, result.total_score = 50, 70
+            result.grade, result.grade_point = get_grade_info(70, 'BSc')
+            db.session.commit()
+        changed = client.post('/reports/spreadsheet', data=form)
+        assert len(renders) == 4 and changed.data != first.data
+        client.post('/reports/spreadsheet', data=form)
+        assert len(renders) == 4
+        print("   ✓ Changed result re-renders once, then is cached again")
+
+        with app.app_context():
+            Course.query.first().course_title = 'Algorithms and Data Structures'
+            db.session.commit()
+        client.post('/reports/spreadsheet', data=form)
+        with app.app_context():
+            User.query.filter_by(role='hod').first().full_name = 'Prof. New HoD'
+            db.session.commit()
+        client.post('/reports/spreadsheet', data=form)
+        assert len(renders) == 6
+        print("   ✓ Course and signatory changes re-render")
+
+        empty = client.post('/reports/spreadsheet', data=dict(form, level=300))
+        assert empty.status_code == 302 and len(renders) == 6
+        print("   ✓ A class with no students is not rendered")
+    finally:
+        spreadsheet.generate_spreadsheet_pdf = original
+        spreadsheet.build_result_matrix = original_build
+
+
+if __name__ == '__main__':
+    test_lru_eviction()
+    test_spreadsheet_served_from_cache()
+    print("\n✅ ALL ARTIFACT CACHE TESTS PASSED")
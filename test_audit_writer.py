@@ -0,0 +1,132 @@
+"""
+Test script for the asynchronous audit log writer
+Uses a temporary SQLite file so the writer thread has its own connection
+"""
+import sys
+import os
+import tempfile
+import threading
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_login import login_user
+from config import config, TestingConfig
+from app import create_app, db
+from app.models import AuditLog, User
+from app.routes.auth import log_audit
+from app.utils.audit import AuditWriter, get_audit_writer
+from app.utils.geolocation import get_geo_locator
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'test_audit_writer.db')
+
+
+class AsyncAuditConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DB_PATH
+    AUDIT_ASYNC = True
+    AUDIT_FLUSH_INTERVAL = 0.05
+
+
+config['testing-audit'] = AsyncAuditConfig
+
+
+def make_app():
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    return create_app('testing-audit')
+
+
+def make_row(i):
+    return {'user_id': None, 'action': 'VIEW', 'action_category': 'TEST', 'details': f'Event {i}'}
+
+
+def test_batched_background_writes():
+    """Queued records are written by the worker and flushed on shutdown"""
+    print("\n" + "=" * 60)
+    print("TEST: Asynchronous audit log writer")
+    print("=" * 60)
+
+    app = make_app()
+    writer = get_audit_writer()
+    with app.app_context():
+        for i in range(500):
+            writer.write(make_row(i))
+        writer.shutdown()
+
+        assert AuditLog.query.count() == 500
+        stats = writer.stats()
+        assert stats['queued'] == 500 and stats['flushed'] == 500, stats
+        assert stats['dropped'] == 0 and stats['pending'] == 0, stats
+        print("   ✓ 500 records written in batches and flushed on shutdown")
+
+
+def test_full_queue_writes_synchronously():
+    """When the queue is full the record is written inline, not lost"""
+    app = make_app()
+    writer = AuditWriter(queue_size=1)
+    writer.app = app
+    writer._queue.put_nowait(make_row(0))  # Fill the queue without a worker
+
+    with app.app_context():
+        writer.write(make_row(1))
+        assert AuditLog.query.count() == 1
+        assert writer.stats()['sync_writes'] == 1
+
+        writer.flush()
+        assert AuditLog.query.count() == 2
+        print("   ✓ Full queue falls back to a synchronous write")
+
+
+def test_counters_from_many_threads():
+    """Counters add up when many request threads write at once"""
+    app = make_app()
+    writer = AuditWriter(queue_size=50)
+    writer.app = app
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)   # Switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=lambda n=n: [writer.write(make_row(n * 250 + i)) for i in range(250)])
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    writer.shutdown()
+
+    stats = writer.stats()
+    assert stats['queued'] + stats['sync_writes'] == 2000, stats
+    assert stats['flushed'] == 2000 and stats['dropped'] == 0 and stats['pending'] == 0, stats
+    with app.app_context():
+        assert AuditLog.query.count() == 2000
+    print(f"   ✓ 2,000 records from 8 threads: {stats['queued']} queued, {stats['sync_writes']} written inline")
+
+
+def test_log_audit_does_not_commit_request():
+    """log_audit leaves the request's transaction alone"""
+    app = make_app()
+    headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) Firefox/120.0', 'X-Forwarded-For': '203.0.113.7'}
+    with app.test_request_context(headers=headers):
+        hod = User.query.filter_by(role='hod').first()
+        login_user(hod)
+        hod.full_name = 'Changed but rolled back'
+
+        log_audit(hod.id, 'VIEW', 'SECURITY', details='Viewed security monitor dashboard')
+        db.session.rollback()
+        get_audit_writer().shutdown()
+
+        assert db.session.get(User, hod.id).full_name == 'Head of Department'
+        audit = AuditLog.query.one()
+        assert audit.username == hod.username
+        assert audit.browser.startswith('Firefox') and audit.ip_address == '203.0.113.7'
+        assert not get_geo_locator()._queue
+        print("   ✓ log_audit queues the record without committing the request or locating the IP")
+
+
+if __name__ == '__main__':
+    test_batched_background_writes()
+    test_full_queue_writes_synchronously()
+    test_counters_from_many_threads()
+    test_log_audit_does_not_commit_request()
+    print("\n✅ ALL AUDIT WRITER TESTS PASSED")
@@ -0,0 +1,255 @@
+"""
+Test script for the background job runner
+Submits results uploads, student uploads and spreadsheet builds as jobs,
+polls their status and downloads the finished artifacts
+"""
+import sys
+import os
+import io
+import socket
+import subprocess
+import time
+import tempfile
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import config, TestingConfig
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, ResultAlteration, UploadLog, User, Job
+from app.utils import get_grade_info, get_job_runner
+from app.utils.jobs import job_handler, recover_jobs
+
+DB_PATH = os.path.join(tempfile.gettempdir(), 'test_background_jobs.db')
+
+
+class BackgroundJobsConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DB_PATH
+    JOBS_BACKGROUND = True
+
+
+config['testing-jobs'] = BackgroundJobsConfig
+
+
+def setup_data(app, student_count=12):
+    """Session, a course and students with results; returns (course_id, hod_id)"""
+    with app.app_context():
+        session = AcademicSession(session_name='2025/2026', is_current=True)
+        db.session.add(session)
+        db.session.flush()
+        course = Course(course_code='CSC201', course_title='Data Structures', credit_unit=3,
+                        semester=1, level=200, program='Computer Science')
+        students = [
+            Student(matric_number=f'CSC/2024/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                    program='Computer Science', level=200, session_id=session.id)
+            for i in range(student_count)
+        ]
+        db.session.add(course)
+        db.session.add_all(students)
+        db.session.commit()
+        return course.id, User.query.filter_by(role='hod').first().id
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def results_csv(count):
+    rows = ''.join(f'CSC/2024/{i:04d},{10 + i % 20},{40 + i % 30}\n' for i in range(count))
+    return io.BytesIO(('Matric Number,CA Score,Exam Score\n' + rows).encode())
+
+
+def test_upload_jobs():
+    """Results and student uploads run as jobs and record their outcome"""
+    print("\n" + "=" * 60)
+    print("TEST: Background jobs")
+    print("=" * 60)
+
+    app = create_app('testing')
+    client = app.test_client()
+    course_id, hod_id = setup_data(app)
+    login(client, hod_id)
+
+    response = client.post('/results/upload', data={
+        'course_id': course_id, 'background': '1', 'file': (results_csv(12), 'results.csv')
+    }, content_type='multipart/form-data', headers={'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) Firefox/120.0'})
+    assert response.status_code == 302 and '/jobs/' in response.headers['Location']
+
+    status = client.get(response.headers['Location'] + '/status').get_json()
+    assert status['status'] == 'succeeded' and status['progress'] == 100, status
+    assert status['message'] == 'Results upload for CSC201: 12 added, 0 updated, 0 failed.'
+    with app.app_context():
+        assert Result.query.count() == 12
+        alteration = ResultAlteration.query.first()
+        assert alteration.altered_by_id == hod_id and alteration.browser.startswith('Firefox')
+        assert UploadLog.query.filter_by(upload_type='results').one().records_processed == 12
+        assert not os.path.exists(db.session.get(Job, status['id']).input_path)
+    print("   ✓ Results upload job applied 12 results attributed to the submitting user")
+
+    response = client.post('/students/upload', data={
+        'level': 100, 'program': 'Computer Science', 'background': '1',
+        'file': (io.BytesIO(b'Matric Number,Surname,First Name\nCSC/2025/0001,ADA,Obi\n'), 'roster.csv')
+    }, content_type='multipart/form-data')
+    status = client.get(response.headers['Location'] + '/status').get_json()
+    assert status['message'] == 'Upload complete: 1 added, 0 updated, 0 failed.', status
+    print("   ✓ Student upload job added the roster")
+
+    response = client.post('/students/upload', data={
+        'level': 100, 'program': 'Computer Science', 'background': '1',
+        'file': (io.BytesIO(b'Name,Age\nAda,20\n'), 'bad.csv')
+    }, content_type='multipart/form-data')
+    status = client.get(response.headers['Location'] + '/status').get_json()
+    assert status['status'] == 'failed' and status['message'].startswith('No valid records found'), status
+    print("   ✓ Invalid file fails the job with a readable message")
+
+
+def test_spreadsheet_job_and_access():
+    """Spreadsheet PDFs are downloadable from the job; other users cannot see it"""
+    app = create_app('testing')
+    client = app.test_client()
+    course_id, hod_id = setup_data(app)
+    with app.app_context():
+        session_id = AcademicSession.query.first().id
+        for student in Student.query.all():
+            grade, grade_point = get_grade_info(65, 'BSc')
+            db.session.add(Result(student_id=student.id, course_id=course_id, session_id=session_id,
+                                  ca_score=20, exam_score=45, total_score=65, grade=grade, grade_point=grade_point))
+        lecturer = User(username='lecturer@university.edu.ng', email='lecturer@university.edu.ng',
+                        full_name='Lecturer', role='lecturer', is_active=True, must_change_password=False)
+        lecturer.set_password('Lecturer@2026!')
+        db.session.add(lecturer)
+        db.session.commit()
+        lecturer_id = lecturer.id
+    login(client, hod_id)
+
+    response = client.post('/reports/spreadsheet', data={
+        'level': 200, 'program': 'Computer Science', 'semester': '1', 'action': 'download',
+        'dean_name': 'Prof. Dean', 'background': '1'
+    })
+    job_url = response.headers['Location']
+    status = client.get(job_url + '/status').get_json()
+    assert status['status'] == 'succeeded' and status['download_url'], status
+
+    download = client.get(status['download_url'])
+    assert download.status_code == 200 and download.data.startswith(b'%PDF')
+    assert 'results_Computer_Science_200_1_2025-2026.pdf' in download.headers['Content-Disposition']
+    assert client.get('/jobs/').status_code == 200
+    print("   ✓ Spreadsheet job produced a downloadable PDF")
+
+    login(client, lecturer_id)
+    assert client.get(job_url + '/status').status_code == 404
+    assert client.get(status['download_url']).status_code == 404
+    print("   ✓ Jobs are only visible to the user who submitted them")
+
+
+def test_background_thread():
+    """With JOBS_BACKGROUND on the request returns before the job runs"""
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    app = create_app('testing-jobs')
+    client = app.test_client()
+    course_id, hod_id = setup_data(app, 200)
+    login(client, hod_id)
+
+    response = client.post('/results/upload', data={
+        'course_id': course_id, 'background': '1', 'file': (results_csv(200), 'results.csv')
+    }, content_type='multipart/form-data')
+    job_url = response.headers['Location']
+
+    deadline = time.time() + 30
+    while True:
+        status = client.get(job_url + '/status').get_json()
+        if status['status'] in ('succeeded', 'failed') or time.time() > deadline:
+            break
+        time.sleep(0.05)
+    get_job_runner().shutdown()
+
+    assert status['status'] == 'succeeded', status
+    with app.app_context():
+        assert Result.query.count() == 200
+    print("   ✓ Job ran on the worker thread and was polled to completion")
+
+
+@job_handler('test_progress')
+def run_test_progress(context):
+    """Reports progress twice and returns what another connection saw"""
+    seen = []
+    for percent in (40, 60):
+        context.progress(percent)
+        with db.engine.connect() as connection:
+            seen.append(connection.execute(db.select(Job.progress).where(Job.id == context.job.id)).scalar())
+    return ','.join(map(str, seen))
+
+
+def test_progress_saved():
+    """Running jobs save their progress to the jobs table, at most once per interval"""
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    app = create_app('testing-jobs')
+    app.config['JOB_PROGRESS_INTERVAL'] = 0
+    runner = get_job_runner()
+    runner.configure(app)
+    with app.app_context():
+        hod_id = User.query.filter_by(role='hod').first().id
+        job = runner.submit('test_progress', {}, hod_id)
+        runner.shutdown()
+        db.session.refresh(job)
+        assert job.message == '40,60', job.message
+        print("   ✓ Progress is visible to other connections while the job runs")
+
+        runner.progress_interval = 60
+        job = runner.submit('test_progress', {}, hod_id)
+        runner.shutdown()
+        db.session.refresh(job)
+        assert job.message == '0,0' and job.progress == 100, job.message
+    print("   ✓ Progress writes are throttled to JOB_PROGRESS_INTERVAL")
+
+
+def test_recover_orphaned_jobs():
+    """Jobs of exited worker processes are failed at startup and their inputs deleted"""
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    app = create_app('testing-jobs')
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    host = socket.gethostname()
+    folder = app.config['JOB_FOLDER']
+    workers = {
+        'dead': f'{host}:{exited.pid}',
+        'legacy': None,
+        'alive': f'{host}:{os.getpid()}',
+        'remote': 'another-host:1',
+    }
+    with app.app_context():
+        hod_id = User.query.filter_by(role='hod').first().id
+        for name, worker in workers.items():
+            input_path = os.path.join(folder, f'recover-{name}-input')
+            with open(input_path, 'wb') as f:
+                f.write(b'Matric Number,CA Score,Exam Score\n')
+            db.session.add(Job(job_type='results_upload', status='running' if worker else 'queued', params='{}',
+                               input_path=input_path, worker=worker, message=name, user_id=hod_id))
+        db.session.commit()
+
+    app = create_app('testing-jobs')
+    with app.app_context():
+        jobs = {job.message.split()[0]: job for job in Job.query.filter(Job.status.in_(['queued', 'running']))}
+        failed = Job.query.filter_by(status='failed').all()
+        assert set(jobs) == {'alive', 'remote'}, jobs
+        assert len(failed) == 2 and all(job.message.startswith('Interrupted') for job in failed)
+        assert all(not os.path.exists(job.input_path) for job in failed)
+        assert all(os.path.exists(job.input_path) for job in jobs.values())
+        assert recover_jobs() == 0
+        for job in jobs.values():
+            os.remove(job.input_path)
+    print("   ✓ Jobs of exited workers are failed and their inputs deleted; live and remote ones are kept")
+
+
+if __name__ == '__main__':
+    test_upload_jobs()
+    test_spreadsheet_job_and_access()
+    test_background_thread()
+    test_progress_saved()
+    test_recover_orphaned_jobs()
+    print("\n✅ ALL BACKGROUND JOB TESTS PASSED")
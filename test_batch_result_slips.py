@@ -0,0 +1,228 @@
+"""
+Test script for batch result slips
+Checks that the batch loader matches the single-student PDF route, that
+it queries a fixed number of times, and that the ZIP is produced inline,
+across worker processes, from the endpoint and as a background job
+"""
+import sys
+import os
+import io
+import subprocess
+import tempfile
+import zipfile
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, User
+from app.utils import get_grade_info, refresh_academic_history, load_result_slips, iter_result_slips_zip
+from app.routes import reports
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Entry script for the worker test: runs run.py's module code, as a spawned
+# worker does when it re-imports the main module, and logs every app factory
+# call with the calling process ID
+WORKER_PROBE = '''
+import os
+import runpy
+import sys
+sys.path.insert(0, {root!r})
+import app as app_package
+
+_create_app = app_package.create_app
+
+
+def create_app(*args, **kwargs):
+    with open(os.environ['APP_FACTORY_LOG'], 'a') as log:
+        log.write(f'{{os.getpid()}}\\n')
+    return _create_app(*args, **kwargs)
+
+
+app_package.create_app = create_app
+runpy.run_path(os.path.join({root!r}, 'run.py'))
+
+if __name__ == '__main__':
+    from test_batch_result_slips import setup_data
+    from app.utils import load_result_slips, iter_result_slips_zip
+    app = app_package.create_app('testing')
+    with app.app_context():
+        documents = load_result_slips(setup_data(), 200, 'Computer Science')
+    data = b''.join(iter_result_slips_zip(documents, 2))
+    print('probe', os.getpid(), data[:2].decode())
+'''
+
+
+def setup_data(student_count=6):
+    """Session, two courses per semester and students with results"""
+    session = AcademicSession(session_name='2025/2026', is_current=True)
+    db.session.add(session)
+    db.session.flush()
+    courses = [Course(course_code=f'CSC20{i}', course_title=f'Course {i}', credit_unit=3,
+                      semester=1 + i % 2, level=200, program='Computer Science') for i in range(4)]
+    students = [Student(matric_number=f'CSC/2024/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                        program='Computer Science', level=200, session_id=session.id)
+                for i in range(student_count)]
+    db.session.add_all(courses + students)
+    db.session.flush()
+    for s, student in enumerate(students):
+        for c, course in enumerate(courses):
+            total = 35 + (s * 7 + c * 11) % 60
+            grade, grade_point = get_grade_info(total, 'BSc')
+            db.session.add(Result(student_id=student.id, course_id=course.id, session_id=session.id,
+                                  ca_score=total // 3, exam_score=total - total // 3, total_score=total,
+                                  grade=grade, grade_point=grade_point))
+    db.session.flush()
+    refresh_academic_history([s.matric_number for s in students])
+    db.session.commit()
+    return session
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def test_slips_match_single_route():
+    """Each batch slip has the data the single-student PDF route renders"""
+    print("\n" + "=" * 60)
+    print("TEST: Batch result slips")
+    print("=" * 60)
+
+    app = create_app('testing')
+    with app.app_context():
+        session = setup_data()
+        student_ids = [s.id for s in Student.query.order_by(Student.matric_number)]
+        documents = load_result_slips(session, 200, 'Computer Science', 'all')
+        hod_id = User.query.filter_by(role='hod').first().id
+
+    rendered = []
+    original = reports.generate_student_result_pdf
+    reports.generate_student_result_pdf = lambda s, r, c: rendered.append((s, r)) or original(s, r, c, logo_path='')
+    try:
+        client = app.test_client()
+        login(client, hod_id)
+        for student_id in student_ids:
+            assert client.get(f'/reports/student/{student_id}/pdf').status_code == 200
+    finally:
+        reports.generate_student_result_pdf = original
+
+    assert [(s, r) for _, s, r in documents] == rendered
+    assert documents[0][0] == 'result_CSC-2024-0000_2025-2026.pdf'
+    assert len(documents[0][2]['first_semester']) == 2 and documents[0][2]['first_semester_summary']['gpa']
+    print(f"   ✓ {len(documents)} batch slips equal the single-student route's data")
+
+
+def test_query_count_is_constant():
+    """Loading slips takes three queries for 5 or 60 students"""
+    app = create_app('testing')
+    counts = []
+    for student_count in (5, 60):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            session = setup_data(student_count)
+            session.session_name  # load the committed session outside the count
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                documents = load_result_slips(session, 200, 'Computer Science')
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            assert len(documents) == student_count
+            counts.append(len(statements))
+
+    assert counts == [3, 3], counts
+    print("   ✓ 3 queries (students, results, history) for 5 and for 60 students")
+
+
+def test_zip_inline_and_parallel():
+    """The ZIP holds one PDF per student whether rendered inline or in processes"""
+    app = create_app('testing')
+    with app.app_context():
+        session = setup_data()
+        documents = load_result_slips(session, 200, 'Computer Science', '1')
+
+    archives = {}
+    for workers in (1, 2):
+        data = b''.join(iter_result_slips_zip(documents, workers))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.namelist() == [filename for filename, _, _ in documents]
+            assert all(archive.read(name).startswith(b'%PDF') for name in archive.namelist())
+            archives[workers] = len(archive.namelist())
+
+    assert archives == {1: 6, 2: 6}
+    assert not documents[0][2]['second_semester']
+    print("   ✓ ZIP has one slip per student with 1 and 2 worker processes")
+
+
+def test_workers_skip_app_factory():
+    """Spawned render workers re-import the entry script but never create the app"""
+    with tempfile.TemporaryDirectory() as folder:
+        probe = os.path.join(folder, 'probe.py')
+        log = os.path.join(folder, 'factory.log')
+        with open(probe, 'w') as f:
+            f.write(WORKER_PROBE.format(root=ROOT))
+        process = subprocess.run([sys.executable, probe], env=dict(os.environ, APP_FACTORY_LOG=log),
+                                 capture_output=True, text=True, timeout=300)
+        assert process.returncode == 0, process.stderr
+        _, pid, magic = process.stdout.strip().splitlines()[-1].split()
+        with open(log) as f:
+            calls = f.read().split()
+    assert magic == 'PK' and calls == [pid], (calls, pid)
+    print("   ✓ Only the parent ran the app factory; 2 workers rendered the ZIP")
+
+
+def test_endpoint_and_job():
+    """The endpoint streams the ZIP; the background option builds it as a job"""
+    app = create_app('testing')
+    client = app.test_client()
+    with app.app_context():
+        setup_data()
+        hod_id = User.query.filter_by(role='hod').first().id
+        adviser = User(username='adviser@university.edu.ng', email='adviser@university.edu.ng',
+                       full_name='Adviser', role='level_adviser', level=100, program='Computer Science',
+                       is_active=True, must_change_password=False)
+        adviser.set_password('Adviser@2026!')
+        db.session.add(adviser)
+        db.session.commit()
+        adviser_id = adviser.id
+    login(client, hod_id)
+
+    form = {'level': 200, 'program': 'Computer Science', 'semester': 'all'}
+    response = client.post('/reports/student-results/batch', data=form)
+    assert response.status_code == 200 and response.is_streamed
+    assert response.mimetype == 'application/zip'
+    assert 'results_Computer_Science_200_2025-2026.zip' in response.headers['Content-Disposition']
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert len(archive.namelist()) == 6
+    print("   ✓ Endpoint streams a ZIP of 6 slips")
+
+    response = client.post('/reports/student-results/batch', data=dict(form, background='1'))
+    status = client.get(response.headers['Location'] + '/status').get_json()
+    assert status['status'] == 'succeeded', status
+    download = client.get(status['download_url'])
+    with zipfile.ZipFile(io.BytesIO(download.data)) as archive:
+        assert len(archive.namelist()) == 6
+    print("   ✓ Background job produced the same ZIP")
+
+    response = client.post('/reports/student-results/batch', data=dict(form, level=300))
+    assert response.status_code == 302
+    login(client, adviser_id)
+    response = client.post('/reports/student-results/batch', data=form)
+    assert response.status_code == 302 and response.mimetype != 'application/zip'
+    print("   ✓ Empty classes and other advisers' levels are refused")
+
+
+if __name__ == '__main__':
+    test_slips_match_single_route()
+    test_query_count_is_constant()
+    test_zip_inline_and_parallel()
+    test_workers_skip_app_factory()
+    test_endpoint_and_job()
+    print("\n✅ ALL BATCH RESULT SLIP TESTS PASSED")
@@ -0,0 +1,87 @@
+"""
+Test script for spreadsheet column-width measurement
+Checks that the one-pass memoized measurement gives the same widths as
+measuring every cell, and that wide sheets still render
+"""
+import sys
+import os
+import random
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from app import create_app
+from app.utils.pdf_generator import VerticalText, measure_column_widths, generate_spreadsheet_pdf
+
+
+def reference_widths(table_data, total_cols, font_size, padding):
+    """Reference implementation: the original per-cell measurement"""
+    widths = []
+    for col_idx in range(total_cols):
+        max_width = 0
+        for row_idx, row in enumerate(table_data):
+            if col_idx < len(row):
+                cell = row[col_idx]
+                if isinstance(cell, VerticalText):
+                    cell_width = cell.fontSize + 0.15*cm
+                else:
+                    size = 8 if row_idx <= 3 else font_size
+                    font = 'Helvetica-Bold' if row_idx <= 3 else 'Helvetica'
+                    cell_width = max(stringWidth(line, font, size) for line in str(cell).split('\n')) + padding
+                max_width = max(max_width, cell_width)
+        widths.append(max_width)
+    return widths
+
+
+def test_widths_match_per_cell_measurement():
+    """Memoized widths equal the per-cell widths for mixed content"""
+    print("\n" + "=" * 60)
+    print("TEST: Spreadsheet column widths")
+    print("=" * 60)
+
+    random.seed(2026)
+    header = [
+        ['S/N', 'Matric Number', 'Student Name\n(Surname First)', 'FIRST SEMESTER', 'Remarks'],
+        ['', '', '', VerticalText('CSC201: Data Structures'), VerticalText('GPA'), ''],
+        ['', '', '', 'C', '', ''],
+        ['', '', '', '3', '', ''],
+    ]
+    rows = [[str(i), f'CSC/2024/{i:04d}', f'STUDENT{i} Test',
+             random.choice(['70A', '-', '45D', '100A']), f'{random.uniform(0, 5):.2f}',
+             random.choice(['Proceed', 'CSC101, CSC203'])] for i in range(1, 200)]
+    table_data = header + rows
+
+    for font_size in (10, 12):
+        expected = reference_widths(table_data, 6, font_size, 0.2*cm)
+        actual = measure_column_widths(table_data, 6, 4, 8, font_size, 0.2*cm)
+        assert all(abs(a - e) < 1e-6 for a, e in zip(actual, expected)), (actual, expected)
+    print("   ✓ Widths match per-cell measurement at 10pt and 12pt")
+
+    assert measure_column_widths([['a'], []], 3, 1, 8, 10, 5) == [stringWidth('a', 'Helvetica-Bold', 8) + 5, 0, 0]
+    print("   ✓ Columns without content measure 0")
+
+
+def test_wide_spreadsheet_renders():
+    """Both-semester sheets with many courses scale down without failing"""
+    courses = [{'code': f'CSC{100 + i}', 'title': f'Course {i}', 'status': 'C', 'credit_unit': 3}
+               for i in range(40)]
+    data = {
+        'students': [{'matric_number': f'CSC/2022/{i:04d}', 'name': f'STUDENT{i}',
+                      'first_semester': {c['code']: '70A' for c in courses[:20]},
+                      'second_semester': {c['code']: '55C' for c in courses[20:]}} for i in range(30)],
+        'first_semester_courses': courses[:20],
+        'second_semester_courses': courses[20:],
+        'level': 300, 'program': 'Computer Science', 'semester': 'both', 'session': '2025/2026'
+    }
+    app = create_app('testing')
+    with app.app_context():
+        assert generate_spreadsheet_pdf(data, {}).getvalue().startswith(b'%PDF')
+    print("   ✓ 40-course spreadsheet renders")
+
+
+if __name__ == '__main__':
+    test_widths_match_per_cell_measurement()
+    test_wide_spreadsheet_renders()
+    print("\n✅ ALL COLUMN WIDTH TESTS PASSED")
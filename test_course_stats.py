@@ -0,0 +1,98 @@
+"""
+Test script for the course statistics engine
+Checks the statistics against the standard library, caching on the course's
+data revision, the course page and the stats.json endpoint
+"""
+import sys
+import os
+import statistics
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app import create_app, db
+from app.models import Result
+from app.utils import load_course_scores, compute_course_stats, get_course_stats
+from app.utils.course_stats import get_course_stats_cache
+from testdata import add_session, add_course, add_class, add_adviser, get_hod_id, login
+
+SCORES = [(25, 60), (20, 52), (18, 41), (15, 35), (12, 30), (28, 66), (9, 22), (22, 40), (5, 10), (30, 70)]
+
+
+def setup_data(app):
+    """A course with ten results and an adviser for another program"""
+    with app.app_context():
+        session = add_session()
+        course = add_course('CSC201', 200, course_title='Data Structures')
+        add_class(session, course, 'CSC/2024', SCORES)
+        adviser = add_adviser()
+        db.session.commit()
+        return session.id, course.id, adviser.id, get_hod_id()
+
+
+def test_statistics():
+    """Figures match the standard library and the raw rows"""
+    print("\n" + "=" * 60)
+    print("TEST: Course statistics")
+    print("=" * 60)
+
+    app = create_app('testing')
+    session_id, course_id, _, _ = setup_data(app)
+    with app.app_context():
+        stats = compute_course_stats(*load_course_scores(course_id, session_id))
+        totals = [ca + exam for ca, exam in SCORES]
+        assert stats['count'] == 10
+        assert stats['mean'] == round(statistics.fmean(totals), 2)
+        assert stats['median'] == round(statistics.median(totals), 2)
+        assert stats['std'] == round(statistics.pstdev(totals), 2)
+        assert (stats['min'], stats['max']) == (min(totals), max(totals))
+        assert stats['q1'] <= stats['median'] <= stats['q3']
+
+        rows = Result.query.filter_by(course_id=course_id).all()
+        assert stats['failed'] == len([r for r in rows if r.grade == 'F'])
+        assert stats['passed'] + stats['failed'] == 10 and sum(stats['grades'].values()) == 10
+        assert list(stats['grades'])[:6] == ['A', 'B', 'C', 'D', 'E', 'F']
+        assert sum(b['count'] for b in stats['histogram']) == 10
+        assert stats['histogram'][-1] == {'range': '90-100', 'count': 2}
+        expected_r = np.corrcoef([ca for ca, _ in SCORES], [exam for _, exam in SCORES])[0, 1]
+        assert abs(stats['ca_exam_correlation'] - expected_r) < 1e-4
+        print(f"   ✓ mean {stats['mean']}, median {stats['median']}, std {stats['std']}, "
+              f"r {stats['ca_exam_correlation']} match the standard library")
+
+        empty = compute_course_stats(*load_course_scores(course_id + 1, session_id))
+        assert empty['count'] == 0 and empty['mean'] is None and len(empty['histogram']) == 10
+    print("   ✓ A course without results has zero counts and no score figures")
+
+
+def test_cache_and_endpoint():
+    """Statistics are cached on the course revision and served to the page and as JSON"""
+    app = create_app('testing')
+    session_id, course_id, adviser_id, hod_id = setup_data(app)
+    cache = get_course_stats_cache()
+    with app.app_context():
+        first = get_course_stats(course_id, session_id)
+        assert get_course_stats(course_id, session_id) is first and cache.hits == 1
+        result = Result.query.filter_by(course_id=course_id).first()
+        result.exam_score += 10
+        result.total_score += 10
+        db.session.commit()
+        assert get_course_stats(course_id, session_id)['mean'] == round(first['mean'] + 1, 2)
+    print("   ✓ Cached until one of the course's results changes")
+
+    client = app.test_client()
+    login(client, hod_id)
+    assert client.get(f'/results/course/{course_id}').status_code == 200
+    data = client.get(f'/results/course/{course_id}/stats.json').get_json()
+    assert data['course_code'] == 'CSC201' and data['count'] == 10 and data['session'] == '2025/2026'
+    print("   ✓ Course page renders and stats.json returns the statistics")
+
+    login(client, adviser_id)
+    assert client.get(f'/results/course/{course_id}/stats.json').status_code == 403
+    print("   ✓ Users without access to the course are refused")
+
+
+if __name__ == '__main__':
+    test_statistics()
+    test_cache_and_endpoint()
+    print("\n✅ ALL COURSE STATISTICS TESTS PASSED")
@@ -0,0 +1,106 @@
+"""
+Test script for the dashboard statistics service
+Checks the aggregate counts against the rows, the per-scope cache and its
+invalidation on writes, and that a page visit costs a constant number of queries
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Student, Result, User
+from app.utils import compute_dashboard_stats, get_dashboard_stats
+from testdata import add_session, add_course, add_class, add_adviser, get_hod_id, login
+
+
+def setup_data(app, students_per_class=20):
+    """Two programs at two levels, each with a course and a result per student"""
+    with app.app_context():
+        session = add_session()
+        for program, prefix in (('Computer Science', 'CSC'), ('Mathematics', 'MTH')):
+            for level in (100, 200):
+                course = add_course(f'{prefix}{level + 1}', level, program)
+                add_class(session, course, f'{prefix}/{level}', [(20, 40)] * students_per_class)
+        adviser = add_adviser()
+        db.session.commit()
+        return session.id, get_hod_id(), adviser.id
+
+
+def test_aggregates():
+    """Aggregate counts match counting the rows"""
+    print("\n" + "=" * 60)
+    print("TEST: Dashboard statistics")
+    print("=" * 60)
+
+    app = create_app('testing')
+    setup_data(app)
+    with app.app_context():
+        full = compute_dashboard_stats(breakdowns=True)
+        assert full['stats'] == {'total_students': 80, 'total_courses': 4, 'total_results': 80,
+                                 'total_users': User.query.filter_by(is_active=True).count()}
+        assert dict(full['students_by_program']) == {'Computer Science': 40, 'Mathematics': 40}
+        assert full['students_by_level'] == [(100, 40), (200, 40)]
+
+        scoped = compute_dashboard_stats(level=200, program='Mathematics')
+        students = Student.query.filter_by(level=200, program='Mathematics').all()
+        assert scoped['stats']['total_students'] == len(students) == 20
+        assert scoped['stats']['total_results'] == Result.query.filter(
+            Result.student_id.in_([s.id for s in students])).count()
+        assert scoped['stats']['total_courses'] == 1 and scoped['students_by_level'] == []
+    print("   ✓ HoD and adviser counts match the rows")
+
+
+def test_cache_and_invalidation():
+    """Repeat visits reuse the cached counts until something is written"""
+    app = create_app('testing')
+    session_id, hod_id, adviser_id = setup_data(app)
+    client = app.test_client()
+    cache = get_dashboard_stats()
+
+    login(client, adviser_id)
+    assert client.get('/dashboard').status_code == 200
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/dashboard')
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    assert response.status_code == 200 and cache.hits == 1
+    assert not any('FROM students' in sql for sql in statements), statements
+    print(f"   ✓ Cached adviser visit ran {len(statements)} statements and loaded no students")
+
+    login(client, hod_id)
+    client.get('/dashboard')
+    assert (cache.hits, cache.misses) == (1, 2)
+    with app.app_context():
+        assert get_dashboard_stats().get(session_id, breakdowns=True)['stats']['total_students'] == 80
+        db.session.add(Student(matric_number='MTH/200/9999', surname='NEW', first_name='Student',
+                               program='Mathematics', level=200, session_id=session_id))
+        db.session.commit()
+        assert get_dashboard_stats().get(session_id, breakdowns=True)['stats']['total_students'] == 81
+    print("   ✓ A new student invalidates the cached counts")
+
+    with app.app_context():
+        before = get_dashboard_stats().get(session_id, breakdowns=True)['stats']['total_users']
+        adviser = db.session.get(User, adviser_id)
+        adviser.is_active = False
+        db.session.commit()
+        assert get_dashboard_stats().get(session_id, breakdowns=True)['stats']['total_users'] == before - 1
+        misses = cache.misses
+        adviser.last_login = adviser.created_at
+        db.session.commit()
+        get_dashboard_stats().get(session_id, breakdowns=True)
+        assert cache.misses == misses
+    print("   ✓ Deactivating a user invalidates; a login does not")
+
+
+if __name__ == '__main__':
+    test_aggregates()
+    test_cache_and_invalidation()
+    print("\n✅ ALL DASHBOARD STATISTICS TESTS PASSED")
@@ -0,0 +1,162 @@
+"""
+Test script for the data revision counters
+Checks that ORM edits, bulk statements, locking and grading edits bump the
+session, course and class scopes they touch, and nothing else
+"""
+import sys
+import os
+import io
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import update
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, Carryover, GradingSystem, User
+from app.utils import (get_grade_info, get_revisions, revision_token, session_scope, course_scope,
+                       class_scope)
+from app.utils.revisions import GLOBAL_SCOPE, GRADING_SCOPE
+
+
+def setup_data(app):
+    """Session, two courses and a class of students; returns their IDs"""
+    with app.app_context():
+        session = AcademicSession(session_name='2025/2026', is_current=True)
+        db.session.add(session)
+        db.session.flush()
+        courses = [
+            Course(course_code=code, course_title=code, credit_unit=3, semester=1, level=200,
+                   program='Computer Science')
+            for code in ('CSC201', 'CSC203')
+        ]
+        db.session.add_all(courses)
+        db.session.add_all([
+            Student(matric_number=f'CSC/2024/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                    program='Computer Science', level=200, session_id=session.id)
+            for i in range(5)
+        ])
+        db.session.commit()
+        return session.id, courses[0].id, courses[1].id
+
+
+def scopes(session_id, course_id, other_course_id):
+    return (GLOBAL_SCOPE, session_scope(session_id), course_scope(session_id, course_id),
+            course_scope(session_id, other_course_id), class_scope(session_id, 200, 'Computer Science'),
+            class_scope(session_id, 300, 'Computer Science'))
+
+
+def add_result(student, course_id, session_id, score=65):
+    grade, grade_point = get_grade_info(score, 'BSc')
+    result = Result(student_id=student.id, course_id=course_id, session_id=session_id,
+                    ca_score=20, exam_score=score - 20, total_score=score, grade=grade, grade_point=grade_point)
+    db.session.add(result)
+    return result
+
+
+def test_orm_changes():
+    """Creating, editing and deleting results bumps their course, class and session"""
+    print("\n" + "=" * 60)
+    print("TEST: Data revisions")
+    print("=" * 60)
+
+    app = create_app('testing')
+    session_id, course_id, other_id = setup_data(app)
+    with app.app_context():
+        keys = scopes(session_id, course_id, other_id)
+        before = get_revisions(*keys)
+        assert before[course_scope(session_id, course_id)] == 0
+
+        student = Student.query.first()
+        result = add_result(student, course_id, session_id)
+        db.session.commit()
+        after = get_revisions(*keys)
+        assert after[course_scope(session_id, course_id)] == 1
+        assert after[class_scope(session_id, 200, 'Computer Science')] == before[keys[4]] + 1
+        assert after[session_scope(session_id)] == before[keys[1]] + 1
+        assert after[course_scope(session_id, other_id)] == 0
+        print("   ✓ New result bumped its course, class and session only")
+
+        token = revision_token(course_scope(session_id, course_id))
+        result.exam_score = 50
+        db.session.commit()
+        assert revision_token(course_scope(session_id, course_id)) != token
+        token = revision_token(course_scope(session_id, course_id))
+        db.session.commit()
+        assert revision_token(course_scope(session_id, course_id)) == token
+        print("   ✓ Edit changes the revision token; an empty commit does not")
+
+        student.level = 300
+        db.session.commit()
+        after = get_revisions(*keys)
+        assert after[class_scope(session_id, 300, 'Computer Science')] == 1
+        assert after[class_scope(session_id, 200, 'Computer Science')] == before[keys[4]] + 3
+        print("   ✓ Moving a student bumps both the old and new class")
+
+        db.session.delete(result)
+        db.session.commit()
+        assert get_revisions(*keys)[course_scope(session_id, course_id)] == 3
+
+        add_result(Student.query.all()[1], other_id, session_id)
+        db.session.rollback()
+        assert get_revisions(*keys)[course_scope(session_id, other_id)] == 0
+        print("   ✓ Delete bumps the course; a rolled back change does not")
+
+
+def test_bulk_changes():
+    """Uploads, locking and carryover clearances go through bulk statements and are counted too"""
+    app = create_app('testing')
+    session_id, course_id, other_id = setup_data(app)
+    client = app.test_client()
+    with app.app_context():
+        hod_id = User.query.filter_by(role='hod').first().id
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(hod_id)
+        sess['_fresh'] = True
+
+    csv = 'Matric Number,CA Score,Exam Score\n' + ''.join(f'CSC/2024/{i:04d},20,{30 + i}\n' for i in range(5))
+    response = client.post('/results/upload', data={
+        'course_id': course_id, 'file': (io.BytesIO(csv.encode()), 'results.csv')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    with app.app_context():
+        keys = scopes(session_id, course_id, other_id)
+        assert Result.query.count() == 5
+        revisions = get_revisions(*keys)
+        assert revisions[course_scope(session_id, course_id)] == 1
+        assert revisions[course_scope(session_id, other_id)] == 0
+    print("   ✓ Results upload bumped the course once")
+
+    with app.app_context():
+        Result.query.filter_by(course_id=course_id, session_id=session_id).update({'is_locked': True})
+        db.session.commit()
+        assert get_revisions(*keys)[course_scope(session_id, course_id)] == 2
+        Result.query.filter_by(course_id=course_id).delete()
+        db.session.commit()
+        assert get_revisions(*keys)[course_scope(session_id, course_id)] == 3
+    print("   ✓ Query.update (lock) and Query.delete bump the rows' course")
+
+    with app.app_context():
+        carryover = Carryover(student_matric='CSC/2024/0001', course_id=other_id, original_session_id=session_id,
+                              original_level=200)
+        db.session.add(carryover)
+        db.session.commit()
+        assert get_revisions(*keys)[course_scope(session_id, other_id)] == 1
+        db.session.execute(update(Carryover), [{'id': carryover.id, 'is_cleared': True}])
+        db.session.commit()
+        assert get_revisions(*keys)[course_scope(session_id, other_id)] == 2
+    print("   ✓ Carryover create and bulk clearance bump the course")
+
+    with app.app_context():
+        grading = get_revisions(GRADING_SCOPE)[GRADING_SCOPE]
+        grade = GradingSystem.query.first()
+        grade.min_score += 1
+        db.session.commit()
+        assert get_revisions(GRADING_SCOPE)[GRADING_SCOPE] == grading + 1
+        assert get_revisions(*keys)[course_scope(session_id, course_id)] == 3
+    print("   ✓ Grading edits bump the grading scope only")
+
+
+if __name__ == '__main__':
+    test_orm_changes()
+    test_bulk_changes()
+    print("\n✅ ALL DATA REVISION TESTS PASSED")
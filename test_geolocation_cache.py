@@ -0,0 +1,150 @@
+"""
+Test script for the non-blocking IP geolocation cache
+Uses a local stub resolver so no network calls are made
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_login import login_user
+from sqlalchemy import text
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, User, ResultAlteration, IpLocation
+from app.routes.auth import get_location_from_ip, log_result_alteration
+from app.utils.geolocation import (
+    PENDING_LOCATION, StaticResolver, get_geo_locator, set_geo_resolver, IpApiResolver
+)
+
+LAGOS = ('Lagos, Lagos, Nigeria', 6.4541, 3.3947)
+
+
+def test_miss_is_pending_then_cached():
+    """A miss returns immediately and is resolved once by the worker"""
+    print("\n" + "=" * 60)
+    print("TEST: Non-blocking geolocation cache")
+    print("=" * 60)
+
+    app = create_app('testing')
+    resolver = StaticResolver({'102.89.1.1': LAGOS})
+    set_geo_resolver(resolver)
+    try:
+        with app.app_context():
+            locator = get_geo_locator()
+            assert get_location_from_ip('102.89.1.1') == (PENDING_LOCATION, None, None)
+            assert resolver.calls == [], "Lookup must not block on the resolver"
+
+            assert locator.process_pending() == 1
+            assert get_location_from_ip('102.89.1.1') == LAGOS
+            assert IpLocation.query.filter_by(ip_address='102.89.1.1').one().is_resolved
+            print("   ✓ Miss returned a placeholder and was resolved in the background")
+
+            # Memory cleared: answered from the ip_locations table
+            locator._cache.clear()
+            assert get_location_from_ip('102.89.1.1') == LAGOS
+            assert locator.process_pending() == 0
+            assert resolver.calls == ['102.89.1.1']
+            print("   ✓ Cached addresses are not resolved again")
+
+            # Failed lookups are cached as Unknown
+            get_location_from_ip('10.0.0.9')
+            locator.process_pending()
+            assert get_location_from_ip('10.0.0.9') == ('Unknown', None, None)
+            assert not IpLocation.query.filter_by(ip_address='10.0.0.9').one().is_resolved
+            print("   ✓ Failed lookups are cached as Unknown")
+    finally:
+        set_geo_resolver(IpApiResolver())
+
+
+def test_pending_alterations_filled_in():
+    """Alterations saved while the lookup was pending get the location later"""
+    app = create_app('testing')
+    set_geo_resolver(StaticResolver({'102.89.1.1': LAGOS}))
+    try:
+        with app.test_request_context(headers={'X-Forwarded-For': '102.89.1.1'}):
+            session = AcademicSession(session_name='2025/2026', is_current=True)
+            db.session.add(session)
+            db.session.flush()
+            course = Course(course_code='CSC301', course_title='Operating Systems', credit_unit=3,
+                            semester=1, level=300, program='Computer Science')
+            student = Student(matric_number='CSC/2023/0001', surname='ADE', first_name='Tola',
+                              program='Computer Science', level=300, session_id=session.id)
+            db.session.add_all([course, student])
+            db.session.commit()
+            login_user(User.query.filter_by(role='hod').first())
+
+            log_result_alteration(
+                result_id=1, student=student, course=course, session_name='2025/2026',
+                alteration_type='CREATE',
+                new_result=SimpleNamespace(ca_score=20, exam_score=40, total_score=60, grade='B')
+            )
+            db.session.commit()
+            alteration = ResultAlteration.query.one()
+            assert alteration.location == PENDING_LOCATION
+
+            get_geo_locator().process_pending()
+            db.session.refresh(alteration)
+            assert (alteration.location, alteration.latitude, alteration.longitude) == LAGOS
+            print("   ✓ Pending alteration locations filled in after resolution")
+
+            plan = ' '.join(str(row[-1]) for row in db.session.execute(text(
+                "EXPLAIN QUERY PLAN UPDATE result_alterations SET location = 'Lagos' "
+                "WHERE ip_address = '102.89.1.1' AND location = 'Pending lookup'"
+            )))
+            assert 'ix_result_alterations_ip_location' in plan, plan
+            print("   ✓ Pending alterations are found through the IP address index")
+    finally:
+        set_geo_resolver(IpApiResolver())
+
+
+def test_lru_eviction():
+    """The in-memory cache keeps at most GEOLOCATION_CACHE_SIZE addresses"""
+    app = create_app('testing')
+    app.config['GEOLOCATION_CACHE_SIZE'] = 2
+    get_geo_locator().configure(app)
+    set_geo_resolver(StaticResolver({ip: LAGOS for ip in ('1.1.1.1', '2.2.2.2', '3.3.3.3')}))
+    try:
+        with app.app_context():
+            locator = get_geo_locator()
+            for ip in ('1.1.1.1', '2.2.2.2', '3.3.3.3'):
+                locator.lookup(ip)
+            locator.process_pending()
+            assert locator.cached('1.1.1.1') is None
+            assert locator.cached('3.3.3.3') == LAGOS
+            print("   ✓ Least recently used addresses are evicted")
+    finally:
+        set_geo_resolver(IpApiResolver())
+
+
+def test_queue_is_bounded():
+    """Misses beyond GEOLOCATION_QUEUE_SIZE are answered as Unknown and not queued"""
+    app = create_app('testing')
+    app.config['GEOLOCATION_QUEUE_SIZE'] = 2
+    get_geo_locator().configure(app)
+    resolver = StaticResolver({ip: LAGOS for ip in ('1.1.1.1', '2.2.2.2', '3.3.3.3')})
+    set_geo_resolver(resolver)
+    try:
+        with app.app_context():
+            locator = get_geo_locator()
+            assert locator.lookup('1.1.1.1') == (PENDING_LOCATION, None, None)
+            assert locator.lookup('2.2.2.2') == (PENDING_LOCATION, None, None)
+            assert locator.lookup('1.1.1.1') == (PENDING_LOCATION, None, None)
+            assert locator.lookup('3.3.3.3') == ('Unknown', None, None)
+            assert list(locator._queue) == ['1.1.1.1', '2.2.2.2'] and locator.dropped == 1
+            print("   ✓ A full queue drops new addresses as Unknown")
+
+            assert locator.process_pending() == 2
+            assert locator.lookup('3.3.3.3') == (PENDING_LOCATION, None, None)
+            print("   ✓ Dropped addresses are queued again once there is room")
+    finally:
+        set_geo_resolver(IpApiResolver())
+
+
+if __name__ == '__main__':
+    test_miss_is_pending_then_cached()
+    test_pending_alterations_filled_in()
+    test_lru_eviction()
+    test_queue_is_bounded()
+    print("\n✅ ALL GEOLOCATION CACHE TESTS PASSED")
@@ -0,0 +1,133 @@
+"""
+Test script for the compiled grading table cache
+Verifies that cached lookups match the database grading rows and that
+grading no longer queries the database once a table is compiled
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, text
+from app import create_app, db
+from app.models import GradingSystem
+from app.utils.grading import (
+    get_grade_info, get_grade_info_bulk, invalidate_grading_cache, GradingTable
+)
+
+
+def linear_grade(score, grading):
+    """Reference implementation: the original row-by-row scan"""
+    for grade in grading:
+        if grade.min_score <= score <= grade.max_score:
+            return (grade.grade, grade.grade_point)
+    return ('F', 0)
+
+
+def test_cached_lookup_matches_database():
+    """Compiled table gives the same grade as scanning the rows"""
+    print("\n" + "=" * 60)
+    print("TEST: Cached grading lookup matches database rows")
+    print("=" * 60)
+
+    app = create_app('testing')
+    with app.app_context():
+        invalidate_grading_cache()
+        grading = GradingSystem.query.filter_by(degree_type='BSc').all()
+
+        for tenth in range(0, 1001):
+            score = tenth / 10
+            assert get_grade_info(score, 'BSc') == linear_grade(score, grading), \
+                f"Mismatch for score {score}"
+        print("   ✓ All scores from 0.0 to 100.0 graded identically")
+
+
+def test_default_grading():
+    """Degree types without rows fall back to the default bands"""
+    table = GradingTable.default()
+    assert table.lookup(100) == ('A', 5)
+    assert table.lookup(70) == ('A', 5)
+    assert table.lookup(69.9) == ('B', 4)
+    assert table.lookup(45) == ('D', 2)
+    assert table.lookup(39.9) == ('F', 0)
+    assert table.lookup(-1) == ('F', 0)
+    print("   ✓ Default grading bands correct")
+
+
+def test_bulk_grading_matches_scalar():
+    """Vectorized grading returns the same grades as scalar lookups"""
+    app = create_app('testing')
+    with app.app_context():
+        invalidate_grading_cache()
+        scores = [tenth / 10 for tenth in range(-10, 1011)]
+
+        grades, grade_points = get_grade_info_bulk(scores, 'BSc')
+        assert len(grades) == len(grade_points) == len(scores)
+        for score, grade, grade_point in zip(scores, grades, grade_points):
+            assert (grade, grade_point) == get_grade_info(score, 'BSc'), \
+                f"Mismatch for score {score}"
+
+        # Default grading (no rows for this degree type)
+        grades, grade_points = get_grade_info_bulk(scores, 'DIPLOMA')
+        for score, grade, grade_point in zip(scores, grades, grade_points):
+            assert (grade, grade_point) == GradingTable.default().lookup(score)
+
+        grades, grade_points = get_grade_info_bulk([], 'BSc')
+        assert len(grades) == 0 and len(grade_points) == 0
+        print("   ✓ Bulk grading matches scalar grading")
+
+
+def test_no_queries_after_warmup():
+    """Once compiled, grading a score runs no SQL"""
+    app = create_app('testing')
+    with app.app_context():
+        invalidate_grading_cache()
+        get_grade_info(50, 'BSc')  # Warm the cache
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            for score in range(0, 101):
+                get_grade_info(score, 'BSc')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert not statements, f"Expected no queries, got {len(statements)}"
+        print("   ✓ 101 lookups ran without touching the database")
+
+
+def test_revision_picks_up_changes():
+    """Grading edits are picked up once the grading revision moves on, from any process"""
+    app = create_app('testing')
+    with app.app_context():
+        invalidate_grading_cache()
+        assert get_grade_info(48, 'BSc') == ('D', 2)
+
+        grade_c = GradingSystem.query.filter_by(degree_type='BSc', grade='C').first()
+        grade_d = GradingSystem.query.filter_by(degree_type='BSc', grade='D').first()
+        grade_c.min_score = 48
+        grade_d.max_score = 47
+        db.session.commit()
+        assert get_grade_info(48, 'BSc') == ('C', 3)
+        print("   ✓ Committed grading edits reload the table")
+
+    # Another worker process edits the rows: only the revision tells this one
+    with app.app_context():
+        db.session.execute(text("UPDATE grading_systems SET min_score = 46 WHERE degree_type = 'BSc' AND grade = 'C'"))
+        db.session.execute(text("UPDATE grading_systems SET max_score = 45 WHERE degree_type = 'BSc' AND grade = 'D'"))
+        db.session.execute(text("UPDATE data_revisions SET revision = revision + 1 WHERE scope = 'grading'"))
+        db.session.commit()
+    with app.app_context():
+        assert get_grade_info(46, 'BSc') == ('C', 3)
+    print("   ✓ Edits saved by another process are picked up on the next request")
+
+
+if __name__ == '__main__':
+    test_cached_lookup_matches_database()
+    test_default_grading()
+    test_bulk_grading_matches_scalar()
+    test_no_queries_after_warmup()
+    test_revision_picks_up_changes()
+    print("\n✅ ALL GRADING CACHE TESTS PASSED")
@@ -0,0 +1,150 @@
+"""
+Test script for the offline IP-range geolocation database
+Builds small tables in a temporary directory and checks lookups against a
+linear scan of the same ranges
+"""
+import sys
+import os
+import ipaddress
+import random
+import tempfile
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.utils.ip_ranges import build_ip_database, IpRangeDatabase
+from app.utils.geolocation import get_geo_locator, StaticResolver, set_geo_resolver, IpApiResolver
+
+SAMPLE_CSV = """start,end,city,region,country,lat,lon
+102.89.0.0,102.89.255.255,Lagos,Lagos,Nigeria,6.4541,3.3947
+41.58.0.0,41.58.127.255,Benin City,Edo,Nigeria,6.335,5.6037
+197.210.0.0,197.210.0.255,,,Nigeria,,
+2c0f:f5c0::,2c0f:f5c0:ffff:ffff:ffff:ffff:ffff:ffff,Abuja,FCT,Nigeria,9.0765,7.3986
+not-an-ip,1.2.3.4,Nowhere,,,,
+"""
+
+
+def test_lookups():
+    """IPv4, IPv6 and IPv4-mapped lookups, boundaries and misses"""
+    print("\n" + "=" * 60)
+    print("TEST: Offline IP-range database")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ip_ranges.bin')
+        counts = build_ip_database(SAMPLE_CSV, path)
+        assert counts == {'ipv4': 3, 'ipv6': 1, 'locations': 4, 'skipped': 1}, counts
+
+        database = IpRangeDatabase(path)
+        try:
+            assert database.lookup('102.89.0.0') == ('Lagos, Lagos, Nigeria', 6.4541, 3.3947)
+            assert database.lookup('102.89.255.255')[0] == 'Lagos, Lagos, Nigeria'
+            assert database.lookup('41.58.64.1')[0] == 'Benin City, Edo, Nigeria'
+            assert database.lookup('41.58.128.0') is None
+            assert database.lookup('197.210.0.7') == ('Nigeria', None, None)
+            assert database.lookup('1.1.1.1') is None
+            print("   ✓ IPv4 lookups and range boundaries")
+
+            assert database.lookup('2c0f:f5c0::1')[0] == 'Abuja, FCT, Nigeria'
+            assert database.lookup('2c0f:f5c1::1') is None
+            assert database.lookup('::ffff:102.89.3.4')[0] == 'Lagos, Lagos, Nigeria'
+            assert database.lookup('garbage') is None
+            print("   ✓ IPv6 and IPv4-mapped lookups")
+        finally:
+            database.close()
+
+
+def test_matches_linear_scan():
+    """Binary search agrees with a scan over random non-overlapping ranges"""
+    random.seed(2026)
+    bounds = sorted(random.sample(range(0, 2 ** 32), 2000))
+    ranges = [(bounds[i], bounds[i + 1] - 1) for i in range(0, 2000, 2)]
+    rows = [f"{start},{end},City{i},,Nigeria,{i / 100},{i / 100}" for i, (start, end) in enumerate(ranges)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ip_ranges.bin')
+        build_ip_database('\n'.join(rows), path)
+        database = IpRangeDatabase(path)
+        try:
+            probes = [random.randrange(2 ** 32) for _ in range(2000)]
+            probes += [start for start, _ in ranges[:100]] + [end for _, end in ranges[:100]]
+            for number in probes:
+                expected = None
+                for i, (start, end) in enumerate(ranges):
+                    if start <= number <= end:
+                        expected = f'City{i}, Nigeria'
+                        break
+                found = database.lookup(str(ipaddress.IPv4Address(number)))
+                assert (found[0] if found else None) == expected, number
+
+            start = time.perf_counter()
+            for number in probes:
+                database.lookup(str(ipaddress.IPv4Address(number)))
+            per_lookup = (time.perf_counter() - start) / len(probes) * 1_000_000
+            print(f"   ✓ {len(probes)} lookups match a linear scan ({per_lookup:.1f} us/lookup)")
+        finally:
+            database.close()
+
+
+def test_locator_uses_offline_database():
+    """Covered addresses resolve synchronously without the online resolver"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ip_ranges.bin')
+        build_ip_database(SAMPLE_CSV, path)
+
+        app = create_app('testing')
+        app.config['GEOIP_DATABASE_PATH'] = path
+        app.config['GEOLOCATION_ONLINE_LOOKUPS'] = False
+        locator = get_geo_locator()
+        locator.configure(app)
+        resolver = StaticResolver()
+        set_geo_resolver(resolver)
+        try:
+            with app.app_context():
+                assert locator.lookup('41.58.0.10')[0] == 'Benin City, Edo, Nigeria'
+                assert locator.lookup('8.8.8.8') == ('Unknown', None, None)
+                assert locator.process_pending() == 0
+                assert resolver.calls == []
+                print("   ✓ Locator answers from the offline database without the network")
+        finally:
+            set_geo_resolver(IpApiResolver())
+            get_geo_locator().configure(create_app('testing'))
+
+
+def test_reload_closes_previous_database():
+    """Replacing the database file unmaps the old one; reconfiguring unmaps the current one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ip_ranges.bin')
+        build_ip_database(SAMPLE_CSV, path)
+
+        app = create_app('testing')
+        app.config['GEOIP_DATABASE_PATH'] = path
+        app.config['GEOLOCATION_ONLINE_LOOKUPS'] = False
+        locator = get_geo_locator()
+        locator.configure(app)
+        try:
+            with app.app_context():
+                first = locator.database()
+                build_ip_database(SAMPLE_CSV, path)
+                stat = os.stat(path)
+                os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+                second = locator.database()
+                assert second is not first and first._map.closed and not second._map.closed
+                assert locator.lookup('41.58.0.10')[0] == 'Benin City, Edo, Nigeria'
+                print("   ✓ A rebuilt database replaces the old mapping, which is closed")
+
+                locator.configure(app)
+                assert second._map.closed
+        finally:
+            get_geo_locator().configure(create_app('testing'))
+    print("   ✓ Reconfiguring the locator closes its database")
+
+
+if __name__ == '__main__':
+    test_lookups()
+    test_matches_linear_scan()
+    test_locator_uses_offline_database()
+    test_reload_closes_previous_database()
+    print("\n✅ ALL IP-RANGE DATABASE TESTS PASSED")
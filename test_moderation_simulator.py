@@ -0,0 +1,129 @@
+"""
+Test script for the moderation "what-if" simulator
+Checks score adjustments, boundary changes, affected students and their
+semester GPA, the JSON endpoint, and that nothing is written to results
+"""
+import sys
+import os
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app import create_app, db
+from app.models import Course, Result
+from app.utils import get_moderation_set, parse_scenario, adjust_scores, simulate_moderation
+from app.utils.grading import GradingTable
+from testdata import add_session, add_course, add_class, add_result, get_hod_id, login
+
+# (CA, exam) per student in CSC301; every student also has CSC303 (2 units, grade B)
+SCORES = [(20, 27), (18, 25), (25, 40), (12, 25), (28, 45), (15, 33)]   # 47, 43, 65, 37, 73, 48
+
+
+def setup_data(app):
+    """CSC301 (3 units) and CSC303 (2 units) results for six students"""
+    with app.app_context():
+        session = add_session()
+        course = add_course('CSC301', 300, course_title='Algorithms')
+        other = add_course('CSC303', 300, course_title='Databases', credit_unit=2)
+        for student, (ca, _) in zip(add_class(session, course, 'CSC/2023', SCORES), SCORES):
+            add_result(session, student, other, ca, 62 - ca)
+        db.session.commit()
+        return session.id, course.id
+
+
+def test_adjustments():
+    """Offsets, scaling and capped bonuses"""
+    print("\n" + "=" * 60)
+    print("TEST: Moderation simulator")
+    print("=" * 60)
+
+    totals = np.array([30.0, 47.0, 98.0])
+    assert adjust_scores(totals, offset=5).tolist() == [35.0, 52.0, 100.0]
+    assert adjust_scores(totals, scale=0.5).tolist() == [15.0, 23.5, 49.0]
+    assert adjust_scores(totals, bonus=5, bonus_cap=50).tolist() == [35.0, 50.0, 98.0]
+    print("   ✓ Offset, scale and capped bonus adjust the scores")
+
+    table = GradingTable.default().with_boundaries({'C': 48})
+    assert table.lookup(48)[0] == 'C' and table.lookup(47)[0] == 'D'
+    for bad in ({'Z': 40}, {'C': 70}):
+        try:
+            GradingTable.default().with_boundaries(bad)
+            raise AssertionError(f'{bad} accepted')
+        except ValueError:
+            pass
+    for bad in ({'offset': 'five'}, {'margin': 2}, {'boundaries': {'C': 120}}):
+        try:
+            parse_scenario(bad)
+            raise AssertionError(f'{bad} accepted')
+        except ValueError:
+            pass
+    print("   ✓ Boundary changes regrade; invalid scenarios are rejected")
+
+
+def test_simulation():
+    """Grades, pass rate and semester GPA under a scenario, with no writes"""
+    app = create_app('testing')
+    session_id, course_id = setup_data(app)
+    with app.app_context():
+        course = db.session.get(Course, course_id)
+        before = [(r.id, r.total_score, r.grade) for r in Result.query.order_by(Result.id)]
+        moderation_set = get_moderation_set(course, session_id)
+
+        outcome = simulate_moderation(moderation_set, parse_scenario({'offset': 5}))
+        assert outcome['before']['failed'] == 1 and outcome['after']['failed'] == 0
+        assert outcome['after']['pass_rate'] == 100.0
+        changed = {s['matric_number']: s for s in outcome['students']}
+        assert set(changed) == {'CSC/2023/0000', 'CSC/2023/0001', 'CSC/2023/0002', 'CSC/2023/0003',
+                                'CSC/2023/0005'}
+        student = changed['CSC/2023/0001']   # 43 (E) -> 48 (D)
+        assert (student['grade_before'], student['grade_after']) == ('E', 'D')
+        # (1 * 3 + 4 * 2) / 5 -> (2 * 3 + 4 * 2) / 5
+        assert (student['semester_gpa_before'], student['semester_gpa_after']) == (2.2, 2.8)
+        print("   ✓ +5 marks clears the only failure and lifts five students' grades and GPAs")
+
+        outcome = simulate_moderation(moderation_set, parse_scenario({'boundaries': {'C': 47}}))
+        assert [s['matric_number'] for s in outcome['students']] == ['CSC/2023/0000', 'CSC/2023/0005']
+        assert outcome['after']['grades']['C'] == outcome['before']['grades']['C'] + 2
+        print("   ✓ Lowering the C boundary to 47 regrades the two students on 47 and 48")
+
+        started = time.perf_counter()
+        for offset in range(50):
+            simulate_moderation(moderation_set, parse_scenario({'offset': offset % 10, 'bonus': 2, 'bonus_cap': 50}))
+        per_scenario = (time.perf_counter() - started) / 50 * 1000
+        assert per_scenario < 20, per_scenario
+        print(f"   ✓ {per_scenario:.2f} ms per scenario")
+
+        assert [(r.id, r.total_score, r.grade) for r in Result.query.order_by(Result.id)] == before
+    print("   ✓ No result was changed")
+
+
+def test_endpoint():
+    """The simulate endpoint compares several scenarios in one request"""
+    app = create_app('testing')
+    session_id, course_id = setup_data(app)
+    client = app.test_client()
+    with app.app_context():
+        login(client, get_hod_id())
+
+    response = client.post(f'/results/course/{course_id}/simulate', json={'scenarios': [
+        {'name': 'plus five', 'offset': 5},
+        {'name': 'C at 48', 'boundaries': {'C': 48}},
+    ]})
+    data = response.get_json()
+    assert response.status_code == 200 and data['students'] == 6
+    assert [s['name'] for s in data['scenarios']] == ['plus five', 'C at 48']
+    assert data['scenarios'][0]['after']['pass_rate'] == 100.0
+    print(f"   ✓ Two scenarios compared in {data['elapsed_ms']} ms")
+
+    response = client.post(f'/results/course/{course_id}/simulate', json={'boundaries': {'C': 99}})
+    assert response.status_code == 400 and 'ascending' in response.get_json()['error']
+    print("   ✓ Invalid boundaries return 400")
+
+
+if __name__ == '__main__':
+    test_adjustments()
+    test_simulation()
+    test_endpoint()
+    print("\n✅ ALL MODERATION SIMULATOR TESTS PASSED")
@@ -0,0 +1,143 @@
+"""
+Test script for the shared PDF render assets
+Checks that styles, header paragraphs and the decoded logo are built once
+and reused, and that uploading or deleting the logo invalidates them
+"""
+import sys
+import os
+import io
+import shutil
+import tempfile
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image as PILImage
+from sqlalchemy import text
+from app import create_app, db
+from app.models import User
+from app.utils import pdf_generator
+from app.utils.pdf_generator import (
+    get_pdf_styles, header_paragraph, get_logo_path, get_logo_image, invalidate_pdf_assets,
+    generate_student_result_pdf, generate_spreadsheet_pdf
+)
+
+STUDENT = {'matric_number': 'CSC/2024/0001', 'name': 'ADA, Obi', 'gender': 'F',
+           'program': 'Computer Science', 'level': 200}
+RESULTS = {
+    'session': '2025/2026',
+    'first_semester': [{'course_code': 'CSC201', 'course_title': 'Data Structures', 'credit_unit': 3,
+                        'total_score': 72, 'grade': 'A', 'grade_point': 5}],
+    'second_semester': [],
+    'first_semester_summary': {'total': 3, 'gpa': 5.0},
+    'cumulative': {'passed': 3, 'failed': 0, 'total': 3, 'cgpa': 5.0}
+}
+SPREADSHEET = {
+    'students': [{'matric_number': 'CSC/2024/0001', 'name': 'ADA, Obi', 'gender': 'F',
+                  'first_semester': {'CSC201': '72A'}, 'first_semester_summary': {'gpa': 5.0}}],
+    'first_semester_courses': [{'code': 'CSC201', 'title': 'Data Structures', 'status': 'C', 'credit_unit': 3}],
+    'second_semester_courses': [],
+    'level': 200, 'program': 'Computer Science', 'semester': '1', 'session': '2025/2026'
+}
+CONFIG = {'university_name': 'TEST UNIVERSITY', 'faculty_name': 'Science', 'department_name': 'Computing'}
+
+
+def make_app(logo_dir):
+    app = create_app('testing')
+    app.config['LOGO_FOLDER'] = logo_dir
+    invalidate_pdf_assets()
+    return app
+
+
+def write_logo(path, size, color):
+    PILImage.new('RGB', size, color).save(path, 'JPEG')
+
+
+def test_assets_built_once():
+    """Styles, header paragraphs and the logo are shared between documents"""
+    print("\n" + "=" * 60)
+    print("TEST: Shared PDF render assets")
+    print("=" * 60)
+
+    assert get_pdf_styles() is get_pdf_styles()
+    first = header_paragraph('TEST UNIVERSITY', 'UniversityName')
+    second = header_paragraph('TEST UNIVERSITY', 'UniversityName')
+    assert first is not second and first.frags is second.frags
+    print("   ✓ Stylesheet and parsed header lines are reused")
+
+    logo_dir = tempfile.mkdtemp()
+    try:
+        write_logo(os.path.join(logo_dir, 'university_logo.jpg'), (1200, 1200), 'navy')
+        app = make_app(logo_dir)
+
+        loads = []
+        original = pdf_generator.load_logo_image
+        pdf_generator.load_logo_image = lambda path: loads.append(path) or original(path)
+        try:
+            with app.app_context():
+                for _ in range(3):
+                    pdf = generate_student_result_pdf(STUDENT, RESULTS, CONFIG).getvalue()
+                    generate_spreadsheet_pdf(SPREADSHEET, CONFIG)
+        finally:
+            pdf_generator.load_logo_image = original
+
+        assert len(loads) == 1, loads
+        pixels = round(pdf_generator.LOGO_RENDER_SIZE / 72 * pdf_generator.LOGO_RENDER_DPI)
+        assert b'/Subtype /Image' in pdf and f'/Width {pixels}'.encode() in pdf
+        print(f"   ✓ Logo decoded once for 6 PDFs and embedded at {pixels}px instead of 1200px")
+    finally:
+        shutil.rmtree(logo_dir)
+
+
+def test_logo_routes_invalidate():
+    """Uploading or deleting the logo through settings takes effect at once"""
+    logo_dir = tempfile.mkdtemp()
+    try:
+        app = make_app(logo_dir)
+        client = app.test_client()
+        with app.app_context():
+            hod_id = User.query.filter_by(role='hod').first().id
+            assert get_logo_path() is None
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(hod_id)
+            sess['_fresh'] = True
+
+        upload = io.BytesIO()
+        PILImage.new('RGB', (300, 300), 'red').save(upload, 'JPEG')
+        upload.seek(0)
+        response = client.post('/settings/logo', data={'logo': (upload, 'logo.jpg')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 302
+
+        with app.app_context():
+            logo_path = get_logo_path()
+            assert logo_path == os.path.join(logo_dir, 'university_logo.jpg')
+            reader = get_logo_image(logo_path)
+            assert reader is not None and reader is get_logo_image(logo_path)
+        print("   ✓ Uploaded logo used without a restart")
+
+        assert client.post('/settings/logo/delete').status_code == 302
+        with app.app_context():
+            assert get_logo_path() is None
+            pdf = generate_student_result_pdf(STUDENT, RESULTS, CONFIG).getvalue()
+            assert b'/Subtype /Image' not in pdf
+        print("   ✓ Deleted logo dropped from the cache")
+
+        # Another worker process uploads a logo: this one sees the logo revision move on
+        write_logo(os.path.join(logo_dir, 'university_logo.jpg'), (300, 300), 'green')
+        with app.app_context():
+            assert get_logo_path() is None
+            db.session.execute(text("UPDATE data_revisions SET revision = revision + 1 WHERE scope = 'logo'"))
+            db.session.commit()
+        with app.app_context():
+            assert get_logo_path() == os.path.join(logo_dir, 'university_logo.jpg')
+        print("   ✓ A logo saved by another process is used on the next request")
+    finally:
+        shutil.rmtree(logo_dir)
+        invalidate_pdf_assets()
+
+
+if __name__ == '__main__':
+    test_assets_built_once()
+    test_logo_routes_invalidate()
+    print("\n✅ ALL PDF ASSET TESTS PASSED")
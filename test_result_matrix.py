@@ -0,0 +1,147 @@
+"""
+Test script for the examination spreadsheet result matrix
+Checks the pivoted results and summaries against the per-result helpers and
+that the number of queries does not grow with students or courses
+"""
+import sys
+import os
+import random
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, Carryover, User
+from app.utils import calculate_gpa, get_credit_units_summary, get_grade_info
+from app.utils.result_matrix import build_result_matrix
+
+
+def setup_data(student_count, courses_per_semester):
+    """Create students, two semesters of courses and random results"""
+    random.seed(student_count)
+    session = AcademicSession(session_name='2025/2026', is_current=True)
+    db.session.add(session)
+    db.session.flush()
+
+    courses = [
+        Course(course_code=f'CSC{semester}{i:02d}', course_title=f'Course {semester}.{i}',
+               credit_unit=random.choice([2, 3]), semester=semester, level=200, program='Computer Science')
+        for semester in (1, 2) for i in range(courses_per_semester)
+    ]
+    students = [
+        Student(matric_number=f'CSC/2024/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                program='Computer Science', level=200, session_id=session.id)
+        for i in range(student_count)
+    ]
+    db.session.add_all(courses + students)
+    db.session.flush()
+
+    for student in students:
+        for course in courses:
+            if random.random() < 0.8:
+                total = random.randint(10, 95)
+                grade, grade_point = get_grade_info(total, 'BSc')
+                db.session.add(Result(student_id=student.id, course_id=course.id, session_id=session.id,
+                                      ca_score=0, exam_score=total, total_score=total,
+                                      grade=grade, grade_point=grade_point))
+        if random.random() < 0.3:
+            db.session.add(Carryover(student_matric=student.matric_number, course_id=courses[0].id,
+                                     original_session_id=session.id, original_level=100))
+    db.session.commit()
+    return session
+
+
+def count_queries(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        value = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return value, len(statements)
+
+
+def test_matrix_matches_per_result_helpers():
+    """Cells, summaries and remarks match the original per-student computation"""
+    print("\n" + "=" * 60)
+    print("TEST: Result matrix")
+    print("=" * 60)
+
+    app = create_app('testing')
+    with app.app_context():
+        session = setup_data(40, 6)
+        matrix = build_result_matrix(session.id, 200, 'Computer Science', (1, 2))
+        assert [len(matrix.courses[1]), len(matrix.courses[2])] == [6, 6]
+        assert len(matrix.rows) == 40
+
+        for row in matrix.rows:
+            student = row['student']
+            session_results = []
+            for semester in (1, 2):
+                results = []
+                for course, cell in zip(matrix.courses[semester], row['cells'][semester]):
+                    result = Result.query.filter_by(student_id=student.id, course_id=course.id,
+                                                    session_id=session.id).first()
+                    assert (cell is None) == (result is None)
+                    if result:
+                        assert (cell.total_score, cell.grade) == (result.total_score, result.grade)
+                        results.append(result)
+                summary = row['summaries'][semester]
+                expected = get_credit_units_summary(results)
+                assert (summary['passed'], summary['failed'], summary['total']) == \
+                    (expected['passed'], expected['failed'], expected['total'])
+                assert summary['gpa'] == calculate_gpa(results)
+                session_results.extend(results)
+            assert row['summaries']['session']['gpa'] == calculate_gpa(session_results)
+
+            carryovers = Carryover.query.filter_by(student_matric=student.matric_number, is_cleared=False).all()
+            expected_remark = ('CO: ' + ', '.join(co.course.course_code for co in carryovers)
+                               if carryovers else 'Proceed')
+            assert row['remark'] == expected_remark
+        print("   ✓ Cells, GPA summaries and remarks match for 40 students")
+
+
+def test_query_count_is_constant():
+    """Building the matrix takes the same number of queries for any size"""
+    counts = []
+    for students, courses in ((10, 3), (150, 12)):
+        app = create_app('testing')
+        with app.app_context():
+            session_id = setup_data(students, courses).id
+            _, queries = count_queries(
+                lambda: build_result_matrix(session_id, 200, 'Computer Science', (1, 2)))
+            counts.append(queries)
+    assert counts[0] == counts[1] <= 4, counts
+    print(f"   ✓ {counts[1]} queries for 150 students x 24 courses")
+
+
+def test_spreadsheet_preview_queries():
+    """The spreadsheet preview no longer queries per student or per cell"""
+    counts = []
+    for students in (10, 60):
+        app = create_app('testing')
+        client = app.test_client()
+        with app.app_context():
+            setup_data(students, 8)
+            hod_id = User.query.filter_by(role='hod').first().id
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(hod_id)
+            sess['_fresh'] = True
+
+        with app.app_context():
+            for semester in ('both', '1'):
+                response, queries = count_queries(lambda: client.post('/reports/spreadsheet', data={
+                    'level': 200, 'program': 'Computer Science', 'semester': semester}))
+                assert response.status_code == 200
+                counts.append((semester, queries))
+    assert counts[:2] == counts[2:], counts
+    print(f"   ✓ Preview query counts independent of student count: {counts[2:]}")
+
+
+if __name__ == '__main__':
+    test_matrix_matches_per_result_helpers()
+    test_query_count_is_constant()
+    test_spreadsheet_preview_queries()
+    print("\n✅ ALL RESULT MATRIX TESTS PASSED")
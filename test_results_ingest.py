@@ -0,0 +1,145 @@
+"""
+Test script for the set-based results ingestion engine
+Checks added/updated/failed counts, carryover reconciliation and that the number
+of queries does not grow with the number of uploaded rows
+"""
+import sys
+import os
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, Carryover, User
+from app.utils.ingest import ingest_course_results
+from app.utils.grading import reconcile_course_carryovers
+
+
+def setup_course(student_count):
+    """Create a session, a course and its students in the test database"""
+    session = AcademicSession(session_name='2025/2026', is_current=True)
+    db.session.add(session)
+    db.session.flush()
+
+    course = Course(course_code='CSC301', course_title='Operating Systems', credit_unit=3,
+                    semester=1, level=300, program='Computer Science')
+    db.session.add(course)
+    db.session.add_all([
+        Student(matric_number=f'CSC/2023/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                program='Computer Science', level=300, session_id=session.id)
+        for i in range(student_count)
+    ])
+    db.session.commit()
+    return session, course
+
+
+def make_record(matric, ca, exam):
+    return {'matric_number': matric, 'ca_score': ca, 'exam_score': exam, 'total_score': ca + exam}
+
+
+def test_counts_and_updates():
+    """New rows are added, repeated rows update, unknown students fail"""
+    print("\n" + "=" * 60)
+    print("TEST: Results ingestion counts")
+    print("=" * 60)
+
+    app = create_app('testing')
+    with app.app_context():
+        session, course = setup_course(3)
+        hod = User.query.filter_by(role='hod').first()
+
+        summary = ingest_course_results([
+            make_record('CSC/2023/0000', 25, 50),
+            make_record('CSC/2023/0001', 10, 20),
+            make_record('CSC/2023/9999', 10, 20),
+            make_record('CSC/2023/0000', 20, 50),  # Repeated in the same file
+        ], course, session.id, hod.id)
+        db.session.commit()
+
+        assert summary['added'] == 2, summary
+        assert summary['updated'] == 1, summary
+        assert summary['failed'] == 1, summary
+        assert summary['not_found'] == ['CSC/2023/9999']
+        assert Result.query.count() == 2
+
+        first = Result.query.join(Student).filter(Student.matric_number == 'CSC/2023/0000').one()
+        assert (first.total_score, first.grade, first.grade_point) == (70, 'A', 5)
+        types = [a['alteration_type'] for a in summary['alterations']]
+        assert types == ['CREATE', 'CREATE', 'UPDATE'], types
+        assert all(a['result_id'] for a in summary['alterations'])
+        print("   ✓ 2 added, 1 updated, 1 failed")
+
+        # Re-upload: unchanged rows update without an alteration record
+        summary = ingest_course_results([
+            make_record('CSC/2023/0000', 20, 50),
+            make_record('CSC/2023/0001', 15, 30),
+        ], course, session.id, hod.id)
+        db.session.commit()
+        assert (summary['added'], summary['updated']) == (0, 2)
+        assert len(summary['alterations']) == 1
+        second = Result.query.join(Student).filter(Student.matric_number == 'CSC/2023/0001').one()
+        assert (second.total_score, second.grade) == (45, 'D')
+        print("   ✓ Re-upload updates in place and only logs changed rows")
+
+
+def test_carryover_cleared_by_pass():
+    """Carryovers are left to reconciliation, which clears them on a pass"""
+    app = create_app('testing')
+    with app.app_context():
+        session, course = setup_course(2)
+        hod = User.query.filter_by(role='hod').first()
+        previous = AcademicSession(session_name='2024/2025')
+        db.session.add(previous)
+        db.session.flush()
+        for matric in ('CSC/2023/0000', 'CSC/2023/0001'):
+            db.session.add(Carryover(student_matric=matric, course_id=course.id,
+                                     original_session_id=previous.id, original_level=200))
+        db.session.commit()
+
+        ingest_course_results([
+            make_record('CSC/2023/0000', 25, 40),  # Pass
+            make_record('CSC/2023/0001', 5, 10),   # Fail
+        ], course, session.id, hod.id)
+        assert Carryover.query.filter_by(is_cleared=True).count() == 0
+        reconcile_course_carryovers(course.id, session.id)
+        db.session.commit()
+
+        passed = Carryover.query.filter_by(student_matric='CSC/2023/0000').one()
+        failed = Carryover.query.filter_by(student_matric='CSC/2023/0001', original_session_id=previous.id).one()
+        assert passed.is_cleared and passed.cleared_result_id is not None
+        assert not failed.is_cleared
+        assert all(r.is_carryover for r in Result.query.all())
+        print("   ✓ Pass clears carryover, fail leaves it open, both flagged as carryover attempts")
+
+
+def test_query_count_is_constant():
+    """A 1,000-row upload runs the same handful of statements as a small one"""
+    app = create_app('testing')
+    with app.app_context():
+        session, course = setup_course(1000)
+        hod = User.query.filter_by(role='hod').first()
+        records = [make_record(f'CSC/2023/{i:04d}', i % 31, (i * 7) % 71) for i in range(1000)]
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            start = time.perf_counter()
+            summary = ingest_course_results(records, course, session.id, hod.id)
+            db.session.commit()
+            elapsed = time.perf_counter() - start
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert summary['added'] == 1000
+        assert len(statements) <= 10, f"{len(statements)} statements"
+        print(f"   ✓ 1,000 rows applied with {len(statements)} statements in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    test_counts_and_updates()
+    test_carryover_cleared_by_pass()
+    test_query_count_is_constant()
+    print("\n✅ ALL RESULTS INGESTION TESTS PASSED")
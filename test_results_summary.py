@@ -0,0 +1,100 @@
+"""
+Test script for the SQL-side results summary
+Checks the grouped counts against the rows, access filtering, caching on the
+session's data revision, and that the listing page no longer loads every result
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Result
+from app.utils import summarize_results, get_results_summary
+from app.utils.result_summary import get_results_summary_cache
+from testdata import add_session, add_course, add_class, add_adviser, login
+
+
+def setup_data(app):
+    """Results at two levels and programs with a known mix of grades"""
+    with app.app_context():
+        session = add_session()
+        scores = [75, 62, 55, 48, 30, 20]   # A, B, C, D, F, F
+        for program, prefix in (('Computer Science', 'CSC'), ('Mathematics', 'MTH')):
+            for level in (100, 200):
+                course = add_course(f'{prefix}{level + 1}', level, program)
+                add_class(session, course, f'{prefix}/{level}', [(score // 2, score - score // 2) for score in scores])
+        adviser = add_adviser()
+        db.session.commit()
+        return session.id, adviser.id
+
+
+def test_summary_counts():
+    """Totals, grades and levels match counting the rows"""
+    print("\n" + "=" * 60)
+    print("TEST: Results summary")
+    print("=" * 60)
+
+    app = create_app('testing')
+    session_id, _ = setup_data(app)
+    with app.app_context():
+        summary = summarize_results(session_id)
+        rows = Result.query.filter_by(session_id=session_id).all()
+        assert summary['total'] == len(rows) == 24
+        assert summary['passed'] == len([r for r in rows if r.grade != 'F']) == 16
+        assert summary['failed'] == 8
+        assert summary['grades'] == {'A': 4, 'B': 4, 'C': 4, 'D': 4, 'F': 8}
+        assert summary['by_level'][200] == {'total': 12, 'passed': 8, 'failed': 4,
+                                            'grades': {'A': 2, 'B': 2, 'C': 2, 'D': 2, 'F': 4}}
+
+        scoped = summarize_results(session_id, 200, 'Mathematics')
+        assert (scoped['total'], scoped['passed'], scoped['failed']) == (6, 4, 2)
+        assert list(scoped['by_level']) == [200]
+    print("   ✓ Totals, grade distribution and levels match the rows")
+    print("   ✓ Access filters limit the summary to the user's level and program")
+
+
+def test_cache_and_listing():
+    """Summaries are cached on the session revision; the listing reads no result rows for them"""
+    app = create_app('testing')
+    session_id, adviser_id = setup_data(app)
+    cache = get_results_summary_cache()
+    with app.app_context():
+        first = get_results_summary(session_id)
+        assert get_results_summary(session_id) is first and cache.hits == 1
+
+        result = Result.query.filter_by(grade='F').first()
+        result.grade, result.grade_point = 'C', 3
+        db.session.commit()
+        assert get_results_summary(session_id)['failed'] == first['failed'] - 1
+    print("   ✓ Cached until a result in the session changes")
+
+    client = app.test_client()
+    login(client, adviser_id)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/results/')
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    assert response.status_code == 200
+    assert not any(sql.lstrip().startswith('SELECT results.id') and 'LIMIT' not in sql for sql in statements)
+    print("   ✓ Listing page no longer loads the session's results to count them")
+
+    data = client.get('/results/summary').get_json()
+    assert (data['total'], data['passed'], data['failed']) == (6, 4, 2) and data['session'] == '2025/2026'
+    assert data['by_level'] == {'200': {'total': 6, 'passed': 4, 'failed': 2,
+                                        'grades': {'A': 1, 'B': 1, 'C': 1, 'D': 1, 'F': 2}}}
+    print("   ✓ /results/summary returns the adviser's counts as JSON")
+
+
+if __name__ == '__main__':
+    test_summary_counts()
+    test_cache_and_listing()
+    print("\n✅ ALL RESULTS SUMMARY TESTS PASSED")
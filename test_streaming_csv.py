@@ -0,0 +1,176 @@
+"""
+Test script for streaming CSV ingestion
+Checks encoding detection, chunking, the error cap, flat memory use on a
+large file and that a chunked results upload matches a single-pass one
+"""
+import sys
+import os
+import io
+import tempfile
+import tracemalloc
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import AcademicSession, Course, Student, Result, ResultAlteration, User
+from app.utils import (
+    iter_results_csv, iter_student_csv, parse_results_csv, detect_csv_encoding
+)
+
+HEADER = 'Matric Number,CA Score,Exam Score\r\n'
+
+
+def test_encodings():
+    """BOMs, UTF-8 and Windows-1252 files decode to the same records"""
+    print("\n" + "=" * 60)
+    print("TEST: Streaming CSV parser")
+    print("=" * 60)
+
+    content = 'Matric Number,Surname,First Name\r\nCSC/2023/001,Ọ̀ṢỌ́,"Ngozi\nAda"\r\n'
+    for encoding, expected in (('utf-8-sig', 'utf-8-sig'), ('utf-16', 'utf-16'),
+                               ('utf-32', 'utf-32'), ('utf-8', 'utf-8')):
+        data = content.encode(encoding)
+        assert detect_csv_encoding(data) == expected, encoding
+        records = [r for chunk in iter_student_csv(io.BytesIO(data)) for r in chunk]
+        assert records[0]['surname'] == 'Ọ̀ṢỌ́'.upper() and records[0]['first_name'] == 'Ngozi\nAda'
+    print("   ✓ UTF-8, UTF-16 and UTF-32 with and without BOM")
+
+    data = 'Matric Number,Surname,First Name\nCSC/2023/002,Muñoz,José\n'.encode('cp1252')
+    assert detect_csv_encoding(data) == 'cp1252'
+    records = [r for chunk in iter_student_csv(data) for r in chunk]
+    assert (records[0]['surname'], records[0]['first_name']) == ('MUÑOZ', 'José')
+    print("   ✓ Windows-1252 detected when the file is not UTF-8")
+
+
+def test_chunks_and_errors():
+    """Records are yielded in fixed-size chunks and errors are capped"""
+    rows = [f'CSC/2023/{i:04d},{i % 40},{i % 80}' for i in range(250)]
+    errors = []
+    chunks = list(iter_results_csv((HEADER + '\r\n'.join(rows)).encode(), chunk_size=100,
+                                   errors=errors, max_errors=5))
+    # Rows with CA over 30 or exam over 70 are rejected
+    invalid = sum(1 for i in range(250) if i % 40 > 30 or i % 80 > 70)
+    valid = 250 - invalid
+    assert [len(chunk) for chunk in chunks] == [100] * (valid // 100) + [valid % 100], [len(c) for c in chunks]
+    assert len(errors) == 6 and errors[-1] == f'... and {invalid - 5} more errors', errors
+
+    # The list parser keeps every record and error
+    records, all_errors = parse_results_csv(HEADER + '\r\n'.join(rows))
+    assert records == [r for chunk in chunks for r in chunk]
+    assert len(all_errors) == invalid
+    print("   ✓ Chunks of 100 records; errors capped with a count of the rest")
+
+    errors = []
+    assert list(iter_results_csv('Matric,Score\nA,1\n', errors=errors)) == []
+    assert errors[0].startswith('Missing required columns: ca_score, exam_score')
+    print("   ✓ Missing columns reported without yielding records")
+
+
+def test_memory_is_flat():
+    """Parsing 300,000 rows keeps memory bounded by the chunk size"""
+    path = os.path.join(tempfile.gettempdir(), 'test_streaming_results.csv')
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(HEADER)
+        for i in range(300000):
+            f.write(f'CSC/2023/{i:06d},{i % 31},{i % 71}\r\n')
+
+    try:
+        tracemalloc.start()
+        count = 0
+        with open(path, 'rb') as f:
+            for chunk in iter_results_csv(f, chunk_size=1000):
+                count += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        os.remove(path)
+
+    assert count == 300000
+    assert peak < 5 * 1024 * 1024, f"peak {peak / 1024 / 1024:.1f} MB"
+    print(f"   ✓ 300,000 rows parsed with a {peak / 1024 / 1024:.1f} MB peak")
+
+
+def test_chunked_upload():
+    """Uploading through the route in small chunks writes every result once"""
+    app = create_app('testing')
+    app.config['CSV_CHUNK_SIZE'] = 7
+    client = app.test_client()
+    with app.app_context():
+        session = AcademicSession(session_name='2025/2026', is_current=True)
+        db.session.add(session)
+        db.session.flush()
+        course = Course(course_code='CSC201', course_title='Data Structures', credit_unit=3,
+                        semester=1, level=200, program='Computer Science')
+        db.session.add(course)
+        db.session.add_all([
+            Student(matric_number=f'CSC/2024/{i:04d}', surname=f'STUDENT{i}', first_name='Test',
+                    program='Computer Science', level=200, session_id=session.id)
+            for i in range(30)
+        ])
+        db.session.commit()
+        course_id = course.id
+        hod_id = User.query.filter_by(role='hod').first().id
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(hod_id)
+        sess['_fresh'] = True
+
+    # 30 students, a repeat of the first one and an unknown matric number
+    rows = [f'CSC/2024/{i:04d},{10 + i % 20},{30 + i}' for i in range(30)]
+    rows += ['CSC/2024/0000,29,69', 'CSC/2024/9999,10,10', 'BAD,x,1']
+    response = client.post('/results/upload', data={
+        'course_id': course_id,
+        'file': (io.BytesIO((HEADER + '\r\n'.join(rows)).encode('utf-16')), 'results.csv')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    with app.app_context():
+        assert Result.query.filter_by(course_id=course_id).count() == 30
+        first = Result.query.join(Student).filter(Student.matric_number == 'CSC/2024/0000').one()
+        assert (first.ca_score, first.exam_score) == (29, 69)
+        assert ResultAlteration.query.filter_by(alteration_type='CREATE').count() == 30
+        assert ResultAlteration.query.filter_by(alteration_type='UPDATE').count() == 1
+        print("   ✓ Chunked UTF-16 upload applies 30 results, 1 update and 1 unknown student")
+
+
+def test_upload_limits():
+    """Only the streamed upload views accept bodies over MAX_CONTENT_LENGTH"""
+    app = create_app('testing')
+    app.config.update(MAX_CONTENT_LENGTH=1024, UPLOAD_MAX_CONTENT_LENGTH=64 * 1024)
+    client = app.test_client()
+    with app.app_context():
+        session = AcademicSession(session_name='2025/2026', is_current=True)
+        db.session.add(session)
+        db.session.commit()
+        hod_id = User.query.filter_by(role='hod').first().id
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(hod_id)
+        sess['_fresh'] = True
+
+    rows = ''.join(f'CSC/2025/{i:04d},STUDENT{i},Test\n' for i in range(200))
+    roster = ('Matric Number,Surname,First Name\n' + rows).encode()
+    assert 1024 < len(roster) < 64 * 1024
+    response = client.post('/students/upload', data={
+        'level': 100, 'program': 'Computer Science', 'file': (io.BytesIO(roster), 'roster.csv')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+    with app.app_context():
+        assert Student.query.count() == 200
+    print("   ✓ A roster over MAX_CONTENT_LENGTH uploads within UPLOAD_MAX_CONTENT_LENGTH")
+
+    response = client.post('/courses/new', data={'course_code': 'CSC101', 'course_title': 'x' * 4096})
+    assert response.status_code == 413
+    response = client.post('/students/upload', data={
+        'level': 100, 'program': 'Computer Science', 'file': (io.BytesIO(roster * 50), 'roster.csv')
+    }, content_type='multipart/form-data')
+    assert response.status_code == 413
+    print("   ✓ Other forms keep the small limit, and uploads are still capped")
+
+
+if __name__ == '__main__':
+    test_encodings()
+    test_chunks_and_errors()
+    test_memory_is_flat()
+    test_chunked_upload()
+    test_upload_limits()
+    print("\n✅ ALL STREAMING CSV TESTS PASSED")
@@ -0,0 +1,141 @@
+"""
+Test script for full-text student search
+Checks partial matric and name matches, ranking, access filters, that the
+index follows inserts, updates, deletes and bulk statements, the rebuild,
+the LIKE fallback for short terms and the autocomplete endpoint
+"""
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import insert, text
+from app import create_app, db
+from app.models import Student
+from app.utils import search_students, student_search_clause, rebuild_student_search
+from testdata import add_session, add_student, add_adviser, get_hod_id, login
+
+STUDENTS = [
+    ('CSC/2023/0001', 'ADEBAYO', 'John', 300, 'Computer Science'),
+    ('CSC/2023/0002', 'OKAFOR', 'Adebayo', 300, 'Computer Science'),
+    ('CSC/2023/0103', 'BELLO', 'Aisha', 300, 'Computer Science'),
+    ('CSC/2023/0204', 'ADEBAYO', 'Adebayo', 300, 'Computer Science'),
+    ('MTH/2023/0001', 'ADEBAYO', 'Grace', 300, 'Mathematics'),
+    ('CSC/2024/0001', 'NWOSU', 'Chidi', 200, 'Computer Science'),
+]
+
+
+def setup_data(app):
+    """Six students in the current session"""
+    with app.app_context():
+        session = add_session()
+        for matric, surname, first_name, level, program in STUDENTS:
+            add_student(session, matric, level, program, surname, first_name)
+        db.session.commit()
+        return session.id
+
+
+def matrics(student_ids):
+    return [db.session.get(Student, student_id).matric_number for student_id in student_ids]
+
+
+def test_search():
+    """Partial matric numbers and names, ranked and filtered"""
+    print("\n" + "=" * 60)
+    print("TEST: Student full-text search")
+    print("=" * 60)
+
+    app = create_app('testing')
+    session_id = setup_data(app)
+    with app.app_context():
+        assert app.extensions['student_search']
+        assert set(matrics(search_students('2023/000', session_id))) == {'CSC/2023/0001', 'CSC/2023/0002',
+                                                                         'MTH/2023/0001'}
+        assert matrics(search_students('csc/2024')) == ['CSC/2024/0001']
+        print("   ✓ Partial matric numbers match, case-insensitively")
+
+        found = matrics(search_students('adebayo'))
+        assert set(found) == {'CSC/2023/0001', 'CSC/2023/0002', 'CSC/2023/0204', 'MTH/2023/0001'}
+        assert found[0] == 'CSC/2023/0204'
+        assert matrics(search_students('adebayo john')) == ['CSC/2023/0001']
+        print("   ✓ Names match in any field, every word must match, and the best match ranks first")
+
+        restricted = search_students('adebayo', level=300, program='Computer Science')
+        assert set(matrics(restricted)) == {'CSC/2023/0001', 'CSC/2023/0002', 'CSC/2023/0204'}
+        assert search_students('adebayo', session_id=session_id + 1) == []
+        print("   ✓ Session, level and program restrictions apply")
+
+        plan = ' '.join(str(row[-1]) for row in db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT rowid FROM student_search WHERE student_search MATCH '\"0103\"'"
+        )))
+        assert 'VIRTUAL TABLE INDEX' in plan, plan
+        clause = Student.query.filter(student_search_clause('0103', columns=('matric_number',)))
+        assert [s.matric_number for s in clause] == ['CSC/2023/0103']
+        assert Student.query.filter(student_search_clause('bello', columns=('matric_number',))).count() == 0
+        print("   ✓ Searches use the full-text index, optionally limited to some columns")
+
+        short = Student.query.filter(student_search_clause('Ch')).all()
+        assert [s.matric_number for s in short] == ['CSC/2024/0001']
+        print("   ✓ Terms under three characters fall back to LIKE")
+
+
+def test_index_sync():
+    """Triggers keep the index in step with every kind of write; rebuild recreates it"""
+    app = create_app('testing')
+    session_id = setup_data(app)
+    with app.app_context():
+        student = Student.query.filter_by(matric_number='CSC/2024/0001').first()
+        student.surname = 'EZE'
+        db.session.commit()
+        assert search_students('nwosu') == [] and matrics(search_students('eze')) == ['CSC/2024/0001']
+
+        db.session.delete(student)
+        db.session.commit()
+        assert search_students('eze') == []
+
+        db.session.execute(insert(Student), [{'matric_number': 'PHY/2025/0042', 'surname': 'UMARU',
+                                              'first_name': 'Bala', 'level': 100, 'program': 'Physics',
+                                              'session_id': session_id}])
+        db.session.commit()
+        assert matrics(search_students('0042')) == ['PHY/2025/0042']
+        print("   ✓ Updates, deletes and bulk inserts are indexed")
+
+        db.session.execute(text('DELETE FROM student_search'))
+        db.session.commit()
+        assert search_students('adebayo') == []
+        assert rebuild_student_search() == 6
+        assert len(search_students('adebayo')) == 4
+    print("   ✓ Rebuild re-indexes every student")
+
+
+def test_autocomplete():
+    """The autocomplete endpoint returns ranked suggestions within the user's access"""
+    app = create_app('testing')
+    setup_data(app)
+    client = app.test_client()
+    with app.app_context():
+        adviser = add_adviser(level=300)
+        db.session.commit()
+        adviser_id = adviser.id
+        login(client, get_hod_id())
+
+    data = client.get('/students/autocomplete?q=adebayo&limit=2').get_json()
+    assert len(data['students']) == 2 and data['students'][0]['url'].startswith('/students/')
+    assert client.get('/students/autocomplete?q=').get_json()['students'] == []
+    response = client.get('/students/?search=2023/01')
+    assert response.status_code == 200 and b'CSC/2023/0103' in response.data and b'CSC/2023/0001' not in response.data
+    print("   ✓ Suggestions are limited, and the student list searches the index")
+
+    login(client, adviser_id)
+    data = client.get('/students/autocomplete?q=adebayo').get_json()
+    assert [s['matric_number'] for s in data['students']] == ['MTH/2023/0001']
+    assert data['students'][0]['name'] == 'ADEBAYO Grace'
+    print("   ✓ Advisers only see their own level and program")
+
+
+if __name__ == '__main__':
+    test_search()
+    test_index_sync()
+    test_autocomplete()
+    print("\n✅ ALL STUDENT SEARCH TESTS PASSED")
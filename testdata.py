@@ -0,0 +1,90 @@
+"""
+Shared data for the test scripts
+Builds the current session, courses, students with results, the level adviser
+and the logged-in client most tests start from; each script adds only the
+rows specific to it. Call these inside an app context.
+"""
+from app import db
+from app.models import AcademicSession, Course, Student, Result, User
+from app.utils import get_grade_info, invalidate_grading_cache
+
+ADVISER_USERNAME = 'adviser@university.edu.ng'
+ADVISER_PASSWORD = 'Adviser@2026!'
+
+
+def add_session(session_name='2025/2026'):
+    """The current academic session (flushed, so it has an ID)"""
+    invalidate_grading_cache()   # Grades below assume this app's default scale
+    session = AcademicSession(session_name=session_name, is_current=True)
+    db.session.add(session)
+    db.session.flush()
+    return session
+
+
+def add_course(course_code, level, program='Computer Science', course_title='Course', credit_unit=3, semester=1):
+    """A course (flushed, so it has an ID)"""
+    course = Course(course_code=course_code, course_title=course_title, credit_unit=credit_unit,
+                    semester=semester, level=level, program=program)
+    db.session.add(course)
+    db.session.flush()
+    return course
+
+
+def add_student(session, matric_number, level, program='Computer Science', surname='S', first_name='T'):
+    """A student of the session (flushed, so it has an ID)"""
+    student = Student(matric_number=matric_number, surname=surname, first_name=first_name,
+                      program=program, level=level, session_id=session.id)
+    db.session.add(student)
+    db.session.flush()
+    return student
+
+
+def add_result(session, student, course, ca_score, exam_score):
+    """A student's result in a course, graded on the BSc scale"""
+    total = ca_score + exam_score
+    grade, grade_point = get_grade_info(total, 'BSc')
+    result = Result(student_id=student.id, course_id=course.id, session_id=session.id, ca_score=ca_score,
+                    exam_score=exam_score, total_score=total, grade=grade, grade_point=grade_point)
+    db.session.add(result)
+    return result
+
+
+def add_class(session, course, matric_prefix, scores):
+    """
+    A student with a result in the course for each (CA, exam) score.
+
+    Matric numbers are '<matric_prefix>/0000', '<matric_prefix>/0001', ...
+    and students take the course's level and program.
+
+    Returns:
+        list: The students, in score order
+    """
+    students = []
+    for i, (ca_score, exam_score) in enumerate(scores):
+        student = add_student(session, f'{matric_prefix}/{i:04d}', course.level, course.program)
+        add_result(session, student, course, ca_score, exam_score)
+        students.append(student)
+    return students
+
+
+def add_adviser(level=200, program='Mathematics'):
+    """A level adviser (flushed, so it has an ID)"""
+    adviser = User(username=ADVISER_USERNAME, email=ADVISER_USERNAME, full_name='Adviser',
+                   role='level_adviser', level=level, program=program, is_active=True,
+                   must_change_password=False)
+    adviser.set_password(ADVISER_PASSWORD)
+    db.session.add(adviser)
+    db.session.flush()
+    return adviser
+
+
+def get_hod_id():
+    """ID of the default HoD account create_app makes"""
+    return User.query.filter_by(role='hod').first().id
+
+
+def login(client, user_id):
+    """Log the test client in as a user"""
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True